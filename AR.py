@@ -9,6 +9,11 @@ def main(root):
     logger.info(USING_AR_1.format(AC_VERSION))
     logger.info(THE_INPUT_IS_1.format(root))
 
+    manifest = None
+    if ENABLE_INCREMENTAL_CHECK:
+        manifest = CheckManifest(root.parent.joinpath(AR_MANIFEST_FILENAME))
+        logger.info(MANIFEST_USING_1.format(manifest.path))
+
     cds_roots = [d for d in listDir(root) if d.name.lower() == STD_CDS_DIRNAME.lower()]
     if not cds_roots:
         logger.warning(AR_NOT_FOUND_CDS_DIR_2.format(STD_CDS_DIRNAME, root))
@@ -18,9 +23,12 @@ def main(root):
         if any(p.lower() == STD_BKS_DIRNAME.lower() for p in cds_root.relative_to(root).parts[:-1]): continue
         logger.info('')
         logger.info(CHECKING_1.format(cds_root))
-        chkAlbumRoot(cds_root, logger=logger)
+        with snapshotDirTree(cds_root):
+            chkAlbumRoot(cds_root, logger=logger, manifest=manifest)
         logger.info(CHECKED_1.format(cds_root))
         logger.info('')
+    if manifest and manifest.save():
+        logger.info(MANIFEST_SAVED_1.format(manifest.path))
     logger.info(AR_ENDING_NOTE_1.format(log_path))
     logging.shutdown()
     return
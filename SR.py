@@ -9,7 +9,7 @@ def _cli(paths: list[Path]):
     if (n == 1) and paths[0].is_dir():
         chkScans(paths[0])
     else:
-        printUsage(SR_USAGE_2.format(STD_BKS_DIRNAME, TEMP_DIR_PATH), paths)
+        printUsage(SR_USAGE_1.format(STD_BKS_DIRNAME), paths)
 
 
 
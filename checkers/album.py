@@ -3,13 +3,17 @@ from __future__ import annotations
 import time
 from logging import Logger
 from pathlib import Path
+from multiprocessing import Pool
 
 from utils import *
 from langs import *
 from configs import *
 from helpers.album import *
+from helpers.albuminfo import AlbumInfo
 from helpers.summaries import logMusicSummary
 
+from pymediainfo import Track
+
 from tqdm import tqdm
 
 # class DiscInfo:
@@ -21,6 +25,8 @@ from tqdm import tqdm
 __all__ = [
     'chkAlbumRoot',
     'chkAlbumDirNaming',
+    'replayAlbumsFiles',
+    'probeAlbumsFiles',
     'chkAlbumFiles',
     'logContentCheck',
     ]
@@ -28,7 +34,7 @@ __all__ = [
 
 
 
-def chkAlbumRoot(root: Path, logger: Logger) -> None:
+def chkAlbumRoot(root: Path, logger: Logger, manifest: CheckManifest|None = None) -> None:
 
     if root.name != STD_CDS_DIRNAME:
         logger.error(AR_CAPTITAL_MISTAKE_2.format(STD_CDS_DIRNAME, root.name))
@@ -55,17 +61,22 @@ def chkAlbumRoot(root: Path, logger: Logger) -> None:
     if not albums_infos: logger.error(AR_GOT_NO_VALID_ALBUM_DIR_0)
 
     logger.info(AR_CHECKING_DIR_CONTENT_0)
-    for album_info in albums_infos:
-        chkAlbumFiles(album_info, logger=logger)
+    albums_to_check = replayAlbumsFiles(albums_infos, manifest, logger=logger) if manifest else albums_infos
+    # take the identity before the check, so a file modified during the check is checked again next time
+    identities = {ai.root: getDirIdentity(ai.root) for ai in albums_to_check} if manifest else {}
+    probes = probeAlbumsFiles(albums_to_check, logger=logger)
+    for album_info in albums_to_check:
+        chkAlbumFiles(album_info, logger=logger, probes=probes)
+        if manifest:
+            result = {'logs': album_info.logs, 'credits': album_info.credits}
+            manifest.update('albums', album_info.root, identities[album_info.root], result)
 
     logContentCheck(albums_infos, logger=logger)
 
     if ENABLE_VGMDB:
         logger.info(AR_CHECKING_VGMDB_0)
-        for album_info in (pbar := tqdm(albums_infos, ascii=True, dynamic_ncols=True)):
-            pbar.set_description(f'VGMDB: {album_info.root.name}')
-            lookupVGMDB(album_info, logger=logger)
-            time.sleep(1)
+        with tqdm(total=len(albums_infos), desc='VGMDB', ascii=True, dynamic_ncols=True) as pbar:
+            lookupVGMDBConcurrently(albums_infos, logger=logger, callback=lambda _: pbar.update(1))
 
     logger.info(AR_GEN_SUMMARY_0)
     logMusicSummary(root, albums_infos, logger=logger)
@@ -693,61 +704,108 @@ def chkAlbumDirNaming(album_path: Path, logger: Logger) -> AlbumInfo:
 
 
 
-def chkAlbumFiles(album: AlbumInfo, logger: Logger):
+class _AlbumFileProbe:
+
+    '''
+    The MediaInfo tracks and the decoding result of a file in an album, obtained in a worker.
+    Only the tracks used by the checkers are kept, so the whole MediaInfo does not travel between processes.
+    '''
+
+    __slots__ = ('path', 'gtr', 'atr', 'itr', 'decoded')
+
+    def __init__(self, path: Path, gtr: Track|None, atr: Track|None, itr: Track|None, decoded: bool):
+        self.path: Path = path
+        self.gtr: Track|None = gtr
+        self.atr: Track|None = atr
+        self.itr: Track|None = itr
+        self.decoded: bool = decoded
+
+
+
+
+def _probeAlbumFile(path: Path) -> _AlbumFileProbe:
+    minfo = getMediaInfo(path)
+    gtr = minfo.general_tracks[0] if minfo.general_tracks else None
+    atr = minfo.audio_tracks[0] if minfo.audio_tracks else None
+    itr = minfo.image_tracks[0] if minfo.image_tracks else None
+    return _AlbumFileProbe(path, gtr, atr, itr, tstFFmpegDecode(path))
+
+
+
+
+def _listAlbumFilesToProbe(album: AlbumInfo) -> list[Path]:
+    paths: list[Path] = []
+    for disc_dir in (album.split_discs + album.joint_discs + album.hires_discs):
+        paths += listFile(disc_dir, ext=AUD_EXTS_IN_CDS, rglob=False)
+        paths += listFile(disc_dir, ext=IMG_EXTS_IN_CDS, rglob=False)
+    return paths
+
+
+
+
+def replayAlbumsFiles(albums: list[AlbumInfo], manifest: CheckManifest, logger: Logger|None = None) -> list[AlbumInfo]:
+    '''
+    Fill the content check results of the albums unchanged since the manifest was saved.
+    Return the albums that still need to be checked.
+    '''
+    albums_to_check: list[AlbumInfo] = []
+    for album in albums:
+        if (result := manifest.lookup('albums', album.root, getDirIdentity(album.root))) is None:
+            albums_to_check.append(album)
+            continue
+        album.logs += [(level, msg) for level, msg in result['logs']]
+        album.credits = result['credits']
+    if logger: logger.info(MANIFEST_REPLAYED_N_2.format(len(albums) - len(albums_to_check), len(albums_to_check)))
+    return albums_to_check
+
+
+
+
+def probeAlbumsFiles(
+    albums: list[AlbumInfo],
+    mp: int = NUM_CPU_JOBS,
+    logger: Logger|None = None,
+    ) -> dict[Path, _AlbumFileProbe]:
+    '''
+    Read the MediaInfo and do the decoding test of all audio/image files in all albums.
+    Each file is a task of a single pool living through all albums, so the cores are busy until the last file.
+    The results are looked up by path later, so the checking order and logs are the same as a serial run.
+    '''
+    paths = list(dict.fromkeys(path for album in albums for path in _listAlbumFilesToProbe(album)))
+    # start from the largest files, so a long decoding does not come last and leave the other workers idle
+    paths.sort(key=lambda path: path.stat().st_size, reverse=True)
+
+    probes: dict[Path, _AlbumFileProbe] = {}
+    with tqdm(total=len(paths), desc=AR_PROBING_FILES_0, unit='', ascii=True, dynamic_ncols=True) as pbar:
+        if mp <= 1 or len(paths) <= 1:
+            for path in paths:
+                probes[path] = _probeAlbumFile(path)
+                pbar.update(1)
+        else:
+            with Pool(mp) as pool:
+                for probe in pool.imap_unordered(_probeAlbumFile, paths):
+                    probes[probe.path] = probe
+                    pbar.update(1)
+    if logger: logger.debug(f'Probed {len(probes)} files in {len(albums)} albums.')
+    return probes
+
+
+
+
+def chkAlbumFiles(album: AlbumInfo, logger: Logger, probes: dict[Path, _AlbumFileProbe]|None = None):
 
     if not album: return album
     logger.info(f'Checking files in "{album.root.name}"...')
 
-    chkSplitDiscs(album, logger)
-    chkJointDiscs(album, logger)
-    chkHiResDiscs(album, logger)
-    chkScanDirs(album, logger)
-    chkMvDirs(album, logger)
-    chkCreditFiles(album, logger)
-
-    # for i, msg in album.logs:
-    #         match i:
-    #             case 0: # info
-    #                 logger.info(msg)
-    #             case 1: # warning
-    #                 logger.warning(msg)
-    #             case 2: # error
-    #                 logger.error(msg)
-    #             case _:
-    #                 raise ValueError
-
-    # NOTE: we didn't see multiprocessing is noticeably faster
-    # mp overhead in creating/destroying process is very expensive
-
-    # pbar = tqdm.tqdm(total=album_info.total_items, desc='Checked', unit='', unit_scale=False, ascii=True, dynamic_ncols=True)
-
-    # pool = Pool()
-    # for sa_dir in album_info.split_discs:
-    #     a_infos.append(pool.apply_async(chkSplitAudioDir, args=(sa_dir, album_info)))
-    # for ja_dir in album_info.joint_discs:
-    #     a_infos.append(pool.apply_async(chkJointAudioDir, args=(ja_dir, album_info)))
-    # for bk_dir in album_info['d_bk']:
-    #     b_infos.append(pool.apply_async(chkScansDir, args=(bk_dir, album_info)))
-    # for mv_dir in album_info['d_mv']:
-    #     m_infos.append(pool.apply_async(chkMvDir, args=(mv_dir, album_info)))
-    # for txt_file in album_info['f_txt']:
-    #     t_infos.append(pool.apply_async(chkTxtFile, args=(txt_file, album_info)))
-
-    # n_completed = 0
-    # while n_completed < n_total:
-    #     n_ready = sum(r.ready() for r in results)
-    #     if n_new := (n_ready - n_completed):
-    #         pbar.update(n_new)
-    #     n_completed = n_ready
-    #     time.sleep(0.5)
-
-    # pool.close()
-    # pool.join()
-    # a_infos = [r.get() for r in a_infos]
-    # b_infos = [r.get() for r in b_infos]
-    # m_infos = [r.get() for r in m_infos]
-    # t_infos = [r.get() for r in t_infos]
-    # pbar.close()
+    if probes is None:
+        probes = probeAlbumsFiles([album], mp=1)
+
+    chkSplitDiscs(album, probes)
+    chkJointDiscs(album, probes)
+    chkHiResDiscs(album, probes)
+    chkScansDirs(album)
+    chkMvDir(album)
+    chkCreditFiles(album)
 
 
 
@@ -770,26 +828,26 @@ def logContentCheck(albums: list[AlbumInfo], logger: Logger):
 
 
 
-def _chkSplitDiscImpl(self, disc_dir: Path):
+def _chkSplitDiscImpl(self, disc_dir: Path, probes: dict[Path, _AlbumFileProbe]):
 
     aroot = self.root
 
     #* audio check ***************************************************
 
     aud_files = listFile(disc_dir, ext=AUD_EXTS_IN_CDS, rglob=False)
-    aud_minfos = [getMediaInfo(f) for f in aud_files]
+    aud_probes = [probes[f] for f in aud_files]
 
     valid_aud_files = []
-    valid_aud_minfos = []
-    for f, m in zip(aud_files, aud_minfos):
-        if m.audio_tracks:
+    valid_aud_probes = []
+    for f, p in zip(aud_files, aud_probes):
+        if p.atr:
             valid_aud_files.append(f)
-            valid_aud_minfos.append(m)
+            valid_aud_probes.append(p)
         else:
             self.logs.append((2, f'Not an audio file "{f.relative_to(aroot)}".'))
 
-    aud_gtrs = [m.general_tracks[0] for m in valid_aud_minfos]
-    aud_atrs = [m.audio_tracks[0] for m in valid_aud_minfos]
+    aud_gtrs = [p.gtr for p in valid_aud_probes]
+    aud_atrs = [p.atr for p in valid_aud_probes]
 
     seen_album_names = []
     seen_artists = []
@@ -837,7 +895,7 @@ def _chkSplitDiscImpl(self, disc_dir: Path):
         if gtr.composer: seen_artists.append(gtr.composer)
         if gtr.album_composer: seen_artists.append(gtr.album_composer)
 
-        if not tstFFmpegDecode(aud_file):
+        if not probes[aud_file].decoded:
             self.logs.append((2, f'Decoding "{rel_path}" failed.'))
 
     seen_artists = list(set(seen_artists))
@@ -871,37 +929,35 @@ def _chkSplitDiscImpl(self, disc_dir: Path):
 
     img_files = listFile(disc_dir, ext=IMG_EXTS_IN_CDS, rglob=False)
     for img_file in img_files:
-        if not tstFFmpegDecode(img_file):
+        img_probe = probes[img_file]
+        if not img_probe.decoded:
             self.logs.append((2, f'Decoding "{img_file.relative_to(aroot)}" failed.'))
-        if img_file.name == 'Cover.jpg':
-            iinfo = getMediaInfo(img_file).image_tracks[0]
+        if img_file.name == 'Cover.jpg' and (iinfo := img_probe.itr):
             if (iinfo.width and iinfo.width > NORMAL_COVER_ART_LENGTH) \
             or (iinfo.height and iinfo.height > NORMAL_COVER_ART_LENGTH) \
             or (iinfo.stream_size and iinfo.stream_size > NORMAL_COVER_ART_FILESIZE):
                 self.logs.append((1, f'The cover art "{img_file.relative_to(aroot)}" is too large.'))
-            if not tstFFmpegDecode(img_file):
-                self.logs.append((2, f'Decoding "{img_file.relative_to(aroot)}" failed.'))
 
 
 
 
-def chkHiResDiscs(album: AlbumInfo):
+def chkHiResDiscs(album: AlbumInfo, probes: dict[Path, _AlbumFileProbe]):
 
     for disc_dir in album.hires_discs:
-        _chkSplitDiscImpl(disc_dir)
+        _chkSplitDiscImpl(album, disc_dir, probes)
 
 
 
 
-def chkSplitDiscs(self):
+def chkSplitDiscs(self, probes: dict[Path, _AlbumFileProbe]):
 
     for disc_dir in self.split_discs:
-        self._chkSplitDiscImpl(disc_dir)
+        _chkSplitDiscImpl(self, disc_dir, probes)
 
 
 
 
-def chkJointDiscs(self):
+def chkJointDiscs(self, probes: dict[Path, _AlbumFileProbe]):
 
     aroot: Path = self.root
     logs: list[tuple[int, str]] = []
@@ -911,19 +967,19 @@ def chkJointDiscs(self):
         #* audio check ***************************************************
 
         aud_files = listFile(disc_dir, ext=AUD_EXTS_IN_CDS, rglob=False)
-        aud_minfos = [getMediaInfo(f) for f in aud_files]
+        aud_probes = [probes[f] for f in aud_files]
 
         valid_aud_files = []
-        valid_aud_minfos = []
-        for f, m in zip(aud_files, aud_minfos):
-            if m.audio_tracks:
+        valid_aud_probes = []
+        for f, p in zip(aud_files, aud_probes):
+            if p.atr:
                 valid_aud_files.append(f)
-                valid_aud_minfos.append(m)
+                valid_aud_probes.append(p)
             else:
                 logs.append((2, f'Not an audio file "{f.relative_to(aroot)}".'))
 
-        aud_gtrs = [m.general_tracks[0] for m in valid_aud_minfos]
-        aud_atrs = [m.audio_tracks[0] for m in valid_aud_minfos]
+        aud_gtrs = [p.gtr for p in valid_aud_probes]
+        aud_atrs = [p.atr for p in valid_aud_probes]
 
         for aud_file, gtr, atr in zip(valid_aud_files, aud_gtrs, aud_atrs):
             rel_path = aud_file.relative_to(aroot)
@@ -965,7 +1021,7 @@ def chkJointDiscs(self):
                     f'The album name in dirname is not seen in audio metadata data under "{disc_dir.relative_to(aroot)}".'
                     ))
 
-            if not tstFFmpegDecode(aud_file):
+            if not probes[aud_file].decoded:
                 logs.append((2, f'Decoding "{aud_file.relative_to(aroot)}" failed.'))
 
         #* cue check *****************************************************
@@ -1003,16 +1059,14 @@ def chkJointDiscs(self):
 
         img_files = listFile(disc_dir, ext=IMG_EXTS_IN_CDS, rglob=False)
         for img_file in img_files:
-            if not tstFFmpegDecode(img_file):
+            img_probe = probes[img_file]
+            if not img_probe.decoded:
                 logs.append((2, f'Decoding "{img_file.relative_to(aroot)}" failed.'))
-            if img_file.name == 'Cover.jpg':
-                iinfo = getMediaInfo(img_file).image_tracks[0]
+            if img_file.name == 'Cover.jpg' and (iinfo := img_probe.itr):
                 if (iinfo.width and iinfo.width > NORMAL_COVER_ART_LENGTH) \
                 or (iinfo.height and iinfo.height > NORMAL_COVER_ART_LENGTH) \
                 or (iinfo.stream_size and iinfo.stream_size > NORMAL_COVER_ART_FILESIZE):
                     logs.append((1, f'The cover art "{img_file.relative_to(aroot)}" is too large.'))
-                if not tstFFmpegDecode(img_file):
-                    logs.append((2, f'Decoding "{img_file.relative_to(aroot)}" failed.'))
 
     self.logs += logs
 
@@ -1068,5 +1122,5 @@ def chkCreditFiles(self):
     if DEBUG: logs.append((0, 'credits: ' + ('|'.join(credit_msgs))))
     self.credits = list(set(credit_msgs))
 
-    self.logs = logs
+    self.logs += logs
     return self
@@ -1,4 +1,5 @@
 import itertools
+from pathlib import Path
 from logging import Logger
 
 from langs import *
@@ -204,6 +205,24 @@ def cmpCfAudContent(input1: CF|list[CF], input2: CF|list[CF], logger: Logger) ->
             f'VR will only compare the first {audio_nums_to_cmp} audio track(s).'
             )
 
+    # the tracks of the same file are read together, so a file with multiple audio tracks is demuxed only once
+    # only the tracks to be compared are read i.e. in a pair of track groups sharing the same sampling rate
+    tracks_to_read: dict[tuple[Path, int], list[int]] = {}
+    for track1, track2 in zip(tracks1.values(), tracks2.values()):
+        if len(freqs := set(cf.audio_tracks[i].sampling_rate for cf, i in track1 + track2)) == 1:
+            freq = freqs.pop()
+            for cf, i in track1 + track2:
+                tracks_to_read.setdefault((cf.path, freq), []).append(i)
+    audios: dict[tuple[Path, int], np.ndarray] = {}
+
+    def _readAudio(cf: CF, i: int, freq: int) -> np.ndarray:
+        if (cf.path, i) not in audios:
+            ids = list(dict.fromkeys(tracks_to_read[(cf.path, freq)]))
+            start, length = freq * CHK_OFFSET_STA, freq * CHK_OFFSET_LEN
+            for id, audio in zip(ids, readAudios(cf.path, ids, start=start, length=length)):
+                audios[(cf.path, id)] = audio
+        return audios[(cf.path, i)]
+
     ret = []
     for (k, track1), (k2, track2) in zip(tracks1.items(), tracks2.items()):
         assert k == k2  # this should be never triggered
@@ -228,10 +247,8 @@ def cmpCfAudContent(input1: CF|list[CF], input2: CF|list[CF], logger: Logger) ->
             continue
 
         freq = freqs[0]
-        start = freq * CHK_OFFSET_STA
-        length = freq * CHK_OFFSET_LEN
-        audio1 = np.concatenate([readAudio(cf.path, id=i, start=start, length=length) for cf, i in track1])
-        audio2 = np.concatenate([readAudio(cf.path, id=i, start=start, length=length) for cf, i in track2])
+        audio1 = np.concatenate([_readAudio(cf, i, freq) for cf, i in track1])
+        audio2 = np.concatenate([_readAudio(cf, i, freq) for cf, i in track2])
 
         start1, start2 = calcAudioOffset(audio1, audio2, start=freq * CHK_OFFSET_STA, length=freq * CHK_OFFSET_LEN)
         if offset := (start1 - start2):
@@ -1,4 +1,3 @@
-import re
 import itertools
 from pathlib import Path
 from logging import Logger
@@ -47,37 +46,30 @@ def chkCfImage(cf: CF, logger: Logger, decode: bool = True) -> bool:
 
 
 
-def chkScansImage(cf: CF, temp_dir: Path|None, logger: Logger, decode: bool = True):
+def chkScansImage(cf: CF, logger: Logger, decode: bool = True):
 
     if not chkCfImage(cf, logger, decode=decode): return
 
     iinfo = cf.image_tracks[0]
 
     w, h, mode = 0, 0, ''
-    if temp_dir: (work_file := temp_dir.joinpath(f'{time.time_ns()}-{cf.path.name}')).hardlink_to(cf.path)
-    else: work_file = cf.path
 
     match cf.ext:
     #* webp ********************************************************************************************************
         case 'webp':
-            ret = tstDwebp(f'{work_file.as_posix()}')
-            # NOTE don't decode the raw ret['stderr'], it may contain unknown encoding difficult to determine
-            # and actually our regex only need the ASCII part
-            if m := re.search(DWEBP_STDERR_PARSE_REGEX, ret['stderr']):
-                w, h, mode, alpha = m['width'], m['height'], m['mode'], m['alpha']
-                q = getWebpQuality(f'{work_file.as_posix()}')
-                if q and not ((DEFAULT_WEBP_QUALITY - 3) < q < (DEFAULT_WEBP_QUALITY + 3)):
+            # the headers are parsed in-process, so any path works and nothing needs to be hardlinked for libwebp
+            if info := readWebpInfo(cf.path):
+                w, h, mode = info.width, info.height, ('lossless' if info.lossless else 'lossy')
+                q = info.quality
+                if q > 0 and not ((DEFAULT_WEBP_QUALITY - 3) < q < (DEFAULT_WEBP_QUALITY + 3)):
                     logger.warning(
                         f'The WEBP file "{cf.path}" may have improper quality '
                         f'(got {q} but expect {DEFAULT_WEBP_QUALITY}).'
                         )
-                if alpha:
+                if info.alpha:
                     logger.info(f'Note an alpha WEBP file "{cf.path}".')
             else:
-                if b'cannot open input file' in ret['stderr']:
-                    logger.error(f'Libwebp cannot parse the path "{cf.path}". Consider using hardlink mode.')
-                else:
-                    logger.error(f'Failed to parse "{cf.path}".')
+                logger.error(f'Failed to parse "{cf.path}".')
 
         #* jpeg ********************************************************************************************************
         case 'jpg'|'jpeg':
@@ -91,8 +83,6 @@ def chkScansImage(cf: CF, temp_dir: Path|None, logger: Logger, decode: bool = Tr
         case _:
             raise ValueError(f'Got "{cf.ext}" but "{ALL_EXTS_IN_SCANS=}"')
 
-    if temp_dir: work_file.unlink()
-
     #* general info ****************************************************************************************************
 
     w, h, mode = w if w else 0, h if h else 0, mode if mode else ''
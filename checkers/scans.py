@@ -3,11 +3,16 @@ import difflib
 import itertools
 from pathlib import Path
 from logging import Logger
+from typing import Iterator
+from multiprocessing import Pool
+from multiprocessing.pool import Pool as PoolType
 
+from langs import *
 from utils import *
 from configs import *
 from .image import *
 from helpers.corefile import CF
+from loggers import initBufferedLogger
 
 import tqdm
 from tqdm.contrib.logging import logging_redirect_tqdm
@@ -158,15 +163,80 @@ def chkScansNaming(scans_dir: Path, logger: Logger):
 
 
 
-def chkScansFiles(files: list[Path], temp_dir: Path|None, logger: Logger):
+def _chkScansFileBuffered(task: tuple[int, Path]) -> tuple[int, list[tuple[int, str]]]:
+    '''Check a scans file in a worker, sending back the findings as (level, message).'''
+    i, file = task
+    logger, buffer = initBufferedLogger(f'SR-{os.getpid()}')
+    chkScansImage(CF(file), logger=logger, decode=True)
+    return i, [(record.levelno, record.msg) for record in buffer.records]
+
+
+
+
+def _iterScansFindings(
+    files: list[Path], idxs: list[int], pool: PoolType|None, mp: int
+    ) -> Iterator[tuple[int, list[tuple[int, str]]]]:
+    '''Yield the findings of `files[i]` for i in `idxs`, in the order of completion.'''
+    # start from the largest files, so a long decoding does not come last and leave the other workers idle
+    tasks = sorted(((i, files[i]) for i in idxs), key=lambda task: task[1].stat().st_size, reverse=True)
+    if pool is not None and len(tasks) > 1:
+        yield from pool.imap_unordered(_chkScansFileBuffered, tasks)
+    elif mp > 1 and len(tasks) > 1:
+        with Pool(min(mp, len(tasks))) as pool:
+            yield from pool.imap_unordered(_chkScansFileBuffered, tasks)
+    else:
+        yield from map(_chkScansFileBuffered, tasks)
+
+
+
+
+def chkScansFiles(
+    files: list[Path],
+    logger: Logger,
+    manifest: CheckManifest|None = None,
+    pool: PoolType|None = None,
+    mp: int = NUM_CPU_JOBS,
+    ):
+    '''
+    Check the content of each scans file.
+
+    The files are checked by `mp` workers (or the given `pool`), each sending back its findings.
+    The findings are logged in the input order, as soon as all findings before them are logged.
+
+    If a manifest is given, the findings of the files unchanged since the manifest was saved are replayed from it,
+    and only the other files are actually checked, with their findings remembered in the manifest.
+    '''
 
     if DEBUG: assert all(file.is_file() for file in files)
 
+    if manifest:
+        identities = [getFileIdentity(file) for file in files]
+        findings = [manifest.lookup('files', f, i) for f, i in zip(files, identities)]
+        logger.info(MANIFEST_REPLAYED_N_2.format(sum(f is not None for f in findings), findings.count(None)))
+    else:
+        identities, findings = [None] * len(files), [None] * len(files)
+    idxs = [i for i, finding in enumerate(findings) if finding is None]
+    if pool is None and mp > 1 and len(idxs) > 1:
+        logger.info(SR_CHECKING_WITH_N_WORKERS_1.format(min(mp, len(idxs))))
+
+    logged = 0
+
+    def _logReadyFindings():
+        nonlocal logged
+        while logged < len(files) and findings[logged] is not None:
+            for level, msg in findings[logged]:
+                logger.log(level, msg)
+            logged += 1
+
     with logging_redirect_tqdm([logger]):
         pbar = tqdm.tqdm(
             total=len(files), desc='Checking', unit='file', unit_scale=False, ascii=True, dynamic_ncols=True
             )
-        for file in files:
-            chkScansImage(CF(file), temp_dir, logger=logger, decode=True)
+        pbar.update(len(files) - len(idxs))
+        _logReadyFindings()
+        for i, finding in _iterScansFindings(files, idxs, pool, mp):
+            findings[i] = finding
+            if manifest: manifest.update('files', files[i], identities[i], finding)
             pbar.update(1)
+            _logReadyFindings()
         pbar.close()
@@ -3,7 +3,7 @@ import itertools
 
 from helpers.season import Season
 from helpers.corefile import CoreFile
-from helpers.naming import cmpCoreFileNaming
+from helpers.naming import getCoreFileNamingKey, groupCoreFilesByNaming
 from configs.runtime import *
 from .naming import *
 from .tracks import *
@@ -96,15 +96,19 @@ def chkSeasonNamingCorrelation(season: Season, logger: logging.Logger) -> bool:
 
     ok = True
     cfs = season.files
-    for i, cf in enumerate(cfs):
+    # the partners are looked up by the naming fields instead of comparing every pair of files
+    groups_at_9 = groupCoreFilesByNaming(cfs, 9)
+    groups_at_4 = groupCoreFilesByNaming(cfs, 4)
+    for cf in cfs:
         logger.debug(f'Checking for {cf.e}/0x{cf.src} ...')
 
         match cf.e:
 
             case 'mka':  #* ---------------------------------------------------------------------------------------------
                 mkv_partners: list[CoreFile] = []
-                for ccf in (cfs[:i] + cfs[i + 1:]):
-                    if all(cmpCoreFileNaming(cf, ccf)[:9]):  # MKA partner matches at [:9] (before ext)
+                # MKA partner matches at [:9] (before ext)
+                for ccf in groups_at_9[getCoreFileNamingKey(cf, 9)]:
+                    if ccf is not cf:
                         if ccf.ext == 'mkv':
                             mkv_partners.append(ccf)
                         #? any other?
@@ -121,8 +125,9 @@ def chkSeasonNamingCorrelation(season: Season, logger: logging.Logger) -> bool:
 
                 vid_partners: list[CoreFile] = []
                 ass_peers: list[CoreFile] = []
-                for ccf in (cfs[:i] + cfs[i + 1:]):
-                    if all(cmpCoreFileNaming(cf, ccf)[:9]):  # ASS partner matches at [:8] (before suffix)
+                # ASS partner matches at [:9] (before ext)
+                for ccf in groups_at_9[getCoreFileNamingKey(cf, 9)]:
+                    if ccf is not cf:
                         if ccf.ext in VX_VID_EXTS:
                             vid_partners.append(ccf)
                         elif ccf.ext in VX_SUB_EXTS:
@@ -146,10 +151,10 @@ def chkSeasonNamingCorrelation(season: Season, logger: logging.Logger) -> bool:
             case 'flac':  #* --------------------------------------------------------------------------------------------
 
                 png_partners: list[CoreFile] = []
-                for ccf in (cfs[:i] + cfs[i + 1:]):
-                    # flac partner matches at [:4] (at classification)
-                    # because we can reuse "[Menu].flac" for multi "[Menu01~4].png"
-                    if all(cmpCoreFileNaming(cf, ccf)[:4]):
+                # flac partner matches at [:4] (at classification)
+                # because we can reuse "[Menu].flac" for multi "[Menu01~4].png"
+                for ccf in groups_at_4[getCoreFileNamingKey(cf, 4)]:
+                    if ccf is not cf:
                         if ccf.ext == 'png':
                             png_partners.append(ccf)
                         #? any other?
@@ -205,10 +210,11 @@ def chkNamingDependency(season: Season, logger: logging.Logger, hook: bool = Tru
     ok = True
     dep_cfs = list(cf for cf in season.files if cf.e in VX_DEP_EXTS)
     idp_cfs = list(cf for cf in season.files if cf.e not in VX_DEP_EXTS)
+    idp_groups = groupCoreFilesByNaming(idp_cfs, 8)
 
-    for i, dep_cf in enumerate(dep_cfs):
+    for dep_cf in dep_cfs:
         if dep_cf.depends: continue
-        counterparts = [cf for cf in idp_cfs if all(cmpCoreFileNaming(cf, dep_cf)[:8])]  # match any except suffix
+        counterparts = idp_groups.get(getCoreFileNamingKey(dep_cf, 8), [])  # match any except suffix
         if counterparts:
             if hook:
                 dep_cf.depends = counterparts[0]
@@ -230,19 +236,18 @@ def chkNamingDependency(season: Season, logger: logging.Logger, hook: bool = Tru
 def chkFinalNamingConflict(season: Season, logger: logging.Logger) -> bool:
 
     ok = True
-    names = []
     crc32s = []
-    for cf in season.files:
-        i_name = f'{cf.e}//{cf.g}//{cf.t}//{cf.l}//{cf.f}//{cf.x}'
-        names.append(i_name)
+    groups: dict[tuple[str, ...], list[int]] = {}
+    for i, cf in enumerate(season.files):
+        groups.setdefault((cf.e, cf.g, cf.t, cf.l, cf.f, cf.x), []).append(i)
         crc32s.append(cf.crc32)
-    # we need to show every conflict to the user, so cant use a faster method like set()
-    for i, i_name, i_crc32 in zip(itertools.count(), names, crc32s):
-        for j, j_name, j_crc32 in zip(itertools.count(), names[i + 1:], crc32s[i + 1:]):
-            if i_name == j_name:
-                ok = False
-                logger.error(
-                    f'Found naming conflict between files with CRC32 0x{i_crc32} vs 0x{j_crc32} '
-                    f'(possibly at CSV line {i+2} and {i+j+2}).'
-                    )
+    # we need to show every conflict to the user, so expand each group of identical names into pairs
+    # the pairs are sorted to be reported in the same order as comparing all pairs one by one
+    conflicts = sorted(pair for idxs in groups.values() for pair in itertools.combinations(idxs, 2))
+    for i, j in conflicts:
+        ok = False
+        logger.error(
+            f'Found naming conflict between files with CRC32 0x{crc32s[i]} vs 0x{crc32s[j]} '
+            f'(possibly at CSV line {i+2} and {j+2}).'
+            )
     return ok
@@ -117,9 +117,6 @@ VID_SUFFIX_PATTERN = _rc(r'\[(?P<lang>.*)\]')
 ASS_INLINE_FONTNAME_BASE_PATTERN = _rc(r'\\fn([^\\}]+)')
 ASS_INLINE_STYLENAME_BASE_PATTERN = _rc(r'\\r([^\\}]+)')
 ASS_FILENAME_EARLY_PATTERN = _rc(r'^(?P<name>.*)(?P<idx>[0-9]{1,3}(\.[1-9]{1,2})?)[.-]?(?P<lang>(chs|cht|sc|tc)(&(jp|jap|jpn))?)?\.ass', _re.IGNORECASE)
-
-# NOTE this is a bytes regex instead of str, since we don't need to decode stderr
-DWEBP_STDERR_PARSE_REGEX = _rc(rb'can be decoded \(dimensions: (?P<width>[0-9]{1,5}) x (?P<height>[0-9]{1,5}) (?P<alpha> \(with alpha\))?. Format: (?P<mode>lossy|lossless)\).')
 ALBUM_HIRES_REGEX = _rc(r'(?P<b>16|24|32)bit_(?P<fs>48|96|192|384)kHz')
 POSSIBLE_CATALOG_REGEX = _rc(r'^[a-zA-z0-9][a-zA-z0-9\-_ ]+([0-9]~[0-9]{0,3})?$')
 CATALOG_MULTIDISC_REGEX = _rc(r'(?P<catalog>.+[0-9])(~[0-9]{1,3}|-([1-9]|0[1-9])|[a-z])$')
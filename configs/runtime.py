@@ -16,6 +16,9 @@ AD_LOG_FILENAME = f'AD-{TIMESTAMP}.log'
 AP_LOG_FILENAME = f'AP-{TIMESTAMP}.log'
 AR_LOG_FILENAME = f'AR-{TIMESTAMP}.log'
 
+SR_MANIFEST_FILENAME = 'SR-Manifest.json'
+AR_MANIFEST_FILENAME = 'AR-Manifest.json'
+
 VP_CSV_FILENAME = f'VP-{TIMESTAMP}.csv'
 VR_CSV_FILENAME = f'VR-{TIMESTAMP}.csv'
 SP_CSV_FILENAME = f'SP-{TIMESTAMP}.csv'
@@ -32,11 +32,6 @@ RAR_PATH : str = ''
 # all decompressed files will be immediately deleted after the program exits
 TEMP_DIRPATH_DECOMPRESS : str = '$TEMP'
 
-# the temporary directory for SR to create hardlinks
-# a relative path is relative to the drive root where the working files are located
-#! if using an absolute path, make sure the path is on the same partition as your working files
-TEMP_DIRNAME_HARDLINK : str = '@AC-Temp'
-
 # this is the output dir for SD
 # if left empty, the program will output to the same dir along side the input
 SD_WORKING_DIR: str = ''
@@ -47,7 +42,7 @@ AD_WORKING_DIR: str = ''
 
 # enable this option to attach an audio digest for each m2ts with audio tracks in VA.csv
 # this will make VD more accurate in matching the encoded MKV/MP4 to the original M2TS and then copy the naming
-# note that this will cause full reading m2ts files, significantly slowing down VA
+# note that this will cause full reading m2ts files, which is streamed so the memory cost stays small
 ENABLE_AUDIO_SAMPLES_IN_VA : bool = True
 
 # if your input got rejected by VP, you can add additional characters to be allowed here
@@ -84,6 +79,36 @@ MAX_NUM_CPU_WORKERS : int = 0
 # it will be automatically lowered to not exceed the number of physical CPU cores
 MAX_NUM_IO_WORKERS : int = 8
 
+# use at most this number of multi-proc workers to compare VR groups in parallel
+# the default value 0 means to use all physical CPU cores, and 1 means to compare groups one by one
+# the log of each group is still written in the group order
+MAX_NUM_VR_WORKERS : int = 0
+
+# SD/AD process at most this number of sources at the same time, sharing one pool of multi-proc workers
+# so the decompression/validation of the next sources overlaps with the transcoding of the current one
+# archives are still decompressed one at a time, and the log of each source is still written in the input order
+# 1 means to process sources one by one
+MAX_NUM_SOURCES_IN_FLIGHT : int = 3
+
+# AC keeps a persistent cache of the mediainfo/CRC32/audio digest of the files it has read
+# an entry is bound to the file identity (device, inode, size, modification time), so modifying a file invalidates it
+# this makes re-running VA/VP/VR/AD/SD/AR on the same unchanged files much faster
+ENABLE_FILE_CACHE : bool = True
+
+# the path to the cache database
+# if left empty, the cache is placed in the os-provided temp dir (see `tempfile.gettempdir()`)
+#! a relative path is relative to the script location, never to the current working directory
+#! you should use '$' to indicate an environment variable even if on Windows
+FILE_CACHE_FILEPATH : str = ''
+
+# the least recently used entries will be removed if the cache grows larger than this size (unit: MiB)
+FILE_CACHE_MAX_SIZE : int = 256
+
+# AR/SR write a manifest next to the log, remembering the identity and the check result of each file/album
+# on the next run, only the files/albums changed since then are checked again, the rest replay the remembered results
+# this makes re-checking a large root after a small fix much faster
+ENABLE_INCREMENTAL_CHECK : bool = True
+
 # whether to still enable multi-processing when ssd checker failed
 # it typically happens when you're using certain RAMDISK on Windows e.g. ImDisk
 # ssd checker cannot lookup the device type of such SCSI devices
@@ -99,6 +124,22 @@ ENABLE_VGMDB : bool = True
 ENABLE_MUSICBREAINZ : bool = False
 ENABLE_FREEDB : bool = False
 
+# AC keeps the VGMDB pages it has looked up in a cache next to the file cache
+# a page expires as VGMDB suggests (1 day by default, shorter if the page was edited recently)
+# so re-running AR on the same albums sends no request to VGMDB
+ENABLE_VGMDB_CACHE : bool = True
+
+# only use the cached VGMDB pages (including the expired ones) and never connect to VGMDB
+VGMDB_OFFLINE : bool = False
+
+# AR looks up multiple albums on VGMDB at once, sharing a single connection pool
+# but please be nice to VGMDB: no more than this number of requests per second are sent in total
+VGMDB_REQUESTS_PER_SECOND : float = 1.0
+VGMDB_MAX_CONNECTIONS : int = 4
+
+# the VGMDB site to connect, which can be pointed to a local server serving the recorded pages e.g. for testing
+VGMDB_BASE_URL : str = 'https://vgmdb.net'
+
 # proxy and user agent to connect outside
 #! refactoring vgmdb with requests has not been completed
 #! for now, you can only use http proxy, i.e. no socks5
@@ -188,25 +229,10 @@ cpu, ram = psutil.cpu_count(logical=False), psutil.virtual_memory().available //
 NUM_CPU_JOBS = MAX_NUM_CPU_WORKERS if MAX_NUM_CPU_WORKERS > 0 else cpu
 NUM_RAM_JOBS = min(cpu, max(ram // (MIN_RAM_PER_WORKER), 1))
 NUM_IO_JOBS = min(cpu, MAX_NUM_IO_WORKERS)
+NUM_VR_JOBS = min(cpu, MAX_NUM_VR_WORKERS) if MAX_NUM_VR_WORKERS > 0 else cpu
 del psutil, cpu, ram
 
 
-if TEMP_DIRNAME_HARDLINK:
-    from pathlib import Path
-    TEMP_DIR_PATH = Path(TEMP_DIRNAME_HARDLINK)
-    del Path
-else:
-    TEMP_DIR_PATH = None
-
-
-import os, pathlib
-if TEMP_DIRNAME_HARDLINK:
-    TEMP_DIR_HARDLINK = pathlib.Path(os.path.expandvars(TEMP_DIRNAME_HARDLINK))
-else:
-    TEMP_DIR_HARDLINK = pathlib.Path('@AC-TEMP')
-del os, pathlib, TEMP_DIRNAME_HARDLINK
-
-
 import os, pathlib
 if TEMP_DIRPATH_DECOMPRESS:
     TEMP_DIR_DECOMPRESS = pathlib.Path(os.path.expandvars(TEMP_DIRPATH_DECOMPRESS))
@@ -215,6 +241,16 @@ else:
 del os, pathlib, TEMP_DIRPATH_DECOMPRESS
 
 
+import os, pathlib, tempfile
+if FILE_CACHE_FILEPATH:
+    # an unset env var is left as is by `expandvars()`, so anchor the path to avoid a cache in every working dir
+    FILE_CACHE_PATH = pathlib.Path(__file__).resolve().parent.parent / os.path.expandvars(FILE_CACHE_FILEPATH)
+else:
+    FILE_CACHE_PATH = pathlib.Path(tempfile.gettempdir()) / 'AC-FileCache.sqlite3'
+VGMDB_CACHE_PATH = FILE_CACHE_PATH.with_name('AC-VGMDB.sqlite3')
+del os, pathlib, tempfile, FILE_CACHE_FILEPATH
+
+
 if not LANGUAGE:
     import locale
     LANGUAGE = locale.getdefaultlocale()[0]
@@ -1,26 +1,30 @@
 from __future__ import annotations
 
 import shutil
+import logging
+import threading
 import itertools
 import traceback
 from pathlib import Path
 from logging import Logger
-from typing import Iterable, Callable, Optional
-from operator import attrgetter
+from typing import Iterable, Callable, Optional, Any
 from multiprocessing import Pool
+from multiprocessing.pool import Pool as PoolType
+from concurrent.futures import ThreadPoolExecutor
 
 from langs import *
 from utils import *
 from configs import *
-from loggers import initLogger
+from loggers import initLogger, initBufferedLogger, replayLogRecords
 import configs.runtime as cr
 from .misc import handleResourceSrc
-from .image import ImageFile
-from .video import VideoFile
+from .image import ImageFile, toImageFileRecord
+from .video import VideoFile, toVideoFileRecord
+from .filerecord import FileRecord, toBareFileRecord
 from .scans import cleanScansFilenames
 from .naming import *
 from .dirgetter import proposeFilePath, initAlbumDraftDstParentDir
-from .albumfile import AlbumFile
+from .albumfile import AlbumFile, toAlbumFileRecord
 from .albuminfo import AlbumInfo
 
 
@@ -33,6 +37,7 @@ __all__ = [
     'matchTrackName',
     'matchIndex',
     'lookupVGMDB',
+    'lookupVGMDBConcurrently',
     'listAlbumDirs',
     'pickCoverArtPaths',
     'pickLogPath',
@@ -49,8 +54,9 @@ __all__ = [
     ]
 
 
-def _runJob(job: tuple[Callable, tuple]) -> bool:
-    return job[0](*job[1])
+def _runJob(job: tuple[Callable, tuple]) -> str:
+    '''Run the copy/transcode job, returning the CRC32 of its output or an empty string if failed.'''
+    return job[0](*job[1], ret_crc32=True)
 
 def matchAlbumName(pre: str|None, mid: str|None, seen_names: str|list[str]) -> bool:
     if isinstance(seen_names, str): seen_names = [seen_names]
@@ -104,6 +110,21 @@ def matchIndex(index: int|str, metadata_index: int|str) -> bool:
 
 
 
+def _listVGMDBCatalogQueries(album_info: AlbumInfo) -> list[str]:
+    queries = []
+    for catalog in album_info.catalogs:
+        # XXXX1234~5 => XXXX1234
+        # XXXX1234-1 XXXX1234-2 => XXXX1234
+        # XXXX1234-01 XXXX1234-02 => XXXX1234
+        # XXXX1234A XXXX1234B => XXXX1234
+        if (m := re.match(CATALOG_MULTIDISC_REGEX, catalog)): catalog = m['catalog']
+        if not catalog: continue
+        queries.append(catalog)
+    return queries
+
+
+
+
 def lookupVGMDB(album_info: AlbumInfo, logger):
 
     if album_info.is_hires:
@@ -113,13 +134,7 @@ def lookupVGMDB(album_info: AlbumInfo, logger):
     logger.info(f'Looking for "{album_info.root.name}" ...')
 
     album_ids = set()
-    for catalog in album_info.catalogs:
-        # XXXX1234~5 => XXXX1234
-        # XXXX1234-1 XXXX1234-2 => XXXX1234
-        # XXXX1234-01 XXXX1234-02 => XXXX1234
-        # XXXX1234A XXXX1234B => XXXX1234
-        if (m := re.match(CATALOG_MULTIDISC_REGEX, catalog)): catalog = m['catalog']
-        if not catalog: continue
+    for catalog in _listVGMDBCatalogQueries(album_info):
         if result := searchVGMDB(catalog):
             # TODO VGMDB API is unstable, temp fix here
             # this means our VGMDB lib is penetrated
@@ -197,6 +212,33 @@ def lookupVGMDB(album_info: AlbumInfo, logger):
 
 
 
+def _lookupVGMDBBuffered(album_info: AlbumInfo) -> list[logging.LogRecord]:
+    logger, buffer = initBufferedLogger(f'VGMDB-{threading.get_ident()}')
+    lookupVGMDB(album_info, logger)
+    return buffer.records
+
+
+
+
+def lookupVGMDBConcurrently(
+    album_infos: list[AlbumInfo],
+    logger: Logger,
+    callback: Callable[[AlbumInfo], Any]|None = None,
+    ):
+    '''
+    Look up the albums on VGMDB at once, sharing the rate limit and the requests in flight (see `utils.vgmdb`).
+    The catalog searches of all albums are issued up front, and the log of each album is written in the input order.
+    '''
+    prefetchVGMDBSearches(q for ai in album_infos if not ai.is_hires for q in _listVGMDBCatalogQueries(ai))
+    with ThreadPoolExecutor(max(VGMDB_MAX_CONNECTIONS, 1)) as executor:
+        futures = [executor.submit(_lookupVGMDBBuffered, album_info) for album_info in album_infos]
+        for album_info, future in zip(album_infos, futures):
+            replayLogRecords(logger, future.result())
+            if callback: callback(album_info)
+
+
+
+
 def listAlbumDirs(root: Path, logger: Logger, root_is_cds: bool = True) -> list[Path]:
     '''
     List all possible ALBUM directories under the "CDs" dir.
@@ -591,7 +633,15 @@ def sortAudioDirs2Discs(aud_dirs: Iterable[Path], logger: Logger, root: Path) ->
 
 
 
-def _mvAlbumCDs(cd_paths: list[list[Path]], dst_cds_dir: Path, logger: Logger, root: Path) -> list[tuple[Path, Path]]:
+def _mvAlbumCDs(
+    cd_paths: list[list[Path]],
+    dst_cds_dir: Path,
+    logger: Logger,
+    root: Path,
+    records: dict[Path, FileRecord],
+    pool: PoolType,
+    ) -> list[tuple[Path, Path, str]]:
+    '''`records` is the validated audio files from the workers, so we don't parse their mediainfo again.'''
 
     dsts: list[Path] = []
     jobs: list[tuple[Callable, tuple]] = []
@@ -599,14 +649,14 @@ def _mvAlbumCDs(cd_paths: list[list[Path]], dst_cds_dir: Path, logger: Logger, r
     for i, disc in enumerate(cd_paths, start=1):
         (dst_dir := dst_cds_dir / f'{i:03d}').mkdir(parents=True, exist_ok=True)
         for src in disc:
-            afile = AlbumFile(src)
+            afile = records[src] if src in records else toBareFileRecord(src)
             match afile.ext:
                 case 'mp3':
                     dst = (dst_dir / src.name).with_suffix('.mp3')
                     jobs.append((tryHardlinkThenCopy, (src, dst)))
                 case 'flac':
                     dst = (dst_dir / src.name).with_suffix('.flac')
-                    jobs.append((replaceIfSmaller, (src, dst, afile.bit)))
+                    jobs.append((replaceIfSmaller, (src, dst)))
                 case 'm4a':
                     if afile.format == 'alac':
                         dst = (dst_dir / src.name).with_suffix('.flac')
@@ -640,15 +690,14 @@ def _mvAlbumCDs(cd_paths: list[list[Path]], dst_cds_dir: Path, logger: Logger, r
             dsts.append(dst)
 
     paths = list(itertools.chain.from_iterable(cd_paths))
-    with Pool(NUM_CPU_JOBS) as pool:
-        logger.info(PROCESSING_QUEUED_JOBS_0)
-        succs = pool.map(_runJob, jobs)
+    logger.info(PROCESSING_QUEUED_JOBS_0)
+    succs = pool.map(_runJob, jobs)
     if DEBUG: assert len(paths) == len(jobs) == len(dsts) == len(succs)
 
-    ret: list[tuple[Path, Path]] = []
+    ret: list[tuple[Path, Path, str]] = []
     for succ, src, dst in zip(succs, paths, dsts):
         if succ:
-            ret.append((src, dst))
+            ret.append((src, dst, succ))
         else:
             logger.error(FAILED_TO_HANDLE_FILE_1.format(src.relative_to(root)))
 
@@ -916,7 +965,13 @@ def placeAlbums(ap_csv_path: Path, dst_root: Optional[Path] = None):
 
 
 
-def _mvAlbumBKs(bk_paths: Iterable[Path], dst_bks_dir: Path, logger: Logger, root: Path) -> list[tuple[Path, Path]]:
+def _mvAlbumBKs(
+    bk_paths: Iterable[Path],
+    dst_bks_dir: Path,
+    logger: Logger,
+    root: Path,
+    pool: PoolType,
+    ) -> list[tuple[Path, Path, str]]:
     bk_paths = set(bk_paths)
 
     if not bk_paths:
@@ -924,37 +979,42 @@ def _mvAlbumBKs(bk_paths: Iterable[Path], dst_bks_dir: Path, logger: Logger, roo
         return []
 
     dsts: list[Path] = []
-    jobs: list[tuple[Callable, tuple]] = []
+    copy_jobs: dict[int, tuple[Callable, tuple]] = {}
+    webp_jobs: dict[int, tuple[Path, Path, None]] = {}
 
-    for src in bk_paths:
+    for i, src in enumerate(bk_paths):
         match (suffix := src.suffix.lower()):
             case '.jpg'|'.jpeg':
                 dst = (dst_bks_dir / src.relative_to(root)).with_suffix('.jpg')
-                jobs.append((tryHardlinkThenCopy, (src, dst)))
+                copy_jobs[i] = (tryHardlinkThenCopy, (src, dst))
             case '.webp':
                 dst = (dst_bks_dir / src.relative_to(root)).with_suffix('.webp')
-                jobs.append((tryHardlinkThenCopy, (src, dst)))
+                copy_jobs[i] = (tryHardlinkThenCopy, (src, dst))
             case '.png'|'.bmp'|'.tif'|'.tiff':
                 dst = dst_bks_dir / src.relative_to(root).with_suffix('.webp')
-                jobs.append((toWebp, (src, dst)))
+                webp_jobs[i] = (src, dst, None)
             case _:  #! we still copy the file since the user thinks the extension is of scans through `AD_IMG_EXTS`
                 dst = dst_bks_dir / src.relative_to(root)
-                jobs.append((tryHardlinkThenCopy, (src, dst)))
+                copy_jobs[i] = (tryHardlinkThenCopy, (src, dst))
                 if DEBUG: logger.debug(GOT_BUT_EXPECT_ONE_OF_2.format(suffix, AD_IMG_EXTS))
                 logger.info(GOT_UNSUPP_FILE_1.format(src))
         dsts.append(dst)
 
-    with Pool(NUM_CPU_JOBS) as pool:
-        logger.info(PROCESSING_QUEUED_JOBS_0)
-        succs = pool.map(_runJob, jobs)
-    if DEBUG: assert len(bk_paths) == len(jobs) == len(dsts) == len(succs)
+    succs: list[str] = [''] * len(bk_paths)
+    logger.info(PROCESSING_QUEUED_JOBS_0)
+    copying = pool.map_async(_runJob, copy_jobs.values())
+    for i, succ in zip(webp_jobs.keys(), encodeWebps(list(webp_jobs.values()))):
+        succs[i] = succ
+    for i, succ in zip(copy_jobs.keys(), copying.get()):
+        succs[i] = succ
+    if DEBUG: assert len(bk_paths) == len(copy_jobs) + len(webp_jobs) == len(dsts) == len(succs)
 
-    records: dict[int|str, tuple[Path, Path]] = {}
+    records: dict[int|str, tuple[Path, Path, str]] = {}
     for succ, src, dst in zip(succs, bk_paths, dsts):
         if succ:
             fid = getFileID(dst)
             if DEBUG: assert fid not in records.keys(), GOT_IDENTICAL_FILE_1.format(src)
-            records[fid] = (src, dst)
+            records[fid] = (src, dst, succ)
         else:
             logger.error(FAILED_TO_HANDLE_FILE_1.format(src.relative_to(root)))
 
@@ -968,19 +1028,19 @@ def _mvAlbumBKs(bk_paths: Iterable[Path], dst_bks_dir: Path, logger: Logger, roo
         shutil.rmtree(dst_bks_dir, ignore_errors=True)
         return []
 
-    ret: list[tuple[Path, Path]] = []
+    ret: list[tuple[Path, Path, str]] = []
     for new_dst in listFile(dst_bks_dir):
-        if paths := records.get(getFileID(new_dst)):
-            src, dst = paths
-            ret.append((src, new_dst))
+        if record := records.get(getFileID(new_dst)):
+            src, dst, crc32 = record
+            ret.append((src, new_dst, crc32))
     return ret
 
 
 
 
-def _mvAlbumMVs(mv_paths: Iterable[Path], dst_mvs_dir: Path, logger: Logger, root: Path) -> list[tuple[Path, Path]]:
+def _mvAlbumMVs(mv_paths: Iterable[Path], dst_mvs_dir: Path, logger: Logger, root: Path) -> list[tuple[Path, Path, str]]:
 
-    records: dict[int|str, tuple[Path, Path]] = {}
+    records: dict[int|str, tuple[Path, Path, str]] = {}
 
     if not mv_paths:
         shutil.rmtree(dst_mvs_dir, ignore_errors=True)
@@ -988,10 +1048,10 @@ def _mvAlbumMVs(mv_paths: Iterable[Path], dst_mvs_dir: Path, logger: Logger, roo
 
     for src in mv_paths:
         dst = dst_mvs_dir / src.relative_to(root)
-        if tryHardlinkThenCopy(src, dst):
+        if crc32 := tryHardlinkThenCopy(src, dst, ret_crc32=True):
             fid = getFileID(dst)
             assert fid not in records.keys(), GOT_IDENTICAL_FILE_1.format(src)
-            records[fid] = (src, dst)
+            records[fid] = (src, dst, crc32)
         else:
             logger.error(FAILED_TO_HANDLE_FILE_1.format(src.relative_to(root)))
 
@@ -1004,25 +1064,37 @@ def _mvAlbumMVs(mv_paths: Iterable[Path], dst_mvs_dir: Path, logger: Logger, roo
         shutil.rmtree(dst_mvs_dir, ignore_errors=True)
         return []
 
-    ret: list[tuple[Path, Path]] = []
+    ret: list[tuple[Path, Path, str]] = []
     for new_dst in listFile(dst_mvs_dir):
-        if paths := records.get(getFileID(new_dst)):
-            src, dst = paths
-            ret.append((src, new_dst))
+        if record := records.get(getFileID(new_dst)):
+            src, dst, crc32 = record
+            ret.append((src, new_dst, crc32))
     return ret
 
 
 
 
-def processAlbumSourceDir(src_path: Path, dst_dir: Path, logger: Logger):
+def processAlbumSourceDir(
+    src_path: Path,
+    dst_dir: Path,
+    logger: Logger,
+    pool: Optional[PoolType] = None,
+    tmp_dir: Optional[Path] = None,
+    ):
     '''
     Process an album source from `src_path`, and place the processed files in `dst_dir`.
     An album source may be a directory or an archive file that contains one or more discs.
         Nested archives inside the dir or file are not supported for now.
+    `pool` may be shared with other sources processed at the same time, otherwise a pool is created for this source.
+    `tmp_dir` is where an archive source is decompressed to, which must be different between such sources.
     NOTE: the function assumes that all album files under the source are of the same album.
     NOTE: if they're from different albums, the function can still process them, but the output is unusable for now.
     '''
 
+    if pool is None:
+        with Pool(NUM_CPU_JOBS) as pool:
+            return processAlbumSourceDir(src_path, dst_dir, logger, pool, tmp_dir)
+
     if DEBUG: logger.debug(PROCESSING_2.format(src_path, dst_dir))
     else: logger.info(PROCESSING_1.format(src_path))
 
@@ -1044,9 +1116,10 @@ def processAlbumSourceDir(src_path: Path, dst_dir: Path, logger: Logger):
 
     # TODO: can we decompress archives inside the archive?
 
-    tmp_dir = TEMP_DIR_DECOMPRESS / AD_TMP_DIRNAME
+    tmp_dir = tmp_dir or (TEMP_DIR_DECOMPRESS / AD_TMP_DIRNAME)
     if isinstance(ret := handleResourceSrc(src_path, tmp_dir, logger), Path):
         remove_src: bool = (ret == tmp_dir)
+        src_path = ret
     else:
         logger.error(CANT_HANDLE_SRC_1.format(src_path))
         shutil.rmtree(dst_dir, ignore_errors=True)
@@ -1060,25 +1133,24 @@ def processAlbumSourceDir(src_path: Path, dst_dir: Path, logger: Logger):
 
     #* validate input files --------------------------------------------------------------------------------------------
 
-    with Pool(NUM_CPU_JOBS) as pool:
-
-        afs = [AlbumFile(path) for path in listFile(src_path, ext=AD_AUD_EXTS)]
-        a_vals = pool.map(attrgetter('is_valid'), afs)
-        val_afs = [f for valid, f in zip(a_vals, afs) if valid]
-        for f in set(afs).difference(val_afs):
-            logger.error(INVALID_FILE_1.format(f.path.relative_to(src_path)))
-
-        ifs = [ImageFile(path) for path in listFile(src_path, ext=AD_IMG_EXTS)]
-        i_vals = pool.map(attrgetter('is_valid'), ifs)
-        val_ifs = [f for valid, f in zip(i_vals, ifs) if valid]
-        for f in set(ifs).difference(val_ifs):
-            logger.error(INVALID_FILE_1.format(f.path.relative_to(src_path)))
-
-        vfs = [VideoFile(path) for path in listFile(src_path, ext=AD_VID_EXTS)]
-        v_vals = pool.map(attrgetter('is_valid'), vfs)
-        val_vfs = [f for valid, f in zip(v_vals, vfs) if valid]
-        for f in set(vfs).difference(val_vfs):
-            logger.error(INVALID_FILE_1.format(f.path.relative_to(src_path)))
+    # mediainfo parsing and decoding test both happen in workers, which only send back a compact record
+    afs = pool.map(toAlbumFileRecord, listFile(src_path, ext=AD_AUD_EXTS))
+    a_vals = [f.is_valid for f in afs]
+    val_afs = [f for valid, f in zip(a_vals, afs) if valid]
+    for f in set(afs).difference(val_afs):
+        logger.error(INVALID_FILE_1.format(f.path.relative_to(src_path)))
+
+    ifs = pool.map(toImageFileRecord, listFile(src_path, ext=AD_IMG_EXTS))
+    i_vals = [f.is_valid for f in ifs]
+    val_ifs = [f for valid, f in zip(i_vals, ifs) if valid]
+    for f in set(ifs).difference(val_ifs):
+        logger.error(INVALID_FILE_1.format(f.path.relative_to(src_path)))
+
+    vfs = pool.map(toVideoFileRecord, listFile(src_path, ext=AD_VID_EXTS))
+    v_vals = [f.is_valid for f in vfs]
+    val_vfs = [f for valid, f in zip(v_vals, vfs) if valid]
+    for f in set(vfs).difference(val_vfs):
+        logger.error(INVALID_FILE_1.format(f.path.relative_to(src_path)))
 
     if not all(a_vals + i_vals + v_vals):
         _cleanUp4Exit(e=SKIP_INVALID_SOURCE_1.format(src_path.name))
@@ -1096,30 +1168,31 @@ def processAlbumSourceDir(src_path: Path, dst_dir: Path, logger: Logger):
 
     #* transcode/move files --------------------------------------------------------------------------------------------
 
-    cd_paths_mapping: list[tuple[Path, Path]] = _mvAlbumCDs(cd_paths, dst_cds_dir, logger, src_path)
-    bk_paths_mapping: list[tuple[Path, Path]] = _mvAlbumBKs(bk_paths, dst_bks_dir, logger, src_path)
-    mv_paths_mapping: list[tuple[Path, Path]] = _mvAlbumMVs(mv_paths, dst_mvs_dir, logger, src_path)
+    afs_records = {f.path: f for f in val_afs}
+    cd_paths_mapping: list[tuple[Path, Path, str]] = _mvAlbumCDs(cd_paths, dst_cds_dir, logger, src_path, afs_records, pool)
+    bk_paths_mapping: list[tuple[Path, Path, str]] = _mvAlbumBKs(bk_paths, dst_bks_dir, logger, src_path, pool)
+    mv_paths_mapping: list[tuple[Path, Path, str]] = _mvAlbumMVs(mv_paths, dst_mvs_dir, logger, src_path)
 
     #* record files info -----------------------------------------------------------------------------------------------
 
     info_dicts: list[dict[str, str]] = []
-    for src, dst in cd_paths_mapping:
+    for src, dst, crc32 in cd_paths_mapping:
         info_dicts.append({
-            CRC32_CN: getCRC32(dst),
+            CRC32_CN: crc32,
             AD_FILE_TYPE_CN: '1',
             SD_ORIG_PATH_CN: src.relative_to(src_path.parent).as_posix(),
             SD_PROC_PATH_CN: dst.relative_to(dst_cds_dir).as_posix(),
             })
-    for src, dst in bk_paths_mapping:
+    for src, dst, crc32 in bk_paths_mapping:
         info_dicts.append({
-            CRC32_CN: getCRC32(dst),
+            CRC32_CN: crc32,
             AD_FILE_TYPE_CN: '2',
             SD_ORIG_PATH_CN: src.relative_to(src_path.parent).as_posix(),
             SD_PROC_PATH_CN: dst.relative_to(dst_bks_dir).as_posix(),
             })
-    for src, dst in mv_paths_mapping:
+    for src, dst, crc32 in mv_paths_mapping:
         info_dicts.append({
-            CRC32_CN: getCRC32(dst),
+            CRC32_CN: crc32,
             AD_FILE_TYPE_CN: '3',
             AD_ORIG_PATH_CN: src.relative_to(src_path.parent).as_posix(),
             AD_PROC_PATH_CN: dst.relative_to(dst_mvs_dir).as_posix(),
@@ -1134,7 +1207,26 @@ def processAlbumSourceDir(src_path: Path, dst_dir: Path, logger: Logger):
 
 
 
+def _processAlbumSourceDirBuffered(src_path: Path, dst_dir: Path, pool: PoolType, tmp_dir: Path) -> list[logging.LogRecord]:
+    '''Process the source with a buffered logger, whose records are returned even if the processing failed.'''
+    logger, buffer = initBufferedLogger(f'AD-{threading.get_ident()}')
+    try:
+        processAlbumSourceDir(src_path, dst_dir, logger, pool, tmp_dir)
+    except Exception as e:
+        if DEBUG: traceback.print_exc()
+        logger.error(UNEXP_ERR_IN_PROCESSING_2.format(src_path, e))
+    return buffer.records
+
+
+
+
 def processAlbumSourceDirs(input_paths: list[Path]):
+    '''
+    Process the sources in a pipeline: up to `MAX_NUM_SOURCES_IN_FLIGHT` sources are processed at the same time,
+    all sharing one long-lived pool, so the decompression/validation of the next sources overlaps with the
+    transcoding of the current one and the pool never drains at a source boundary.
+    The log of each source is written in the input order once it's done.
+    '''
 
     dst_parent = initAlbumDraftDstParentDir(input_paths=input_paths, script_path=Path(__file__).parent)
     if DEBUG: assert dst_parent, CANT_INIT_OUTPUT_DIR_0
@@ -1144,5 +1236,15 @@ def processAlbumSourceDirs(input_paths: list[Path]):
     logger.info(THE_OUTPUT_DIR_IS_1.format(dst_parent))
 
     w = len(str(len(input_paths)))
-    for i, path in enumerate(input_paths, start=1):
-        processAlbumSourceDir(path, dst_parent / AD_DIRNAME_3.format(TIMESTAMP, f'{i:0>{w}}', path.name), logger)
\ No newline at end of file
+    with Pool(NUM_CPU_JOBS) as pool, ThreadPoolExecutor(max(MAX_NUM_SOURCES_IN_FLIGHT, 1)) as executor:
+        futures = []
+        for i, path in enumerate(input_paths, start=1):
+            dst_dir = dst_parent / AD_DIRNAME_3.format(TIMESTAMP, f'{i:0>{w}}', path.name)
+            tmp_dir = TEMP_DIR_DECOMPRESS / f'{AD_TMP_DIRNAME}-{i:0>{w}}'
+            futures.append(executor.submit(_processAlbumSourceDirBuffered, path, dst_dir, pool, tmp_dir))
+        try:
+            for future in futures:
+                replayLogRecords(logger, future.result())
+        except BaseException:  # don't start the queued sources, e.g. on Ctrl-C
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
\ No newline at end of file
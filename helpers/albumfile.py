@@ -17,6 +17,7 @@ from configs import *
 import configs.runtime as cr
 from .misc import handleResourceSrc
 from .image import ImageFile
+from .filerecord import FileRecord, toBareFileRecord
 from .scans import cleanScansFilenames
 from .naming import *
 from .dirgetter import proposeFilePath
@@ -29,6 +30,7 @@ from pymediainfo import Track
 
 __all__ = [
     'AlbumFile',
+    'toAlbumFileRecord',
     ]
 
 
@@ -169,3 +171,14 @@ class AlbumFile:
             if self.atr.bit_depth:
                 return self.atr.bit_depth
         return 0
+
+
+
+
+def toAlbumFileRecord(path: Path|str) -> FileRecord:
+    '''Build and validate the AlbumFile in the worker, only sending back the compact record.'''
+    try:
+        f = AlbumFile(path)
+        return FileRecord(f.path, f.ext, f.format, int(f.bit), f.is_valid)
+    except Exception:
+        return toBareFileRecord(path)
@@ -1,10 +1,10 @@
 from __future__ import annotations
 
 import re
-from typing import Any
+from typing import Any, Callable
 from pathlib import Path
 from logging import Logger
-from multiprocessing import Pool
+from functools import partial, wraps
 
 from utils import *
 from langs import *
@@ -28,6 +28,19 @@ __all__ = [
 
 
 
+def _memoisedNaming(getter: Callable[[CoreFile], str]) -> Callable[[CoreFile], str]:
+    '''Memoise a naming property of CoreFile until the naming epoch changes.'''
+    field = getter.__name__
+
+    @wraps(getter)
+    def wrapper(self: CoreFile) -> str:
+        return self._memoNaming(field, getter)
+
+    return wrapper
+
+
+
+
 class CoreFile:
 
     '''
@@ -54,6 +67,10 @@ class CoreFile:
         self.__path: Path = path
         self.__mediainfo: MediaInfo = getMediaInfo(path)
 
+        # the resolved naming, valid until any naming change (see `bumpNamingEpoch()`)
+        self.__naming_epoch: int = -1
+        self.__naming_memo: dict[str, Any] = {}
+
         self.__season: hsn.Season|None = season
         if season: season.add(self, hook=True)
 
@@ -81,7 +98,8 @@ class CoreFile:
         return getattr(self.__mediainfo, __name)
 
     def __getstate__(self) -> dict:
-        return self.__dict__
+        # the naming epoch is per process, so the memoised naming must not travel to another process
+        return {**self.__dict__, '_CoreFile__naming_epoch': -1, '_CoreFile__naming_memo': {}}
 
     def __setstate__(self, state: dict):
         self.__dict__.update(state)
@@ -113,6 +131,7 @@ class CoreFile:
     #* output ----------------------------------------------------------------------------------------------------------
 
     @property
+    @_memoisedNaming
     def name(self) -> str:
         g = f'[{self.g}]'
         t = self.t
@@ -124,6 +143,7 @@ class CoreFile:
         return f'{g} {t} {f}{ql}{tl}{x}.{e}'.strip(string.whitespace + '/\\')
 
     @property
+    @_memoisedNaming
     def dst(self) -> str:
         relative_path = f'{self.l}/{self.name}'.strip(string.whitespace + '/\\')
         if self.__season:
@@ -140,6 +160,7 @@ class CoreFile:
     @parent.setter
     def parent(self, season: hsn.Season|None):
         self.__season = season
+        bumpNamingEpoch()
 
     @property
     def depends(self) -> CoreFile|None:
@@ -148,6 +169,7 @@ class CoreFile:
     @depends.setter
     def depends(self, depends: CoreFile|None):
         self.__depends = depends
+        bumpNamingEpoch()
 
     #* crc32 -----------------------------------------------------------------------------------------------------------
 
@@ -168,6 +190,7 @@ class CoreFile:
 
     # naming fields
     @property
+    @_memoisedNaming
     def g(self) -> str:
         if self.depends: return self.depends.g
         if g := getattr(self, GRPTAG_VAR): return g
@@ -178,8 +201,10 @@ class CoreFile:
     @g.setter
     def g(self, grptag: str):
         setattr(self, GRPTAG_VAR, normFullGroupTag(grptag))
+        bumpNamingEpoch()
 
     @property
+    @_memoisedNaming
     def t(self) -> str:
         if self.depends: return self.depends.t
         if t := getattr(self, TITLE_VAR): return t
@@ -190,8 +215,10 @@ class CoreFile:
     @t.setter
     def t(self, title: str):
         setattr(self, TITLE_VAR, normTitle(title))
+        bumpNamingEpoch()
 
     @property
+    @_memoisedNaming
     def l(self) -> str:
         if self.depends: return self.depends.l
         return getattr(self, LOCATION_VAR)
@@ -199,8 +226,10 @@ class CoreFile:
     @l.setter
     def l(self, location: str):
         setattr(self, LOCATION_VAR, normFullLocation(location))
+        bumpNamingEpoch()
 
     @property
+    @_memoisedNaming
     def c(self) -> str:
         if self.depends: return self.depends.c
         return getattr(self, CLASSIFY_VAR)
@@ -209,8 +238,10 @@ class CoreFile:
     def c(self, classification: str):
         if self.depends: self.depends.c = classification
         setattr(self, CLASSIFY_VAR, normClassification(classification))
+        bumpNamingEpoch()
 
     @property
+    @_memoisedNaming
     def i1(self) -> str:
         if self.depends: return self.depends.i1
         return getattr(self, IDX1_VAR)
@@ -218,8 +249,10 @@ class CoreFile:
     @i1.setter
     def i1(self, index: str):
         setattr(self, IDX1_VAR, normDecimal(index))
+        bumpNamingEpoch()
 
     @property
+    @_memoisedNaming
     def i2(self) -> str:
         if self.depends: return self.depends.i2
         return getattr(self, IDX2_VAR)
@@ -227,8 +260,10 @@ class CoreFile:
     @i2.setter
     def i2(self, index: str):
         setattr(self, IDX2_VAR, normDecimal(index))
+        bumpNamingEpoch()
 
     @property
+    @_memoisedNaming
     def s(self) -> str:
         if self.depends: return self.depends.s
         return getattr(self, SUPPLEMENT_VAR)
@@ -236,8 +271,10 @@ class CoreFile:
     @s.setter
     def s(self, supplement: str):
         setattr(self, SUPPLEMENT_VAR, normDesp(supplement))
+        bumpNamingEpoch()
 
     @property
+    @_memoisedNaming
     def f(self) -> str:
         if self.depends: return self.depends.f
         return getattr(self, FULLDESP_VAR)
@@ -249,19 +286,35 @@ class CoreFile:
         self.i2 = ''
         self.s = ''
         setattr(self, FULLDESP_VAR, normDesp(full_description))
+        bumpNamingEpoch()
 
     @property
+    @_memoisedNaming
     def x(self) -> str:
         return getattr(self, SUFFIX_VAR)
 
     @x.setter
     def x(self, suffix: str):
         setattr(self, SUFFIX_VAR, normFullSuffix(suffix))
+        bumpNamingEpoch()
 
     @property  # NOTE no setter for read-only extension
     def e(self) -> str:
         return self.ext
 
+    @property
+    @_memoisedNaming
+    def naming(self) -> NamingSnapshot:
+        return NamingSnapshot(self.g, self.t, self.l, self.c, self.i1, self.i2, self.s, self.f, self.x, self.e)
+
+    def _memoNaming(self, field: str, getter: Callable[[CoreFile], Any]) -> Any:
+        if self.__naming_epoch != (epoch := getNamingEpoch()):
+            self.__naming_memo = {}
+            self.__naming_epoch = epoch
+        if (value := self.__naming_memo.get(field)) is None:
+            value = self.__naming_memo[field] = getter(self)
+        return value
+
     def updateFromNamingDict(self, naming_dict: dict[str, str]):
         setattr(self, CRC32_VAR, naming_dict.pop(CRC32_VAR, ''))
         setattr(self, GRPTAG_VAR, naming_dict.pop(GRPTAG_VAR, ''))
@@ -274,6 +327,7 @@ class CoreFile:
         setattr(self, FULLDESP_VAR, naming_dict.pop(FULLDESP_VAR, ''))
         setattr(self, SUFFIX_VAR, naming_dict.pop(SUFFIX_VAR, ''))
         setattr(self, ENABLE_VAR, naming_dict.pop(ENABLE_VAR, ''))
+        bumpNamingEpoch()
 
     def copyNaming(self, cf: CF):
         self.l = cf.l
@@ -426,12 +480,14 @@ class CoreFile:
     #* passive q/tlabels -----------------------------------------------------------------------------------------------
 
     @property
+    @_memoisedNaming
     def qlabel(self) -> str:
         if self.depends: return self.depends.qlabel
         if self.__cached_qlabel == None: self.__cached_qlabel = fmtQualityLabel(self, self.logger)
         return self.__cached_qlabel
 
     @property
+    @_memoisedNaming
     def tlabel(self) -> str:
         if self.depends: return self.depends.tlabel
         if self.__cached_tlabel == None: self.__cached_tlabel = fmtTrackLabel(self, self.logger)
@@ -585,23 +641,12 @@ def toCoreFiles(
     init_audio_samples: bool = False,
     mp: int = NUM_IO_JOBS
     ) -> list[CF]:
+    '''`mp` is the max number of workers per SSD, while each HDD is always read sequentially.'''
 
     logger.info(LOADING_WTIH_N_WORKERS_1.format(mp))
     paths = [Path(path) for path in paths]
-    if mp > 1:
-        with Pool(mp) as pool:
-            ret = []
-            kwargs = {'init_crc32': init_crc32, 'init_audio_samples': init_audio_samples}
-            for path in paths:
-                ret.append(pool.apply_async(CoreFile, kwds=kwargs))
-            pool.close()
-            pool.join()
-        cfs = [r.get() for r in ret]
-    else:
-        cfs = []
-        for path in paths:
-            cfs.append(CF(path, init_crc32=init_crc32))
-    return cfs
+    init = partial(CoreFile, init_crc32=init_crc32, init_audio_samples=init_audio_samples)
+    return mapPerDevice(init, paths, mp=mp, logger=logger)
 
 
 
@@ -613,26 +658,13 @@ def toCoreFilesWithTqdm(
     init_audio_samples: bool = False,
     mp: int = NUM_IO_JOBS
     ) -> list[CF]:
+    '''`mp` is the max number of workers per SSD, while each HDD is always read sequentially.'''
 
     logger.info(LOADING_WTIH_N_WORKERS_1.format(mp))
     paths = [Path(path) for path in paths]
+    init = partial(CoreFile, init_crc32=init_crc32, init_audio_samples=init_audio_samples)
     with logging_redirect_tqdm([logger]):
         pbar = tqdm.tqdm(total=len(paths), desc='Loading', unit='file', ascii=True, dynamic_ncols=True)
-        if mp > 1:
-            with Pool(mp) as pool:
-                ret = []
-                callback = lambda _: pbar.update(1)
-                kwargs = {'path': '', 'init_crc32': init_crc32, 'init_audio_samples': init_audio_samples}
-                for path in paths:
-                    (kwds := kwargs.copy())['path'] = path
-                    ret.append(pool.apply_async(CoreFile, kwds=kwds, callback=callback))
-                pool.close()
-                pool.join()
-            cfs = [r.get() for r in ret]
-        else:
-            cfs = []
-            for path in paths:
-                cfs.append(CF(path=path, init_crc32=init_crc32, init_audio_samples=init_audio_samples))
-                pbar.update(1)
+        cfs = mapPerDevice(init, paths, mp=mp, callback=lambda _: pbar.update(1), logger=logger)
         pbar.close()
     return cfs
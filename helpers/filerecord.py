@@ -0,0 +1,41 @@
+from pathlib import Path
+
+
+__all__ = [
+    'FileRecord',
+    'toBareFileRecord',
+    ]
+
+
+
+
+class FileRecord:
+
+    '''
+    FileRecord is a compact summary of AlbumFile/ImageFile/VideoFile.
+    It's built and validated in the worker, so no MediaInfo object travels between processes.
+    '''
+
+    __slots__ = ('path', 'ext', 'format', 'bit', 'is_valid', 'width', 'height')
+
+    def __init__(self, path: Path, ext: str, format: str = '', bit: int = 0, is_valid: bool = False,
+                 width: int = 0, height: int = 0):
+        self.path: Path = path
+        self.ext: str = ext
+        self.format: str = format
+        self.bit: int = bit
+        self.is_valid: bool = is_valid
+        # the dimensions of images, so the transcoding needs not probe the file again
+        self.width: int = width
+        self.height: int = height
+
+    def __repr__(self) -> str:
+        return f'FileRecord({self.path}, {self.format}, {self.bit}, {self.is_valid})'
+
+
+
+
+def toBareFileRecord(path: Path|str) -> FileRecord:
+    '''Return an invalid record with only the path and extension known.'''
+    path = Path(path).resolve()
+    return FileRecord(path, path.suffix.lower().lstrip('.'))
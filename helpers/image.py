@@ -7,11 +7,13 @@ from pathlib import Path
 from utils import *
 from langs import *
 from configs import *
+from .filerecord import FileRecord, toBareFileRecord
 from pymediainfo import Track
 
 
 __all__ = [
     'ImageFile',
+    'toImageFileRecord',
     ]
 
 
@@ -31,6 +33,7 @@ class ImageFile:
         self.__path: Path = path
         self.__mediainfo: MediaInfo = getMediaInfo(path)
         self.__ffprobe: dict|None = None
+        self.__webp_info: WebpInfo|None = None
         self.__crc32: str|None = None
 
     #* built-in methods override ---------------------------------------------------------------------------------------
@@ -117,13 +120,19 @@ class ImageFile:
         if self.__ffprobe == None: self.__ffprobe = FFprobe(self.path)
         return self.__ffprobe
 
+    @property
+    def webp_info(self) -> WebpInfo|None:
+        '''The headers of a WebP file, parsed in-process without decoding.'''
+        if self.__webp_info is None: self.__webp_info = readWebpInfo(self.path)
+        return self.__webp_info
+
     #* mediainfo -------------------------------------------------------------------------------------------------------
 
     @property
     def width(self) -> int:
         if self.is_image:
             if self.format == 'webp':
-                return self.ffprobe.get('streams', [{}])[0].get('width', 0)
+                return self.webp_info.width if self.webp_info else 0
             else:
                 return int(self.itr.width) if self.itr.width else 0
         else:
@@ -133,8 +142,19 @@ class ImageFile:
     def height(self) -> int:
         if self.is_image:
             if self.format == 'webp':
-                return self.ffprobe.get('streams', [{}])[0].get('height', 0)
+                return self.webp_info.height if self.webp_info else 0
             else:
                 return int(self.itr.height) if self.itr.height else 0
         else:
             return 0
+
+
+
+
+def toImageFileRecord(path: Path|str) -> FileRecord:
+    '''Build and validate the ImageFile in the worker, only sending back the compact record.'''
+    try:
+        f = ImageFile(path)
+        return FileRecord(f.path, f.ext, f.format, 0, f.is_valid, f.width, f.height)
+    except Exception:
+        return toBareFileRecord(path)
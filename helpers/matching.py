@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import bisect
+from typing import Iterable
+from collections import Counter
+
+from utils import *
+from configs import *
+import helpers.corefile as hcf
+
+
+__all__ = [
+    'VideoMatchingIndex',
+    ]
+
+
+
+
+class VideoMatchingIndex:
+
+    '''
+    VideoMatchingIndex indexes a group of CoreFiles by chapter timestamps, audio digest and duration,
+    so finding the counterparts of a file costs about O(log n) rather than a scan over the whole group.
+    A matched file is removed in O(1) and will never be returned again.
+    Candidates are always returned in the input order, the same as a plain scan over the input list.
+
+    * duration: sorted and looked up within the tolerance window by bisect
+    * chapter timestamps: hashed by (number of chapters, the quantised last timestamp),
+        then looked up in the neighbouring buckets and verified by `matchMenuTimeStamps()`
+    * audio digest: inverted index from (max, point) to files, only files sharing enough points are
+        verified by `cmpAudioSamples()`, built on the first lookup from the files not matched by then
+    '''
+
+    def __init__(
+        self,
+        cfs: Iterable[hcf.CF],
+        enable_audio_samples: bool = ENABLE_AUDIO_SAMPLES_IN_VA,
+        threshold: int = SAME_DURATION_THRESHOLD,
+        audio_threshold: int = 4,
+        ):
+
+        self.__cfs: list[hcf.CF] = list(cfs)
+        self.__order: dict[int, int] = {id(cf): i for i, cf in enumerate(self.__cfs)}
+        self.__removed: set[int] = set()
+        self.__threshold = threshold
+        self.__audio_threshold = audio_threshold
+
+        # duration: sorted (duration, order) and the key list for bisect
+        self.__durations = sorted((cf.duration, i) for i, cf in enumerate(self.__cfs))
+        self.__duration_keys = [d for d, _ in self.__durations]
+
+        # chapter timestamps: the first menu track only, same as the old matching
+        # the bucket width is larger than the threshold, so two matching timestamps are at most 1 bucket apart
+        self.__menu_width = threshold + 1
+        self.__menus: dict[int, list[int]] = {}
+        self.__menu_buckets: dict[tuple[int, int], list[int]] = {}
+        for i, cf in enumerate(self.__cfs):
+            if not cf.menu_tracks: continue
+            self.__menus[i] = timestamps = cf.menu_timestamps[0]
+            self.__menu_buckets.setdefault(self.__menuKey(timestamps), []).append(i)
+
+        # audio digest: (max, point) -> {order: count of this point}
+        # the digest decodes the audio, so it's only built on the first lookup and for the files not yet matched
+        self.__enable_audio_samples = enable_audio_samples
+        self.__samples: dict[int, str] = {}
+        self.__samples_index: dict[tuple[int, int], dict[int, int]]|None = None
+
+    def __menuKey(self, timestamps: list[int], shift: int = 0) -> tuple[int, int]:
+        last = timestamps[-1] if timestamps else 0
+        return (len(timestamps), last // self.__menu_width + shift)
+
+    def __buildAudioIndex(self) -> dict[tuple[int, int], dict[int, int]]:
+        self.__samples_index = {}
+        if not self.__enable_audio_samples: return self.__samples_index
+        for i, cf in enumerate(self.__cfs):
+            if id(cf) in self.__removed or not (samples := cf.audio_samples): continue
+            self.__samples[i] = samples
+            max_value, *points = [int(s) for s in samples.split('|')]
+            for point, count in Counter(points).items():
+                self.__samples_index.setdefault((max_value, point), {})[i] = count
+        return self.__samples_index
+
+    def __alive(self, idxs: Iterable[int]) -> list[hcf.CF]:
+        return [self.__cfs[i] for i in sorted(set(idxs)) if id(self.__cfs[i]) not in self.__removed]
+
+    def __contains__(self, cf: hcf.CF) -> bool:
+        return id(cf) in self.__order and id(cf) not in self.__removed
+
+    def remove(self, cf: hcf.CF):
+        self.__removed.add(id(cf))
+
+    @property
+    def remaining(self) -> list[hcf.CF]:
+        return [cf for cf in self.__cfs if id(cf) not in self.__removed]
+
+    def findByDuration(self, duration: int, require_duration: bool = True) -> list[hcf.CF]:
+        lo = bisect.bisect_left(self.__duration_keys, duration - self.__threshold)
+        hi = bisect.bisect_right(self.__duration_keys, duration + self.__threshold)
+        idxs = [i for _, i in self.__durations[lo:hi]]
+        if require_duration: idxs = [i for i in idxs if self.__cfs[i].has_duration]
+        return self.__alive(idxs)
+
+    def findByMenu(self, timestamps: list[int]) -> list[hcf.CF]:
+        idxs = []
+        for shift in (-1, 0, 1):
+            for i in self.__menu_buckets.get(self.__menuKey(timestamps, shift), []):
+                if matchMenuTimeStamps(timestamps, self.__menus[i], self.__threshold):
+                    idxs.append(i)
+        return self.__alive(idxs)
+
+    def findByAudioSamples(self, samples: str) -> list[hcf.CF]:
+        if not samples: return []
+        samples_index = self.__samples_index if self.__samples_index is not None else self.__buildAudioIndex()
+        max_value, *points = [int(s) for s in samples.split('|')]
+        # count the shared points, a match needs a common run longer than the threshold, so at least this many
+        scores: Counter[int] = Counter()
+        for point, count in Counter(points).items():
+            for i, n in samples_index.get((max_value, point), {}).items():
+                scores[i] += min(count, n)
+        idxs = [i for i, score in scores.items() if score > self.__audio_threshold]
+        idxs = [i for i in idxs if cmpAudioSamples(samples, self.__samples[i], self.__audio_threshold)]
+        return self.__alive(idxs)
@@ -4,9 +4,9 @@ import os
 import re
 import shutil
 import itertools
+import threading
 from pathlib import Path
 from logging import Logger
-from concurrent.futures import ProcessPoolExecutor
 from typing import Callable, Optional, Iterable
 import traceback
 import contextlib
@@ -16,8 +16,6 @@ from langs import *
 from configs import *
 from utils import *
 
-import ssd_checker
-
 
 __all__ = [
     'wrapTrackBack',
@@ -26,14 +24,17 @@ __all__ = [
     'printUsage',
     'printCheckerEnding',
     'filterOutCDsScans',
-    'isSSD',
-    'getCRC32MultiProc',
     'filterVxFilePaths',
     'guessVolNumsFromPaths',
     'handleResourceSrc',
     ]
 
 
+# archives are decompressed one at a time, so sources processed at the same time neither compete for the disk
+# nor prompt for passwords together
+_DECOMPRESSING = threading.Lock()
+
+
 
 
 def wrapTrackBack(func: Callable[[list[Path]], None], args: list[str]):
@@ -153,38 +154,6 @@ def filterOutCDsScans(src_paths: list[Path]):
 
 
 
-def isSSD(path: Path, logger: Logger|None = None) -> bool:
-    try:
-        ret = ssd_checker.is_ssd(path.resolve().as_posix())
-        if logger: logger.debug(FOUND_SSD_1.format(path) if ret else FOUND_HDD_1.format(path))
-        return ret
-    except KeyError:
-        if logger: logger.debug(SSD_CHECKER_KEY_ERROR_1.format(path))
-        # this happens when the input path is an SCSI device which is not listed as system physical drives
-        return ENABLE_MULTI_PROC_IF_UNSURE
-    except Exception as e:
-        if logger: logger.debug(SSD_CHECKER_UNK_ERROR_2.format(e, path))
-        return ENABLE_MULTI_PROC_IF_UNSURE
-
-
-
-
-def getCRC32MultiProc(paths: Path|list[Path], logger: Logger|None = None) -> int:
-    if isinstance(paths, Path): paths = [paths]
-    futures = []
-    with ProcessPoolExecutor(NUM_IO_JOBS) as exe:
-        for path in paths:
-            futures.append(exe.submit(isSSD, path, logger=logger))
-    is_ssd_list = [f.result() for f in futures]
-    if logger: logger.debug(CRC32_MP_GOT_N_OF_N_ON_SSD_2.format(sum(is_ssd_list), len(is_ssd_list)))
-    if all(is_ssd_list):
-        return NUM_IO_JOBS
-    else:
-        return 1
-
-
-
-
 def filterVxFilePaths(src_path: Path, logger: Optional[Logger] = None) -> list[Path]:
 
     if logger: logger.info(VP_LOCATING_0)
@@ -267,8 +236,9 @@ def handleResourceSrc(src: Path, tmp: Path, logger: Optional[Logger] = None) ->
             try:
                 assert not tmp.is_file()
                 tmp.mkdir(parents=True, exist_ok=True)
-                if extractArcWithPwdPrompt(src, tmp) != None:
-                    return tmp
+                with _DECOMPRESSING:
+                    if extractArcWithPwdPrompt(src, tmp) != None:
+                        return tmp
             except:
                 if logger: logger.error(DECOMPRESS_FAILED_2.format(src, tmp))
                 shutil.rmtree(tmp, ignore_errors=True)
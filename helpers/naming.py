@@ -3,6 +3,7 @@ from __future__ import annotations
 import re
 from logging import Logger
 from pathlib import PurePath
+from typing import Iterable, NamedTuple
 
 from utils import *
 from langs import *
@@ -26,7 +27,12 @@ __all__ = [
     'normSingleSuffix',
     'normFullSuffix',
     'splitGroupTag',
+    'NamingSnapshot',
+    'getNamingEpoch',
+    'bumpNamingEpoch',
     'cmpCoreFileNaming',
+    'getCoreFileNamingKey',
+    'groupCoreFilesByNaming',
     'cleanNamingDicts',
     'composeFullDesp',
     'decomposeFullDesp',
@@ -165,19 +171,69 @@ def splitGroupTag(chars: str, clean: bool = True, remove_empty: bool = True) ->
 
 
 
+class NamingSnapshot(NamedTuple):
+
+    '''The resolved naming fields of a CoreFile, in the same order as `cmpCoreFileNaming()`.'''
+
+    g: str
+    t: str
+    l: str
+    c: str
+    i1: str
+    i2: str
+    s: str
+    f: str
+    x: str
+    e: str
+
+
+
+
+# increased on any change that may affect the naming of any CoreFile, so all memoised naming is dropped at once
+# the resolution walks through depends/parent, so a per-file flag could not tell when a file is affected
+_naming_epoch: int = 0
+
+
+
+
+def getNamingEpoch() -> int:
+    return _naming_epoch
+
+
+
+
+def bumpNamingEpoch():
+    '''Invalidate the memoised naming of all CoreFiles.'''
+    global _naming_epoch
+    _naming_epoch += 1
+
+
+
+
 def cmpCoreFileNaming(a: hcf.CF, b: hcf.CF) -> list[bool]:
-    ret = [False] * 10
-    if a.g == b.g: ret[0] = True  # compare group name
-    if a.t == b.t: ret[1] = True  # compare title
-    if a.l == b.l: ret[2] = True  # compare location
-    if a.c == b.c: ret[3] = True  # compare classification
-    if a.i1 == b.i1: ret[4] = True  # compare main index
-    if a.i2 == b.i2: ret[5] = True  # compare sub index
-    if a.s == b.s: ret[6] = True  # compare supplementary description
-    if a.f == b.f: ret[7] = True  # compare full description
-    if a.x == b.x: ret[8] = True  # compare suffix
-    if a.e == b.e: ret[9] = True  # compare extension
-    return ret
+    # compare group name, title, location, classification, main/sub index,
+    # supplementary/full description, suffix and extension
+    return [u == v for u, v in zip(a.naming, b.naming)]
+
+
+
+
+def getCoreFileNamingKey(cf: hcf.CF, length: int = 10) -> tuple[str, ...]:
+    '''
+    Return the first `length` naming fields of the file.
+    Two files have the same key iff `all(cmpCoreFileNaming(a, b)[:length])`.
+    '''
+    return tuple(cf.naming[:length])
+
+
+
+
+def groupCoreFilesByNaming(cfs: Iterable[hcf.CF], length: int) -> dict[tuple[str, ...], list[hcf.CF]]:
+    '''Group the files by the first `length` naming fields, keeping the input order in each group.'''
+    groups: dict[tuple[str, ...], list[hcf.CF]] = {}
+    for cf in cfs:
+        groups.setdefault(getCoreFileNamingKey(cf, length), []).append(cf)
+    return groups
 
 
 
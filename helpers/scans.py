@@ -1,24 +1,25 @@
 import os
 import shutil
 import logging
-import difflib
-import platform
+import threading
 import traceback
 import itertools
 from pathlib import Path
 from logging import Logger
-from operator import attrgetter
 from typing import Callable, Iterable, Optional
+from contextlib import nullcontext
 from multiprocessing import Pool
+from multiprocessing.pool import Pool as PoolType
+from concurrent.futures import ThreadPoolExecutor
 
 from langs import *
 from utils import *
 from configs import *
 from checkers.scans import chkScansNaming, chkScansFiles
 from utils.fileutils import listFile, listDir
-from loggers import initLogger
+from loggers import initLogger, initBufferedLogger, replayLogRecords
 from .summaries import logScansSummary
-from .image import ImageFile
+from .image import ImageFile, toImageFileRecord
 from .misc import handleResourceSrc
 from .dirgetter import *
 from .naming import *
@@ -42,8 +43,9 @@ __all__ = [
 
 
 
-def _runJob(job: tuple[Callable, tuple]) -> bool:
-    return job[0](*job[1])
+def _runJob(job: tuple[Callable, tuple]) -> str:
+    '''Run the copy/transcode job, returning the CRC32 of its output or an empty string if failed.'''
+    return job[0](*job[1], ret_crc32=True)
 
 
 
@@ -67,6 +69,7 @@ def cleanScansFilenames(scans_dir: Path, logger: Logger):
         files = listFile(dir_path, rglob=False, ext=ALL_EXTS_IN_SCANS)
         for file in files:
             file.rename(file.with_suffix(file.suffix.lower()))
+        invalidateDirTree(dir_path)
 
         files = listFile(dir_path, rglob=False, ext=ALL_EXTS_IN_SCANS)
         file_groups_by_ext: dict[str, list[Path]] = {}
@@ -85,21 +88,9 @@ def cleanScansFilenames(scans_dir: Path, logger: Logger):
                 lower_filenames.append(file.name.lower())
                 lower2orig_filename_mapping[file.name.lower()] = file.name
 
-            groups: list[set[str]] = []
-            for i, lower_filename in enumerate(lower_filenames):
-                # using [i:] make the matching return a list at least containing itself
-                # using a cutoff 0.5 to make matches such as '01' vs '02'
-                matches = difflib.get_close_matches(
-                    lower_filename, lower_filenames[i:], n=len(lower_filenames[i:]), cutoff=0.5
-                    )
-                added = False
-                for group in groups:
-                    if any((match in group) for match in matches):
-                        group.update(matches)
-                        added = True
-                        break
-                if not added:
-                    groups.append(set(matches))
+            # names of the same template (e.g. 'p001'/'p002') are grouped without pairwise comparisons
+            # using a cutoff 0.5 to make matches such as '01' vs '02'
+            groups = groupSimilarNames(lower_filenames, cutoff=0.5)
 
             if DEBUG:
                 for g1, g2 in itertools.combinations(groups, 2):
@@ -122,6 +113,7 @@ def cleanScansFilenames(scans_dir: Path, logger: Logger):
                         new_path = dir_path / (new_name := old_name[prewidth:len(old_name) - len(ext) - endwidth] + ext)
                         old_path.rename(new_path)
                         logger.info(RENAMED_2.format(old_path, new_path.name))
+                    invalidateDirTree(dir_path)
 
 
 
@@ -155,7 +147,22 @@ def getScansConfig(possible_paths: list[str|Path], logger: Logger|None = None) -
 
 
 
-def processScansSource(src_path: Path, dst_dir: Path, logger: Logger):
+def processScansSource(
+    src_path: Path,
+    dst_dir: Path,
+    logger: Logger,
+    pool: Optional[PoolType] = None,
+    tmp_dir: Optional[Path] = None,
+    ):
+    '''
+    Process a scans source from `src_path`, and place the processed files in `dst_dir`.
+    `pool` may be shared with other sources processed at the same time, otherwise a pool is created for this source.
+    `tmp_dir` is where an archive source is decompressed to, which must be different between such sources.
+    '''
+
+    if pool is None:
+        with Pool(NUM_CPU_JOBS) as pool:
+            return processScansSource(src_path, dst_dir, logger, pool, tmp_dir)
 
     if DEBUG: logger.debug(PROCESSING_2.format(src_path, dst_dir))
     else: logger.info(PROCESSING_1.format(src_path))
@@ -174,7 +181,7 @@ def processScansSource(src_path: Path, dst_dir: Path, logger: Logger):
 
     #* check input, decompress if required -----------------------------------------------------------------------------
 
-    tmp_dir = TEMP_DIR_DECOMPRESS / SD_TMP_DIRNAME
+    tmp_dir = tmp_dir or (TEMP_DIR_DECOMPRESS / SD_TMP_DIRNAME)
     if ret := handleResourceSrc(src_path, tmp_dir, logger):
         remove_src: bool = (ret == tmp_dir)
         src_path = ret
@@ -185,10 +192,9 @@ def processScansSource(src_path: Path, dst_dir: Path, logger: Logger):
 
     #* validate input files  -------------------------------------------------------------------------------------------
 
-    pool = Pool(NUM_CPU_JOBS)
-
-    ifs = [ImageFile(path) for path in listFile(src_path, ext=SD_IMG_EXTS)]
-    vals = pool.map(attrgetter('is_valid'), ifs)
+    # mediainfo parsing and decoding test both happen in workers, which only send back a compact record
+    ifs = pool.map(toImageFileRecord, listFile(src_path, ext=SD_IMG_EXTS))
+    vals = [f.is_valid for f in ifs]
     val_ifs = [file for (valid, file) in zip(vals, ifs) if valid]
 
     for file in set(ifs).difference(val_ifs):
@@ -207,29 +213,38 @@ def processScansSource(src_path: Path, dst_dir: Path, logger: Logger):
     #* transcode/move files --------------------------------------------------------------------------------------------
 
     dsts: list[Path] = []
-    jobs: list[tuple[Callable, tuple]] = []
-    for img in val_ifs:
+    copy_jobs: dict[int, tuple[Callable, tuple]] = {}
+    webp_jobs: dict[int, tuple[Path, Path, tuple[int, int]]] = {}
+    for i, img in enumerate(val_ifs):
         match img.ext:
             case 'jpg'|'jpeg':
                 dst = (dst_scans_dir / img.path.relative_to(src_path)).with_suffix('.jpg')
-                jobs.append((tryHardlinkThenCopy, (img.path, dst)))
+                copy_jobs[i] = (tryHardlinkThenCopy, (img.path, dst))
             case 'webp':
                 dst = (dst_scans_dir / img.path.relative_to(src_path)).with_suffix('.webp')
-                jobs.append((tryHardlinkThenCopy, (img.path, dst)))
+                copy_jobs[i] = (tryHardlinkThenCopy, (img.path, dst))
             case 'png'|'bmp'|'tif'|'tiff':
                 dst = dst_scans_dir / img.path.relative_to(src_path).with_suffix('.webp')
-                jobs.append((toWebp, (img.path, dst)))
+                webp_jobs[i] = (img.path, dst, (img.width, img.height))
             case _:  #! we still copy the file since the user thinks the extension is of scans through `SD_IMG_EXTS`
                 dst = dst_scans_dir / img.path.relative_to(src_path)
-                jobs.append((tryHardlinkThenCopy, (img.path, dst)))
+                copy_jobs[i] = (tryHardlinkThenCopy, (img.path, dst))
                 if DEBUG: logger.debug(GOT_BUT_EXPECT_ONE_OF_2.format(img.ext, SD_IMG_EXTS))
                 logger.info(GOT_UNSUPP_FILE_1.format(img.path))
         dsts.append(dst)
 
     logger.info(PROCESSING_QUEUED_JOBS_0)
-    succs = pool.map(_runJob, jobs)
+    # copying is mostly I/O, so it runs in the pool alongside the encoding, which schedules its own cwebp processes
+    copying = pool.map_async(_runJob, copy_jobs.values())
+    succs: list[str] = [''] * len(val_ifs)
+    for i, succ in zip(webp_jobs.keys(), encodeWebps(list(webp_jobs.values()))):
+        succs[i] = succ
+    for i, succ in zip(copy_jobs.keys(), copying.get()):
+        succs[i] = succ
     if DEBUG: assert len(succs) == len(val_ifs) == len(dsts)
-    crc32_to_orig_path: dict[str, Path] = {getCRC32(dst): img.path for (img, dst, s) in zip(val_ifs, dsts, succs) if s}
+    crc32_to_orig_path: dict[str, Path] = {s: img.path for (img, s) in zip(val_ifs, succs) if s}
+    # renaming keeps the file id, so the CRC32s can be carried along without hashing the outputs again
+    fid_to_crc32: dict[int|str, str] = {getFileID(dst): s for (dst, s) in zip(dsts, succs) if s}
 
     for img in (img for (img, succ) in zip(val_ifs, succs) if not succ):
         logger.error(FAILED_TO_HANDLE_FILE_1.format(img.path.relative_to(src_path)))
@@ -253,7 +268,7 @@ def processScansSource(src_path: Path, dst_dir: Path, logger: Logger):
 
     info_dicts: list[dict] = []
     for path in listFile(dst_scans_dir):
-        crc32 = getCRC32(path)
+        crc32 = fid_to_crc32.get(getFileID(path)) or getCRC32(path)
         info_dicts.append({
             CRC32_CN: crc32,
             SD_ORIG_PATH_CN: crc32_to_orig_path[crc32].relative_to(src_path.parent),
@@ -270,17 +285,45 @@ def processScansSource(src_path: Path, dst_dir: Path, logger: Logger):
 
 
 
+def _processScansSourceBuffered(src_path: Path, dst_dir: Path, pool: PoolType, tmp_dir: Path) -> list[logging.LogRecord]:
+    '''Process the source with a buffered logger, whose records are returned even if the processing failed.'''
+    logger, buffer = initBufferedLogger(f'SD-{threading.get_ident()}')
+    try:
+        processScansSource(src_path, dst_dir, logger, pool, tmp_dir)
+    except Exception as e:
+        if DEBUG: traceback.print_exc()
+        logger.error(UNEXP_ERR_IN_PROCESSING_2.format(src_path, e))
+    return buffer.records
+
+
+
+
 def processScansSourceDirs(src_paths: list[Path]):
+    '''
+    Process the sources in a pipeline: up to `MAX_NUM_SOURCES_IN_FLIGHT` sources are processed at the same time,
+    all sharing one long-lived pool, so the decompression/validation of the next sources overlaps with the
+    transcoding of the current one and the pool never drains at a source boundary.
+    The log of each source is written in the input order once it's done.
+    '''
     if DEBUG: assert src_paths, GOT_NO_INPUT_0
     dst_parent = initScansDraftDstParentDir(input_paths=src_paths, script_path=Path(__file__).parent.parent)
     if DEBUG: assert dst_parent.is_dir(), CANT_INIT_OUTPUT_DIR_0
     logger = initLogger(dst_parent / SD_LOG_FILENAME)
     logger.info(USING_SD_1.format(AC_VERSION))
     w = len(str(len(src_paths)))
-    for i, src_path in enumerate(src_paths, start=1):
-        dst_dir = dst_parent / SD_DIRNAME_3.format(TIMESTAMP, f'{i:0>{w}}', src_path.name)
-        processScansSource(src_path, dst_dir, logger)
-        logger.info('')
+    with Pool(NUM_CPU_JOBS) as pool, ThreadPoolExecutor(max(MAX_NUM_SOURCES_IN_FLIGHT, 1)) as executor:
+        futures = []
+        for i, src_path in enumerate(src_paths, start=1):
+            dst_dir = dst_parent / SD_DIRNAME_3.format(TIMESTAMP, f'{i:0>{w}}', src_path.name)
+            tmp_dir = TEMP_DIR_DECOMPRESS / f'{SD_TMP_DIRNAME}-{i:0>{w}}'
+            futures.append(executor.submit(_processScansSourceBuffered, src_path, dst_dir, pool, tmp_dir))
+        try:
+            for future in futures:
+                replayLogRecords(logger, future.result())
+                logger.info('')
+        except BaseException:  # don't start the queued sources, e.g. on Ctrl-C
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
 
 
 
@@ -444,34 +487,32 @@ def chkScans(root_dir):
     logger.info(USING_SR_1.format(AC_VERSION))
     logger.info(THE_INPUT_IS_1.format(root_dir))
 
-    if platform.system() == 'Windows':
-        temp_dir = getTempDir4Hardlink(root_dir)
-        if temp_dir: logger.info(SR_ENABLED_HARDLINK_AND_TEMP_DIR_1.format(temp_dir))
-        else: logger.info(SR_DISABLED_HARDLINK_0)
-    else:
-        temp_dir = None
-
-    for scans_dir in getScansDirs(root_dir, logger=logger):
-        logger.info('')
-        logger.info(CHECKING_1.format(scans_dir))
-        logger.info(LISTING_FILES_0)
-        files = filterScansFiles(scans_dir, logger=logger)
-        logger.info(CHECKING_FILENAMES_0)
-        chkScansNaming(scans_dir, logger=logger)
-        logger.info(CHECKING_FILECONTENT_0)
-        chkScansFiles(files, temp_dir, logger=logger)
-        logger.info(SR_LOG_SCANS_SUMMARY_0)
-        logScansSummary(scans_dir, files, logger=logger)
-        logger.info('')
-
+    manifest = None
+    if ENABLE_INCREMENTAL_CHECK:
+        manifest = CheckManifest(root_dir.parent.joinpath(SR_MANIFEST_FILENAME))
+        logger.info(MANIFEST_USING_1.format(manifest.path))
+
+    # a single pool checks the files in all scans dirs, so the workers are started only once
+    with (Pool(NUM_CPU_JOBS) if NUM_CPU_JOBS > 1 else nullcontext()) as pool:
+        if pool: logger.info(SR_CHECKING_WITH_N_WORKERS_1.format(NUM_CPU_JOBS))
+        for scans_dir in getScansDirs(root_dir, logger=logger):
+            logger.info('')
+            logger.info(CHECKING_1.format(scans_dir))
+            # SR never changes the scans dir, so it's scanned only once for all checks below
+            with snapshotDirTree(scans_dir):
+                logger.info(LISTING_FILES_0)
+                files = filterScansFiles(scans_dir, logger=logger)
+                logger.info(CHECKING_FILENAMES_0)
+                chkScansNaming(scans_dir, logger=logger)
+                logger.info(CHECKING_FILECONTENT_0)
+                chkScansFiles(files, logger=logger, manifest=manifest, pool=pool)
+                logger.info(SR_LOG_SCANS_SUMMARY_0)
+                logScansSummary(scans_dir, files, logger=logger)
+            logger.info('')
+
+    if manifest and manifest.save():
+        logger.info(MANIFEST_SAVED_1.format(manifest.path))
     logger.info(SR_ENDING_NOTE_1.format(log_path))
 
-    try:
-        if temp_dir and not list(temp_dir.iterdir()):
-            temp_dir.rmdir()
-            logger.info(REMOVED_TEMP_DIR_1.format(temp_dir))
-    except OSError:
-        pass
-
     logging.shutdown()
     return
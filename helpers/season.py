@@ -78,6 +78,7 @@ class Season:
     @dst_parent.setter
     def dst_parent(self, path: str|PurePath):
         setattr(self, FULLPATH_VAR, PurePath(path).as_posix())
+        hnm.bumpNamingEpoch()
 
     @property
     def name(self) -> str:
@@ -101,6 +102,7 @@ class Season:
     @parent.setter
     def parent(self, series: hsr.Series|None):
         self.__series = series
+        hnm.bumpNamingEpoch()
 
     #* shortcut access to naming fields --------------------------------------------------------------------------------
 
@@ -118,6 +120,7 @@ class Season:
     def g(self, grptag: str):
         # TODO: do cleaning and checking for the input
         setattr(self, GRPTAG_VAR, hnm.normFullGroupTag(grptag))
+        hnm.bumpNamingEpoch()
 
     @property
     def t(self) -> str:
@@ -133,6 +136,7 @@ class Season:
     def t(self, title: str):
         # TODO: do cleaning and checking for the input
         setattr(self, TITLE_VAR, hnm.normTitle(title))
+        hnm.bumpNamingEpoch()
 
     @property
     def x(self) -> str:
@@ -142,6 +146,7 @@ class Season:
     def x(self, suffix: str):
         # TODO: do cleaning and checking for the input
         setattr(self, SUFFIX_VAR, hnm.normFullSuffix(suffix))
+        hnm.bumpNamingEpoch()
 
     #* methods ---------------------------------------------------------------------------------------------------------
 
@@ -164,6 +169,7 @@ class Season:
     @qlabel.setter
     def qlabel(self, qlabel: str|None):
         self.__fixed_qlabel = qlabel  # TODO: do cleaning and checking for the input
+        hnm.bumpNamingEpoch()
         if (qlabel is not None) and self.__logger:
             self.__logger.info(VP_USING_FIXED_SEASON_QLABEL_1.format(qlabel))
 
@@ -175,6 +181,7 @@ class Season:
 
     def add(self, files: hcf.CoreFile|Iterable[hcf.CoreFile], hook: bool = True):
         self.__cached_qlabel = None  # need to re-generate the quality label if any file added
+        hnm.bumpNamingEpoch()
         if isinstance(files, hcf.CoreFile):
             files = [files]
         for file in files:
@@ -187,6 +194,7 @@ class Season:
 
     def remove(self, files: hcf.CoreFile|list[hcf.CoreFile], unhook: bool = True):
         self.__cached_qlabel = None  # need to re-generate the quality label if any file removed
+        hnm.bumpNamingEpoch()
         if isinstance(files, hcf.CoreFile):
             files = [files]
         for file in files:
@@ -310,7 +318,7 @@ def fromSeasonDir(season_dir: Path, logger: Logger) -> Season|None:
         naming_dicts.append(d)
 
     season = Season()
-    season.add(hcf.toCoreFilesWithTqdm(paths, logger=logger, mp=hms.getCRC32MultiProc(paths)))
+    season.add(hcf.toCoreFilesWithTqdm(paths, logger=logger))
     hnm.cleanNamingDicts(default_dict, naming_dicts, logger)
     applyNamingDicts(season, default_dict, naming_dicts, logger)
     hnm.decomposeFullDesp(season, logger)
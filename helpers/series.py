@@ -54,6 +54,7 @@ class Series:
     @dst_parent.setter
     def dst_parent(self, path: str|PurePath):
         setattr(self, FULLPATH_VAR, PurePath(path).as_posix())
+        hnm.bumpNamingEpoch()
 
     @property
     def name(self) -> str:
@@ -80,6 +81,7 @@ class Series:
     @g.setter
     def g(self, grptag: str):
         setattr(self, GRPTAG_VAR, hnm.normFullGroupTag(grptag))
+        hnm.bumpNamingEpoch()
 
     @property
     def t(self) -> str:
@@ -92,6 +94,7 @@ class Series:
     @t.setter
     def t(self, title: str):
         setattr(self, TITLE_VAR, hnm.normTitle(title))
+        hnm.bumpNamingEpoch()
 
     @property
     def x(self) -> str:
@@ -100,6 +103,7 @@ class Series:
     @x.setter
     def x(self, suffix: str):
         setattr(self, SUFFIX_VAR, hnm.normFullSuffix(suffix))
+        hnm.bumpNamingEpoch()
 
     #* contained seasons -----------------------------------------------------------------------------------------------
 
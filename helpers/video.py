@@ -18,6 +18,7 @@ __all__ = [
     'collectVideoInfos',
     'tstIO4VP',
     'doVideoFilePlacement',
+    'toVideoFileRecord',
     'doAutoIndexing',
     'placeVideos',
     'readCSV4ComplexVideoCmp',
@@ -29,20 +30,23 @@ __all__ = [
     'cmpComplexlyPairedVideos',
     ]
 
+import os
 import json
 import shutil
 import logging
 import itertools
+import traceback
 from pathlib import Path
 from logging import Logger
-from typing import Optional, Iterable
+from typing import Optional, Iterable, Callable
 from multiprocessing import Pool
+from collections import Counter
 
 from utils import *
 from langs import *
 from configs import *
 from checkers import *
-from loggers import initLogger
+from loggers import initLogger, initBufferedLogger, replayLogRecords
 from .naming import *
 from .misc import *
 from .subtitle import getAssTextLangDict
@@ -50,6 +54,8 @@ from .language import *
 from .formatter import *
 from .summaries import *
 from .dirgetter import proposeFilePath
+from .matching import VideoMatchingIndex
+from .filerecord import FileRecord, toBareFileRecord
 import helpers.corefile as hcf
 import helpers.season as hsn
 import helpers.series as hsr
@@ -165,6 +171,16 @@ class VideoFile:
 
 
 
+def toVideoFileRecord(path: Path|str) -> FileRecord:
+    '''Build and validate the VideoFile in the worker, only sending back the compact record.'''
+    try:
+        f = VideoFile(path)
+        return FileRecord(f.path, f.ext, f.format, 0, f.is_valid)
+    except Exception:
+        return toBareFileRecord(path)
+
+
+
 
 def readConf4VideoAlpha(script_path: str|Path, *paths: str|Path) -> dict:
     '''
@@ -336,7 +352,7 @@ def recordBDMVInfo(input_dir: Path):
     if ENABLE_AUDIO_SAMPLES_IN_VA:
         logger.info(VA_WILL_READ_M2TS_0)
 
-    mp = NUM_RAM_JOBS if ENABLE_AUDIO_SAMPLES_IN_VA else NUM_IO_JOBS
+    mp = NUM_IO_JOBS
     logger.info(LOADING_WITH_N_WORKERS_1.format(mp))
     with logging_redirect_tqdm([logger]):
         pbar = tqdm(total=len(m2ts_paths), desc='Loading', dynamic_ncols=True, ascii=True, unit='file')
@@ -630,7 +646,7 @@ def collectVideoInfos(*, src_dir: Path, va_file: Optional[Path] = None):
         va_base_naming_dict, va_file_naming_dicts = {}, []
 
     vx_paths = filterVxFilePaths(src_dir, logger)
-    cfs = hcf.toCoreFilesWithTqdm(vx_paths, logger, mp=getCRC32MultiProc(vx_paths, logger))
+    cfs = hcf.toCoreFilesWithTqdm(vx_paths, logger)
     cmpCRC4CoreFiles(cfs, findCRC32InFilenames(vx_paths), logger)
     if ENABLE_FILE_CHECKING_IN_VP: chkSeasonFiles(cfs, logger)
 
@@ -737,47 +753,41 @@ def doAutoIndexing(season: hsn.Season, logger: Logger):
     dep_cfs: list[hcf.CF] = [info for info in cfs if (info.f and re.match(CRC32_STRICT_REGEX, info.f))]
     named_cfs: list[hcf.CF] = [info for info in cfs if (info.f and not re.match(CRC32_STRICT_REGEX, info.f))]
 
-    state: dict[str, int|float] = {}
-    for i, acf in enumerate(auto_cfs):
-        i1 = acf.i1 if acf.i1 else ''
-        i2 = acf.i1 if acf.i2 else ''
+    # the naming is resolved once per file, the keys below never change during the loop as only i1/i2 are updated
+    # the later files sharing a key are counted instead of scanning through the remaining files
+    namings = [acf.naming for acf in auto_cfs]
+    keys = [(n.e, n.g, n.t, n.l, n.c, n.x) for n in namings]
+    later = Counter(keys)
+    later_with_i1 = Counter((*key[:5], n.i1, key[5]) for key, n in zip(keys, namings))
+
+    state: dict[tuple[str, ...], int|float] = {}
+    for acf, key, n in zip(auto_cfs, keys, namings):
+        later[key] -= 1
+        later_with_i1[(*key[:5], n.i1, key[5])] -= 1
+        i1 = n.i1 if n.i1 else ''
+        i2 = n.i1 if n.i2 else ''
+        key_with_i1 = (*key[:5], i1, key[5])
         if i1 and i2:
-            state[f'{acf.e}//{acf.g}//{acf.t}//{acf.l}//{acf.c}//{acf.x}'] = float(i1)
-            state[f'{acf.e}//{acf.g}//{acf.t}//{acf.l}//{acf.c}//{i1}//{acf.x}'] = float(i2)
+            state[key] = float(i1)
+            state[key_with_i1] = float(i2)
         elif i1 and not i2:
-            state[f'{acf.e}//{acf.g}//{acf.t}//{acf.l}//{acf.c}//{acf.x}'] = float(i1)
+            state[key] = float(i1)
             # whether we need to update i2 depends on whether there is a same key
-            key = f'{acf.e}//{acf.g}//{acf.t}//{acf.l}//{acf.c}//{i1}//{acf.x}'
-            if (v := state.get(key)):
+            if (v := state.get(key_with_i1)):
                 v = int(v + 1)
                 acf.i2 = str(v)
-                state[key] = v
-                continue
-            else:  # we need to loop though the remaining to find the same key
-                for j, cf in enumerate(auto_cfs[i + 1:]):
-                    j1 = '' if cf.i1 == None else cf.i1
-                    j2 = '' if cf.i2 == None else cf.i2
-                    jey = f'{cf.e}//{cf.g}//{cf.t}//{cf.l}//{cf.c}//{j1}//{cf.x}'
-                    if key == jey:
-                        acf.i2 = str(1)
-                        state[key] = 1
-                        break
+                state[key_with_i1] = v
+            elif later_with_i1[key_with_i1]:
+                acf.i2 = str(1)
+                state[key_with_i1] = 1
         else:  # if not i1
-            key = f'{acf.e}//{acf.g}//{acf.t}//{acf.l}//{acf.c}//{acf.x}'
             if (v := state.get(key)):
                 v = int(v + 1)
                 acf.i1 = str(v)
                 state[key] = v
-                continue
-            else:  # we need to loop through the remaining to find the same key
-                for j, cf in enumerate(auto_cfs[i + 1:]):
-                    j1 = cf.i1 if cf.i1 else ''
-                    j2 = cf.i2 if cf.i2 else ''
-                    jey = f'{cf.e}//{cf.g}//{cf.t}//{cf.l}//{cf.c}//{cf.x}'
-                    if key == jey:
-                        acf.i1 = str(1)
-                        state[key] = 1
-                        break
+            elif later[key]:
+                acf.i1 = str(1)
+                state[key] = 1
 
     for i, dcf in enumerate(dep_cfs):
         found = None
@@ -870,7 +880,7 @@ def placeVideos(*, csv_path: Path):
     if not tstIO4VP(src_file_paths, dst_parent_dir, logger): return
 
     (season := hsn.Season()).dst_parent = dst_parent_dir.as_posix()
-    season.add(hcf.toCoreFilesWithTqdm(src_file_paths, logger, mp=getCRC32MultiProc(src_file_paths, logger)))
+    season.add(hcf.toCoreFilesWithTqdm(src_file_paths, logger))
     cmpCRC4CoreFiles(season.files, [naming_info[CRC32_VAR] for naming_info in file_naming_dicts], logger)
     hsn.applyNamingDicts(season, base_naming_dict, file_naming_dicts, logger)
     doAutoIndexing(season, logger)
@@ -1059,22 +1069,21 @@ def findVideoMatchingBetweenDir(input1_dir: Path, input2_dir: Path):
     # 2. match by audio samples, higher robust (may fail especially in CM/Menu with identical audio)
     # 3. match by duration, mid robust (may fail in any videos having identical duration)
 
+    # all candidates are looked up from the indexes, each costs about O(log n) rather than a full scan
+    index1 = VideoMatchingIndex(input1_cfs)
+    index2 = VideoMatchingIndex(input2_cfs)
+
     #***********************************************************************************************
     # step 1: match by chapter timestamps
 
-    for input1_cf in input1_cfs[:]:  # make a copy of the list, so we can call .remove() in the loop
+    for input1_cf in index1.remaining:
         # NOTE we only match the first menu track, is this not robust enough?
-        matches = [
-            input2_fi for input2_fi in input2_cfs if (
-                input1_cf.menu_tracks and input2_fi.menu_tracks
-                and matchMenuTimeStamps(input1_cf.menu_timestamps[0], input2_fi.menu_timestamps[0])
-                )
-            ]
+        matches = index2.findByMenu(input1_cf.menu_timestamps[0]) if input1_cf.menu_tracks else []
         if len(matches) == 1:
             groups[str(next(idx))] = [('1', '', input1_cf.path.resolve().as_posix()),
                                         ('2', '', matches[0].path.resolve().as_posix())]
-            input1_cfs.remove(input1_cf)
-            input2_cfs.remove(matches[0])
+            index1.remove(input1_cf)
+            index2.remove(matches[0])
             logger.info(f'Matched by chapter timestamp: "{input1_cf.path}" <-> "{matches[0].path}"')
         elif len(matches) > 1:
             logger.warning(f'Cannot match "{input1_cf.path}" as multiple counterparts have the same chapter timestamp.')
@@ -1085,16 +1094,13 @@ def findVideoMatchingBetweenDir(input1_dir: Path, input2_dir: Path):
     #***********************************************************************************************
     # step 2: match by audio digest
     if ENABLE_AUDIO_SAMPLES_IN_VA:
-        for input1_cf in input1_cfs[:]:  # make a copy of the list, so we can call .remove() in the loop
-            matches = [
-                input2_fi for input2_fi in input2_cfs
-                if cmpAudioSamples(input1_cf.audio_samples, input2_fi.audio_samples)
-                ]
+        for input1_cf in index1.remaining:
+            matches = index2.findByAudioSamples(input1_cf.audio_samples)
             if len(matches) == 1:
                 groups[str(next(idx))] = [('1', '', input1_cf.path.resolve().as_posix()),
                                             ('2', '', matches[0].path.resolve().as_posix())]
-                input1_cfs.remove(input1_cf)
-                input2_cfs.remove(matches[0])
+                index1.remove(input1_cf)
+                index2.remove(matches[0])
                 logger.info(f'Matched by audio digest: "{input1_cf.path}" <-> "{matches[0].path}"')
             elif len(matches) > 1:
                 logger.warning(f'Cannot match "{input1_cf.path}" as multiple counterparts have the same audio digest.')
@@ -1104,16 +1110,13 @@ def findVideoMatchingBetweenDir(input1_dir: Path, input2_dir: Path):
 
     #***********************************************************************************************
     # step 3: match by duration
-    for input1_cf in input1_cfs[:]:  # make a copy of the list, so we can call .remove() in the loop
-        matches = [
-            input2_fi for input2_fi in input2_cfs if
-            (input1_cf.has_duration and input2_fi.has_duration and matchTime(input1_cf.duration, input2_fi.duration))
-            ]
+    for input1_cf in index1.remaining:
+        matches = index2.findByDuration(input1_cf.duration) if input1_cf.has_duration else []
         if len(matches) == 1:
             groups[str(next(idx))] = [('1', '', input1_cf.path.resolve().as_posix()),
                                         ('2', '', matches[0].path.resolve().as_posix())]
-            input1_cfs.remove(input1_cf)
-            input2_cfs.remove(matches[0])
+            index1.remove(input1_cf)
+            index2.remove(matches[0])
             logger.info(f'Matched by duration: "{input1_cf.path}" <-> "{matches[0].path}"')
         elif len(matches) > 1:
             # TODO this implementation is dirty, fix it
@@ -1123,8 +1126,8 @@ def findVideoMatchingBetweenDir(input1_dir: Path, input2_dir: Path):
                 group.append((str(next(subidx)), '', input1_cf.path.resolve().as_posix()))
                 for match in matches:
                     group.append((str(next(subidx)), '', match.path.resolve().as_posix()))
-                    input2_cfs.remove(match)
-                input1_cfs.remove(input1_cf)
+                    index2.remove(match)
+                index1.remove(input1_cf)
                 groups[str(next(idx))] = group
                 logger.info(f'Matched by duration for menus: "{input1_cf.path}". (NOTE this is not robust)')
             else:
@@ -1133,16 +1136,13 @@ def findVideoMatchingBetweenDir(input1_dir: Path, input2_dir: Path):
             logger.warning(f'Cannot match "{input1_cf.path}" as NO counterpart has the same duration.')
 
     # we need to do this again for input2_cfs
-    for input2_cf in input2_cfs[:]:  # make a copy of the list, so we can call .remove() in the loop
-        matches = [
-            input1_fi for input1_fi in input1_cfs if
-            (input2_cf.has_duration and input1_fi.has_duration and matchTime(input2_cf.duration, input1_fi.duration))
-            ]
+    for input2_cf in index2.remaining:
+        matches = index1.findByDuration(input2_cf.duration) if input2_cf.has_duration else []
         if len(matches) == 1:
             groups[str(next(idx))] = [('1', '', input2_cf.path.resolve().as_posix()),
                                         ('2', '', matches[0].path.resolve().as_posix())]
-            input2_cfs.remove(input2_cf)
-            input1_cfs.remove(matches[0])
+            index2.remove(input2_cf)
+            index1.remove(matches[0])
             logger.info(f'Matched by duration: "{matches[0].path}" <-> "{input2_cf.path}"')
         elif len(matches) > 1:
             # TODO this implementation is dirty, fix it
@@ -1152,8 +1152,8 @@ def findVideoMatchingBetweenDir(input1_dir: Path, input2_dir: Path):
                 group.append((str(next(subidx)), '', input2_cf.path.resolve().as_posix()))
                 for match in matches:
                     group.append((str(next(subidx)), '', match.path.resolve().as_posix()))
-                    input1_cfs.remove(match)
-                input2_cfs.remove(input2_cf)
+                    index1.remove(match)
+                index2.remove(input2_cf)
                 groups[str(next(idx))] = group
                 logger.info(f'Matched by duration for menus: "{input2_cf.path}". (NOTE this is not robust)')
             else:
@@ -1164,50 +1164,50 @@ def findVideoMatchingBetweenDir(input1_dir: Path, input2_dir: Path):
     #***********************************************************************************************
     # slicing is common in videos, so we need to match the rest by filename
 
-    for input1_cf in [input1_fi for input1_fi in input1_cfs if input1_fi.menu_tracks]:
+    for input1_cf in [input1_fi for input1_fi in index1.remaining if input1_fi.menu_tracks]:
         timestamps = input1_cf.menu_timestamps[0]
         if len(timestamps) < 2: continue  # this seems an incorrect menu
         distances = [(timestamps[i + 1] - timestamps[i]) for i in range(len(timestamps) - 1)]
         founds: list[hcf.CF] = []
         for i, distance in enumerate(distances):
-            for input2_cf in input2_cfs:
+            for input2_cf in index2.findByDuration(distance, require_duration=False):
                 if input2_cf in founds: continue
-                if matchTime(distance, input2_cf.duration):
-                    founds.append(input2_cf)
-                    break
+                founds.append(input2_cf)
+                break
         if len(founds) == len(distances):
             matched_group: list[tuple[str, str, str]] = []
             matched_group.append(('1', '', input1_cf.path.resolve().as_posix()))
             for found in founds:
                 matched_group.append(('2', '', found.path.resolve().as_posix()))
-                input2_cfs.remove(found)
-            input1_cfs.remove(input1_cf)
+                index2.remove(found)
+            index1.remove(input1_cf)
             groups[str(next(idx))] = matched_group
             logger.info(f'Matched sliced videos: {input1_cf}')
 
     # we need to do this again for input2_cfs
-    for input2_cf in [input2_fi for input2_fi in input2_cfs if input2_fi.menu_tracks]:
+    for input2_cf in [input2_fi for input2_fi in index2.remaining if input2_fi.menu_tracks]:
         timestamps = input2_cf.menu_timestamps[0]
         if len(timestamps) < 2: continue  # this seems an incorrect menu
         distances = [(timestamps[i + 1] - timestamps[i]) for i in range(len(timestamps) - 1)]
         founds: list[hcf.CF] = []
         for i, distance in enumerate(distances):
-            for input1_cf in input1_cfs:
+            for input1_cf in index1.findByDuration(distance, require_duration=False):
                 if input1_cf in founds: continue
-                if matchTime(distance, input1_cf.duration):
-                    founds.append(input1_cf)
-                    break
+                founds.append(input1_cf)
+                break
         if len(founds) == len(distances):
             matched_group: list[tuple[str, str, str]] = []
             # NOTE always place input1_cfs first
             for found in founds:
                 matched_group.append(('1', '', found.path.resolve().as_posix()))
-                input1_cfs.remove(found)
-            input2_cfs.remove(input2_cf)
+                index1.remove(found)
+            index2.remove(input2_cf)
             matched_group.append(('2', '', input2_cf.path.resolve().as_posix()))
             groups[str(next(idx))] = matched_group
             logger.info(f'Matched sliced videos: {input2_cf}')
 
+    input1_cfs, input2_cfs = index1.remaining, index2.remaining
+
     #***********************************************************************************************
     # place all the rest into an unnamed group
     unmatched_group: list[tuple[str, str, str]] = []
@@ -1237,6 +1237,54 @@ def findVideoMatchingBetweenDir(input1_dir: Path, input2_dir: Path):
 
 
 
+def _runVrTask(task: tuple[Callable, tuple], logger: Logger):
+    '''Run a VR comparison task (group), an unexpected error is logged so the following groups still run.'''
+    func, args = task
+    try:
+        func(*args, logger=logger)
+    except Exception as e:
+        if DEBUG: traceback.print_exc()
+        # the group has already been logged by its task, so the error is left in its section
+        logger.error(UNEXP_ERR_IN_COMPARING_1.format(e))
+
+
+
+
+def _runVrTaskBuffered(task: tuple[Callable, tuple]) -> list[logging.LogRecord]:
+    '''Run a VR comparison task in a worker, including its spectrograms, sending back its log records even if failed.'''
+    logger, buffer = initBufferedLogger(f'VR-{os.getpid()}')
+    _runVrTask(task, logger)
+    return buffer.records
+
+
+
+
+def _runVrTasks(tasks: list[tuple[Callable, tuple]], logger: Logger, mp: int = NUM_VR_JOBS):
+    '''
+    Run the VR comparison tasks (groups), in parallel if `mp` > 1.
+    The log of each task is buffered in the worker and written in the task order,
+    and the spectrograms are rendered in the same worker, so the log has the same layout as the serial one.
+    '''
+    if mp <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            _runVrTask(task, logger)
+        return
+
+    logger.info(VR_COMPARING_WITH_N_WORKERS_1.format(mp))
+    with Pool(mp) as pool:
+        for records in pool.imap(_runVrTaskBuffered, tasks):
+            replayLogRecords(logger, records)
+
+
+
+
+def _cmpSimplyPairedVideo(i: int, total: int, path1: Path, path2: Path, logger: Logger):
+    logger.info(VR_COMPARING_GRP_4.format(i + 1, total, path1, path2))
+    cmpVideoGroups([path1], [path2], logger=logger)
+
+
+
+
 def cmpSimplyPairedVideos(paths: Iterable[Path]):
 
     paths = [Path(p) for p in paths]
@@ -1249,9 +1297,67 @@ def cmpSimplyPairedVideos(paths: Iterable[Path]):
     logger.info(VR_MODE_SIMP_PAIRED_CMP_0)
 
     total = len(group1)
-    for i, (path1, path2) in enumerate(zip(group1, group2)):
-        logger.info(VR_COMPARING_GRP_4.format(i + 1, total, path1, path2))
-        cmpVideoGroups([path1], [path2], logger=logger)
+    tasks = [(_cmpSimplyPairedVideo, (i, total, path1, path2)) for i, (path1, path2) in enumerate(zip(group1, group2))]
+    _runVrTasks(tasks, logger)
+
+
+
+
+def _cmpComplexlyPairedVideo(group_id: str, group_items: list[tuple[str, str, str]], logger: Logger):
+
+    logger.info('')
+    logger.info(VR_COMPARING_GRP_1.format(group_id))
+
+    subgrps, enableds, fullpaths = zip(*group_items)
+    enableds = toEnabledList(enableds)
+    for sub_grp, enabled, fullpath in zip(subgrps, enableds, fullpaths):
+        logger.info(VR_COMPARING_ITEM_1.format(sub_grp, ('E' if enabled else 'D'), fullpath))
+
+    if sum(enableds) < 2:
+        logger.error(VR_CANT_CHK_GRP_LT2_0)
+        return
+
+    subgrps = [sub_grp for (sub_grp, enabled) in zip(subgrps, enableds) if enabled]
+    fullpaths = [full_path for (full_path, enabled) in zip(fullpaths, enableds) if enabled]
+    subgrp_tags = list(set(subgrps))
+    assert subgrp_tags  # this should never happen
+
+    fullpaths = [Path(fullpath) for fullpath in fullpaths]
+    all_files_exist = True
+    for fullpath in fullpaths:
+        if not fullpath.is_file():
+            logger.error(f'File "{fullpath}" is missing.')
+            all_files_exist = False
+    if not all_files_exist:
+        logger.error('Some files are missing. Please check again.')
+        return
+
+    # NOTE this is no longer considered as unsupported
+    # if len(valid_subgrps) > 2:
+    #     logger.error(f'>2 subgroups defined in group "{grouping_id}". It will be converted to 2 subgroups.')
+    #     valid_subgrps = valid_subgrps[:2]
+    #     subgrps = [(valid_subgrps[-1] if (sub_grp not in valid_subgrps) else sub_grp) for sub_grp in subgrps]
+    #     logger.info(f'Converted subgrouping:')
+    #     for sub_grp, fullpath in zip(subgrps, fullpaths):
+    #         logger.info(f'{sub_grp:s}: "{fullpath}"')
+
+    if len(subgrp_tags) == 1:
+        subgrps = ['1', '2']
+        if len(fullpaths) > 2:
+            logger.warning('>2 items defined in a single subgroup. Plz note auto subgrouping is not accurate.')
+            base_parent = fullpaths[0].parent
+            for i, fullpath in zip(itertools.count(), fullpaths):
+                subgrps[i] = '1' if fullpath.is_relative_to(base_parent) else '2'
+            logger.info(f'Auto subgrouping:')
+            for sub_grp, fullpath in zip(subgrps, fullpaths):
+                logger.info(f'{sub_grp:s}: "{fullpath}"')
+
+    src = [fullpath for (sub_grp, fullpath) in zip(subgrps, fullpaths) if sub_grp == subgrp_tags[0]]
+    refs = []
+    for subgrp_tag in subgrp_tags[1:]:
+        refs.append([fullpath for (sub_grp, fullpath) in zip(subgrps, fullpaths) if sub_grp == subgrp_tag])
+
+    cmpVideoGroups(src, *refs, grpname=group_id, subgrps_names=subgrp_tags, logger=logger)
 
 
 
@@ -1268,61 +1374,5 @@ def cmpComplexlyPairedVideos(input_csv_path: Path):
         logging.shutdown()
         return
 
-    for group_id, group_items in groups.items():
-
-        if not group_id:
-            continue
-
-        logger.info('')
-        logger.info(VR_COMPARING_GRP_1.format(group_id))
-
-        subgrps, enableds, fullpaths = zip(*group_items)
-        enableds = toEnabledList(enableds)
-        for sub_grp, enabled, fullpath in zip(subgrps, enableds, fullpaths):
-            logger.info(VR_COMPARING_ITEM_1.format(sub_grp, ('E' if enabled else 'D'), fullpath))
-
-        if sum(enableds) < 2:
-            logger.error(VR_CANT_CHK_GRP_LT2_0)
-            continue
-
-        subgrps = [sub_grp for (sub_grp, enabled) in zip(subgrps, enableds) if enabled]
-        fullpaths = [full_path for (full_path, enabled) in zip(fullpaths, enableds) if enabled]
-        subgrp_tags = list(set(subgrps))
-        assert subgrp_tags  # this should never happen
-
-        fullpaths = [Path(fullpath) for fullpath in fullpaths]
-        all_files_exist = True
-        for fullpath in fullpaths:
-            if not fullpath.is_file():
-                logger.error(f'File "{fullpath}" is missing.')
-                all_files_exist = False
-        if not all_files_exist:
-            logger.error('Some files are missing. Please check again.')
-            continue
-
-        # NOTE this is no longer considered as unsupported
-        # if len(valid_subgrps) > 2:
-        #     logger.error(f'>2 subgroups defined in group "{grouping_id}". It will be converted to 2 subgroups.')
-        #     valid_subgrps = valid_subgrps[:2]
-        #     subgrps = [(valid_subgrps[-1] if (sub_grp not in valid_subgrps) else sub_grp) for sub_grp in subgrps]
-        #     logger.info(f'Converted subgrouping:')
-        #     for sub_grp, fullpath in zip(subgrps, fullpaths):
-        #         logger.info(f'{sub_grp:s}: "{fullpath}"')
-
-        if len(subgrp_tags) == 1:
-            subgrps = ['1', '2']
-            if len(fullpaths) > 2:
-                logger.warning('>2 items defined in a single subgroup. Plz note auto subgrouping is not accurate.')
-                base_parent = fullpaths[0].parent
-                for i, fullpath in zip(itertools.count(), fullpaths):
-                    subgrps[i] = '1' if fullpath.is_relative_to(base_parent) else '2'
-                logger.info(f'Auto subgrouping:')
-                for sub_grp, fullpath in zip(subgrps, fullpaths):
-                    logger.info(f'{sub_grp:s}: "{fullpath}"')
-
-        src = [fullpath for (sub_grp, fullpath) in zip(subgrps, fullpaths) if sub_grp == subgrp_tags[0]]
-        refs = []
-        for subgrp_tag in subgrp_tags[1:]:
-            refs.append([fullpath for (sub_grp, fullpath) in zip(subgrps, fullpaths) if sub_grp == subgrp_tag])
-
-        cmpVideoGroups(src, *refs, grpname=group_id, subgrps_names=subgrp_tags, logger=logger)
+    tasks = [(_cmpComplexlyPairedVideo, (group_id, group_items)) for group_id, group_items in groups.items() if group_id]
+    _runVrTasks(tasks, logger)
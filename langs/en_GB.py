@@ -58,6 +58,9 @@ INVALID_FILE_1 = 'Invalid file "{}".'
 LISTING_FILES_0 = 'Listing files ...'
 LOADING_WITH_N_WORKERS_1 = 'Loading files with {} workers ...'
 LOADING_WTIH_N_WORKERS_1 = 'Loading files with {} workers ...'
+MANIFEST_REPLAYED_N_2 = 'Replayed the remembered results of {} unchanged files/dirs, and re-checking {} changed ones ...'
+MANIFEST_SAVED_1 = 'Saved the check results to "{}" for an incremental re-check.'
+MANIFEST_USING_1 = 'Using the check results remembered in "{}".'
 MISMATCHED_FMT_2 = 'The actual media format "{}" mismatches its ext "{}".'
 NESTED_DECOMPRESS_NOT_SUPPORTED_1 = 'Decompress nested archives from "{}" have not been implemented.'
 NOT_SET_GRPTAG_0 = 'No group tag is set.'
@@ -67,7 +70,7 @@ PROCESSED_TO_1 = 'Processed to "{}".'
 PROCESSING_1 = 'Processing "{}" ...'
 PROCESSING_2 = 'Processing "{}" -> "{}".'
 PROCESSING_QUEUED_JOBS_0 = 'Processing queued jobs ...'
-PROMPT_PWD_0 = 'Please input the password (or ctrl+c to give up): '
+PROMPT_PWD_1 = 'Please input the password of "{}" (or ctrl+c to give up): '
 REMOVED_TEMP_DIR_1 = 'Removed temp dir "{}".'
 RENAMED_2 = 'Renamed "{}" -> "{}".'
 RUN_INTO_ERROR_0 = 'Run into an unexpected error as above. Please report.'
@@ -82,6 +85,8 @@ THE_INPUT_IS_1 = 'The input is "{}".'
 THE_INPUT_IS_2 = 'The input is "{}" and "{}".'
 THE_OUTPUT_DIR_IS_1 = 'The output is "{}".'
 THE_OUTPUT_FILE_IS_1 = 'The output file is "{}".'
+UNEXP_ERR_IN_COMPARING_1 = 'Unexpected error during comparing this group, please report: "{}"'
+UNEXP_ERR_IN_PROCESSING_2 = 'Unexpected error during processing "{}", please report: "{}"'
 UNEXP_ERR_IN_TIDYING_UP_1 = 'Unexpected error during tidying the dir layout. Please report: "{}"'
 UNEXP_ERR_IN_TIDYING_UP_2 = 'Unexpected error during tidying the dir layout at "{}", please report: "{}"'
 UNHANDLED_ARC_FMT_1 = 'Unhandled archive format "{}". Plz report to request a feature update.'
@@ -104,7 +109,7 @@ For WARNING, you should make sure they do not matter.
 Some INFO may still contain a notice, dont skip them too fast.
 '''
 
-CRC32_MP_GOT_N_OF_N_ON_SSD_2 = 'CRC32 MultiProc gets {}/{} paths on SSDs.'
+IO_DEVICE_GOT_N_WORKERS_3 = 'Device {} gets {} worker(s) for {} file(s).'
 CRC32_MISSING_INPUT_0 = 'Missing input for CRC32 comparison.'
 CRC32_INPUT_LEN_MISMATCH_0 = 'The input files and expected CRC32s have different length.'
 CRC32_REACHING_END_0 = 'Reaching the end of actual files.'
@@ -140,7 +145,7 @@ You can fill some naming fields in the file, which can be later accepted by VP.
 '''
 
 VA_NO_M2TS_FOUND_0 = 'Found no M2TS file.'
-VA_WILL_READ_M2TS_0 = 'Will read M2TS to pick audio samples (which will be slow) ...'
+VA_WILL_READ_M2TS_0 = 'Will read M2TS to pick audio samples ...'
 VA_GEN_OUTPUT_1 = 'Writing the recorded info to "{}" ...'
 INACCURETE_VOL_NUM_GUESS_1 = 'The files are placed at different depth under your input. This will make volume number detection less accurate.'
 
@@ -201,6 +206,7 @@ b: "{}"
 '''
 VR_COMPARING_GRP_1 = 'Comparing the group "{}" with the following items:'
 VR_COMPARING_ITEM_1 = '{} ({}): "{}"'
+VR_COMPARING_WITH_N_WORKERS_1 = 'Comparing the groups with {} workers, the log of each group is written once it completes.'
 
 VR_MODE_SIMP_PAIRED_CMP_0 = 'VR Mode: compare simply paired videos (typically. dropped from cli)'
 VR_MODE_COMPLEX_PAIRED_CMP_0 = 'VR Mode: compare complexly paired videos (typically. dropped from cli)'
@@ -297,6 +303,7 @@ AR_GOT_NO_ALBUM_DIR_0 = 'Got no album dir after early filtering.'
 AR_CHECKING_ALBUM_LAYOUT_0 = 'Checking album layout ...'
 AR_GOT_NO_VALID_ALBUM_DIR_0 = 'Got no valid album dir after layout check.'
 AR_CHECKING_DIR_CONTENT_0 = 'Checking album content ...'
+AR_PROBING_FILES_0 = 'Probed'
 AR_CHECKING_VGMDB_0 = 'Attempting to verify album info with VGMDB database ...'
 AR_SKIPPED_BY_DIRNAME_2 = 'Skipped "{}" as its name is not "{}".'
 AR_SKIPPED_BY_FAILED_REGEX_1 = 'Skipped "{}" as the album dirname cannot be parsed.'
@@ -355,14 +362,13 @@ SP_CANT_PLACE_IMG_2 = '!!! Cannot place the image file "{}" to "{}".'
 
 #* SR ------------------------------------------------------------------------------------------------------------------
 
-SR_USAGE_2 = '''
+SR_USAGE_1 = '''
 Scans Recheck (SR) only accepts the following input:
 1. drop/cli a single folder (ideally "Scans")
 
 SR includes the following behaviors:
 1. locate all "{}" and (only) process all their sub-dirs.
-2. use a temporary dir "/{}" and hardlink to bypass rare characters in path.
-3. check dir/file names, format/infos and do a full decoding test.
+2. check dir/file names, format/infos and do a full decoding test.
 
 A processing log (SR-*.log) will be generated for later review.
 '''
@@ -378,9 +384,8 @@ Some INFO may still contains a notice, do not skip them too fast.
 
 ! You should always manually view all files to check if the image content is proper, as this tool NEVER knows if you placed unrelated files or misplaced files.
 '''
-SR_ENABLED_HARDLINK_AND_TEMP_DIR_1 = 'Enabled hardlink mode and using a temporary dir "{}".'
-SR_DISABLED_HARDLINK_0 = 'Cannot use hardlink mode. `cwebp` will fail if non-windows-1252 character exists in path.'
 
+SR_CHECKING_WITH_N_WORKERS_1 = 'Checking the files with {} workers, the log is written in the path order.'
 SR_FOUND_NO_BK_NAMED_DIR_2 = 'SR finds no "{0}", so will consider the input "{1}" as a "{0}" dir.'
 
 
@@ -3,7 +3,7 @@ from pathlib import Path
 from configs.debug import LOG_LEVEL
 
 
-__all__ = ['initLogger']
+__all__ = ['initLogger', 'LogRecordBuffer', 'initBufferedLogger', 'replayLogRecords']
 
 
 
@@ -21,3 +21,40 @@ def initLogger(log_path: str|Path):
     logger.addHandler(logging.StreamHandler())  # print log to stdout
     logger.info(f'Initialised log at "{log_path}".')
     return logger
+
+
+
+
+class LogRecordBuffer(logging.Handler):
+    '''Keep the log records in memory, so a worker can send them back to be written in the desired order.'''
+
+    def __init__(self):
+        super().__init__()
+        self.records: list[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord):
+        # format the message now, so the record is always picklable
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        self.records.append(record)
+
+
+
+
+def initBufferedLogger(name: str) -> tuple[logging.Logger, LogRecordBuffer]:
+    logger = logging.getLogger(name)
+    logger.handlers.clear()
+    logger.propagate = False
+    logger.setLevel(LOG_LEVEL)
+    logger.addHandler(buffer := LogRecordBuffer())
+    return logger, buffer
+
+
+
+
+def replayLogRecords(logger: logging.Logger, records: list[logging.LogRecord]):
+    for record in records:
+        if logger.isEnabledFor(record.levelno):
+            logger.handle(record)
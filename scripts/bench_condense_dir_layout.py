@@ -0,0 +1,116 @@
+'''
+Benchmark `condenseDirLayout()` on a synthetic dir tree.
+
+usage: python scripts/bench_condense_dir_layout.py [NUM_DIRS] [NUM_DIRS_TO_VERIFY]
+
+The tree mixes the layouts condensed by SD: dirs with files, chains of single-subdir dirs and empty dirs.
+The result is first verified against the old restart-from-root implementation on a smaller tree,
+as the old one is quadratic and takes too long on the full tree.
+'''
+
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.fileutils import condenseDirLayout, listFile, listDir
+
+
+
+
+def mkTree(root: Path, num_dirs: int, seed: int = 0):
+    rng = random.Random(seed)
+    root.mkdir(parents=True)
+    dirs = [root]
+    while len(dirs) < num_dirs:
+        parent = rng.choice(dirs)
+        match rng.random():
+            case x if x < 0.4:  # a chain of single-subdir dirs, ending with some files
+                path = parent
+                for _ in range(rng.randint(1, 4)):
+                    dirs.append(path := path.joinpath(f'chain{len(dirs)}'))
+                path.mkdir(parents=True)
+                for i in range(rng.randint(1, 3)):
+                    path.joinpath(f'{i:02d}.webp').write_bytes(b'')
+            case x if x < 0.6:  # an empty dir or an empty chain
+                path = parent
+                for _ in range(rng.randint(1, 3)):
+                    dirs.append(path := path.joinpath(f'empty{len(dirs)}'))
+                path.mkdir(parents=True)
+            case _:  # a normal dir with files
+                dirs.append(path := parent.joinpath(f'dir{len(dirs)}'))
+                path.mkdir()
+                for i in range(rng.randint(1, 3)):
+                    path.joinpath(f'{i:02d}.jpg').write_bytes(b'')
+
+
+
+
+def condenseDirLayoutQuadratic(root: Path):
+    '''The old implementation, restarting from the root after each change.'''
+    while True:
+        for dir_path in listDir(root):
+            files = listFile(dir_path, rglob=False)
+            dirs = listDir(dir_path, rglob=False)
+            match len(files), len(dirs):
+                case 0, 0:
+                    if root != dir_path:
+                        dir_path.rmdir()
+                        break
+                case 0, 1:
+                    subfiles = listFile(dir_path)
+                    if not subfiles and root != dir_path:
+                        shutil.rmtree(dir_path, ignore_errors=False)
+                        break
+                    if not subfiles:
+                        continue  # the old one recursed forever here
+                    for subfile in subfiles:
+                        rel1 = dir_path.relative_to(root).parts
+                        rel2 = subfile.relative_to(dir_path).parts[1:]
+                        new_path = root.joinpath(*rel1, *rel2)
+                        new_path.parent.mkdir(parents=True, exist_ok=True)
+                        subfile.rename(new_path)
+                    break
+        else:
+            return
+
+
+
+
+def listLayout(root: Path) -> list[str]:
+    return sorted(Path(p).relative_to(root).as_posix() for p, _, _ in os.walk(root)) \
+         + sorted(f.relative_to(root).as_posix() for f in root.rglob('*') if f.is_file())
+
+
+
+
+def main(num_dirs: int = 50000, num_dirs_to_verify: int = 500):
+
+    with tempfile.TemporaryDirectory() as temp:
+        temp = Path(temp)
+
+        for seed in range(3):
+            mkTree(old := temp.joinpath(f'old{seed}'), num_dirs_to_verify, seed)
+            mkTree(new := temp.joinpath(f'new{seed}'), num_dirs_to_verify, seed)
+            condenseDirLayoutQuadratic(old)
+            condenseDirLayout(new)
+            assert listLayout(old) == listLayout(new), f'The result mismatches with seed {seed}.'
+        print(f'Verified against the old implementation on {num_dirs_to_verify} dirs.')
+
+        mkTree(root := temp.joinpath('bench'), num_dirs)
+        num_before = sum(1 for _ in os.walk(root))
+        t0 = time.perf_counter()
+        condenseDirLayout(root)
+        t1 = time.perf_counter()
+        num_after = sum(1 for _ in os.walk(root))
+        print(f'Condensed {num_before} dirs to {num_after} dirs in {t1 - t0:.2f}s.')
+
+
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,88 @@
+'''
+Benchmark the filename grouping of `cleanScansFilenames()` on synthetic scan names.
+
+usage: python scripts/bench_group_scans_filenames.py [NUM_PAGES]
+
+The names follow the usual scan naming: numbered pages from a scanner or a booklet,
+plus some named items such as covers, obi and labels, in mixed styles.
+The groups are first verified against the old pairwise `difflib` grouping, then both are timed.
+'''
+
+import sys
+import time
+import random
+import difflib
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.chars import groupSimilarNames
+
+
+PAGE_STYLES = ['scan_{:04d}', 'img{:03d}', 'p{:02d}', '{:03d}', 'booklet_{:02d}', 'bk{:02d}_600dpi', 'CD-Booklet ({})']
+NAMED_ITEMS = ['cover', 'back', 'obi', 'obi_back', 'label', 'disc', 'tray', 'inlay', 'front', 'box', 'sticker']
+EXTS = ['.png', '.jpg']
+
+
+
+
+def mkNames(num_pages: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    names = [f'{item}{rng.choice(["", "_1", "_2", "1"])}{rng.choice(EXTS)}'
+             for item in rng.sample(NAMED_ITEMS, k=rng.randint(2, len(NAMED_ITEMS)))]
+    for style in rng.sample(PAGE_STYLES, k=rng.randint(1, 3)):
+        ext = rng.choice(EXTS)
+        names += [style.format(i) + ext for i in range(1, max(num_pages // 2, 2))]
+    return sorted({name.lower() for name in names})  # as listed by `listFile()`
+
+
+
+
+def groupNamesPairwise(names: list[str], cutoff: float = 0.5) -> list[set[str]]:
+    '''The old grouping, with each match set merged by connected components, which the old one intended.'''
+    groups: list[set[str]] = []
+    for i, name in enumerate(names):
+        matches = set(difflib.get_close_matches(name, names[i:], n=len(names[i:]), cutoff=cutoff))
+        joined = [group for group in groups if group & matches]
+        for group in joined:
+            matches |= group
+            groups.remove(group)
+        groups.append(matches)
+    return groups
+
+
+
+
+def groupByExt(names: list[str], func) -> list[frozenset[str]]:
+    '''Group as `cleanScansFilenames()` does, i.e. separately for each extension.'''
+    ret = []
+    for ext in EXTS:
+        ret += [frozenset(g) for g in func([name for name in names if name.endswith(ext)])]
+    return sorted(ret, key=sorted)
+
+
+
+
+def main(num_pages: int = 1000):
+
+    for seed in range(20):
+        names = mkNames(200, seed)
+        assert groupByExt(names, groupNamesPairwise) == groupByExt(names, groupSimilarNames), \
+            f'The groups mismatch with seed {seed}.'
+    print('Verified against the old pairwise grouping on 20 name sets.')
+
+    names = mkNames(num_pages)
+    t0 = time.perf_counter()
+    old = groupByExt(names, groupNamesPairwise)
+    t1 = time.perf_counter()
+    new = groupByExt(names, groupSimilarNames)
+    t2 = time.perf_counter()
+    assert old == new
+    print(f'Grouped {len(names)} names into {len(new)} groups:')
+    print(f'  pairwise difflib: {t1 - t0:8.3f}s')
+    print(f'  templates      : {t2 - t1:8.3f}s')
+
+
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
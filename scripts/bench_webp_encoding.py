@@ -0,0 +1,88 @@
+'''
+Benchmark the WebP encoding of SD/AD on a synthetic scan set.
+
+usage: python scripts/bench_webp_encoding.py [NUM_IMAGES] [NUM_CPU_JOBS]
+
+The scan set mixes the usual sizes of scans: a few large covers/spreads, many pages and some small inserts.
+The images are rendered by ffmpeg with noise, so they don't compress unrealistically well.
+The old way (`toWebp()` in a process pool, probing each image first) is compared with `encodeWebps()`.
+'''
+
+import sys
+import time
+import random
+import tempfile
+import subprocess
+from pathlib import Path
+from multiprocessing import Pool
+sys.path.append(str(Path(__file__).parent.parent))
+
+from configs import NUM_CPU_JOBS
+from utils.ffmpegutils import toWebp
+from utils.webputils import encodeWebps
+
+
+# (width, height, weight) of the synthetic scans
+SCAN_SIZES = [
+    (9920, 7016, 1),  # A3 spread at 600 dpi
+    (4960, 7016, 2),  # A4 page at 600 dpi
+    (2480, 3508, 5),  # A4 page at 300 dpi
+    (1240, 1754, 2),  # A4 page at 150 dpi
+    (1200, 1200, 1),  # disc label
+    ]
+
+
+
+
+def mkScan(path: Path, width: int, height: int, seed: int):
+    cmd = ['ffmpeg', '-v', 'error', '-y', '-f', 'lavfi',
+           '-i', f'testsrc2=size={width}x{height}:rate=1,noise=alls=12:allf=u:all_seed={seed}',
+           '-frames:v', '1', path.as_posix()]
+    subprocess.run(cmd, check=True)
+
+
+
+
+def mkScanSet(root: Path, num_images: int, seed: int = 0) -> list[tuple[Path, tuple[int, int]]]:
+    rng = random.Random(seed)
+    sizes = rng.choices([s[:2] for s in SCAN_SIZES], weights=[s[2] for s in SCAN_SIZES], k=num_images)
+    ret = []
+    for i, (w, h) in enumerate(sizes):
+        mkScan(path := root / f'{i:04d}.png', w, h, i)
+        ret.append((path, (w, h)))
+    return ret
+
+
+
+
+def _toWebp(args: tuple[Path, Path]) -> str:
+    return toWebp(*args, ret_crc32=True)
+
+
+
+
+def main(num_images: int = 40, mp: int = NUM_CPU_JOBS):
+
+    with tempfile.TemporaryDirectory() as temp:
+        temp = Path(temp)
+        (src_dir := temp / 'src').mkdir()
+        scans = mkScanSet(src_dir, num_images)
+        mpix = sum(w * h for _, (w, h) in scans) / 1e6
+        print(f'Built {num_images} scans of {mpix:.0f} MPix in total, encoding with {mp} CPUs.')
+
+        t0 = time.perf_counter()
+        with Pool(mp) as pool:
+            old = pool.map(_toWebp, [(src, temp / 'old' / f'{src.stem}.webp') for src, _ in scans])
+        t1 = time.perf_counter()
+        new = encodeWebps([(src, temp / 'new' / f'{src.stem}.webp', size) for src, size in scans], mp=mp)
+        t2 = time.perf_counter()
+
+        assert all(old) and all(new), 'Some images failed to encode.'
+        for name, t in (('ffmpeg pool', t1 - t0), ('encodeWebps', t2 - t1)):
+            print(f'{name:>12}: {t:7.2f}s, {num_images / t:6.2f} images/s, {mpix / t:7.2f} MPix/s')
+
+
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -1,12 +1,16 @@
 
 from .archive import *
 from .chars import *
+from .dirtree import *
+from .filecache import *
 from .fileid import *
 from .fileutils import *
 from .formatter import *
 from .ffmpegutils import *
 from .fontutils import *
+from .ioscheduler import *
 from .language import *
+from .manifest import *
 from .mediainfo import *
 from .mediautils import *
 from .subtitle import *
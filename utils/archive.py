@@ -184,7 +184,7 @@ def extractArcWithPwdPrompt(src_path: Path, dst_dir: Path, passwords: str|list[s
         while not ok:
             try:
                 print(FOUND_PWD_PROTECTED_1.format(src_path))
-                password = input(PROMPT_PWD_0)
+                password = input(PROMPT_PWD_1.format(src_path))
                 ok = decompressor(src_path, dst_dir, password=password)
                 if not ok: print(INCORRECT_PWD_1.format(password))
                 else: return password
@@ -6,9 +6,12 @@ __all__ = [
     'unquotFields4CSV',
     'suppressPunctuation',
     'getPrintLen',
+    'groupSimilarNames',
     ]
 
+import re
 import string
+import difflib
 from typing import Optional
 from configs.chars import FLEXIBLE_PUNCTUATIONS
 
@@ -120,3 +123,52 @@ def getPrintLen(chars: str) -> int:
     # which maximizes the UE with fonts such as Sarasa Unispaces
     len_doublespace = (len(chars) - len_unispace) * 2
     return len_unispace + len_doublespace
+
+
+
+
+def groupSimilarNames(names: list[str], cutoff: float = 0.5, small_bucket: int = 16) -> list[set[str]]:
+    '''
+    Group the names that are similar to each other, e.g. the pages of scans.
+    The result is as joining every pair with `difflib` ratio >= `cutoff`, but in about linear time.
+
+    Names are first bucketed by their template, i.e. the name with each digit run replaced by '#',
+    so 'p001.png' and 'p123.png' are joined without any comparison.
+    Buckets are then joined by union-find if their names are similar.
+    All names are compared only if either bucket is small (e.g. 'cover.png'/'obi_1.png'),
+    while two large buckets (e.g. two styles of pages) are compared by their first names only.
+
+    Return: the groups in the order of their first names in `names`.
+    '''
+    buckets: dict[str, list[str]] = {}
+    for name in names:
+        buckets.setdefault(re.sub(r'\d+', '#', name), []).append(name)
+    bucket_list = list(buckets.values())
+    order = {name: i for i, name in enumerate(names)}
+
+    matcher = difflib.SequenceMatcher()
+    def isSimilar(a: str, b: str) -> bool:
+        # the ratio is not symmetric, so compare as `difflib.get_close_matches(earlier, [later])` does
+        if order[a] > order[b]: a, b = b, a
+        matcher.set_seqs(b, a)
+        return matcher.real_quick_ratio() >= cutoff and matcher.quick_ratio() >= cutoff and matcher.ratio() >= cutoff
+
+    parents = list(range(len(bucket_list)))
+    def find(i: int) -> int:
+        while parents[i] != i:
+            parents[i] = i = parents[parents[i]]
+        return i
+
+    for i, bucket1 in enumerate(bucket_list):
+        for j in range(i + 1, len(bucket_list)):
+            if find(i) == find(j): continue
+            names1, names2 = bucket1, bucket_list[j]
+            if min(len(names1), len(names2)) > small_bucket:
+                names1, names2 = names1[:1], names2[:1]
+            if any(isSimilar(name1, name2) for name1 in names1 for name2 in names2):
+                parents[find(j)] = find(i)
+
+    groups: dict[int, set[str]] = {}
+    for i, bucket in enumerate(bucket_list):
+        groups.setdefault(find(i), set()).update(bucket)
+    return list(groups.values())
@@ -0,0 +1,133 @@
+'''A snapshot of a dir tree, so the same tree is scanned from the filesystem only once.'''
+
+__all__ = [
+    'DirTree',
+    'snapshotDirTree',
+    'findDirTree',
+    'invalidateDirTree',
+    ]
+
+import os
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+
+# the snapshots being used by listFile/listDir, the innermost one comes last
+_trees: list['DirTree'] = []
+
+
+
+
+class DirTree:
+
+    '''
+    DirTree lists the files and dirs under `root` with `os.scandir()`, scanning each dir at most once.
+    The file type is taken from the `DirEntry`, so no extra stat is needed for most platforms.
+    A dir is scanned on its first query, so a recursive query over the whole tree is a single pass of scanning.
+
+    Like `Path.rglob()`, symlinks to dirs are listed as dirs but not walked into.
+    If any file or dir is changed under the tree, call `invalidate()` on it, so the affected dirs are scanned again.
+    '''
+
+    def __init__(self, root: Path|str):
+        self.root = Path(Path(root).as_posix())
+        # dir -> ({file name: file path}, {dir name: (dir path, is_symlink)}), or None if it's not a dir
+        self.__nodes: dict[Path, Optional[tuple[dict[str, Path], dict[str, tuple[Path, bool]]]]] = {}
+
+    def __contains__(self, path: Path) -> bool:
+        return path == self.root or self.root in path.parents
+
+    def __node(self, dir_path: Path) -> Optional[tuple[dict[str, Path], dict[str, tuple[Path, bool]]]]:
+        if dir_path in self.__nodes:
+            return self.__nodes[dir_path]
+        files: dict[str, Path] = {}
+        dirs: dict[str, tuple[Path, bool]] = {}
+        try:
+            with os.scandir(dir_path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir():
+                            dirs[entry.name] = (dir_path / entry.name, entry.is_symlink())
+                        elif entry.is_file():
+                            files[entry.name] = dir_path / entry.name
+                    except OSError:
+                        continue
+            node = (files, dirs)
+        except OSError:  # not a dir, not existing or not accessible
+            node = None
+        self.__nodes[dir_path] = node
+        return node
+
+    def isDir(self, path: Path) -> bool:
+        return self.__node(path) is not None
+
+    def isFile(self, path: Path) -> bool:
+        if path == self.root:
+            return os.path.isfile(path)
+        return bool(node := self.__node(path.parent)) and path.name in node[0]
+
+    def __iterSubdirs(self, dir_path: Path, rglob: bool) -> Iterator[tuple[Path, bool]]:
+        stack = [dir_path]
+        while stack:
+            if not (node := self.__node(stack.pop())): continue
+            for path, is_symlink in node[1].values():
+                yield path, is_symlink
+                if rglob and not is_symlink: stack.append(path)
+
+    def iterDirs(self, dir_path: Path, rglob: bool = True) -> Iterator[Path]:
+        '''Yield the subdirs of `dir_path`, excluding itself.'''
+        for path, _ in self.__iterSubdirs(dir_path, rglob):
+            yield path
+
+    def iterFiles(self, dir_path: Path, rglob: bool = True) -> Iterator[Path]:
+        '''Yield the files under `dir_path`.'''
+        if node := self.__node(dir_path):
+            yield from node[0].values()
+        if rglob:
+            for path, is_symlink in self.__iterSubdirs(dir_path, rglob=True):
+                if not is_symlink and (node := self.__node(path)):
+                    yield from node[0].values()
+
+    def invalidate(self, path: Path|str):
+        '''Forget the scanned content of `path`, its parent and everything under it.'''
+        path = Path(Path(path).as_posix())
+        for dir_path in [p for p in self.__nodes if p == path or path in p.parents]:
+            del self.__nodes[dir_path]
+        self.__nodes.pop(path.parent, None)
+
+
+
+
+@contextmanager
+def snapshotDirTree(root: Path|str) -> Iterator[DirTree]:
+    '''
+    Within the context, `listFile()`/`listDir()` under `root` are answered from a single snapshot of the tree.
+    Only use it over a tree that is not changed in the meantime, or call `invalidateDirTree()` after each change.
+    '''
+    tree = DirTree(root)
+    _trees.append(tree)
+    try:
+        yield tree
+    finally:
+        _trees.remove(tree)
+
+
+
+
+def findDirTree(path: Path) -> DirTree|None:
+    '''Return the innermost snapshot covering the path, or None if there is none.'''
+    for tree in reversed(_trees):
+        if path in tree:
+            return tree
+    return None
+
+
+
+
+def invalidateDirTree(*paths: Path|str):
+    '''Notify all snapshots that the paths have been changed (created, removed, renamed or modified).'''
+    for path in paths:
+        path = Path(Path(path).as_posix())
+        for tree in _trees:
+            tree.invalidate(path)
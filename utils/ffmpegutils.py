@@ -1,7 +1,12 @@
-import shutil
+import os
+import hashlib
+import functools
+import subprocess
 from pathlib import Path
 
-from utils.fileutils import tryHardlink
+from utils.fileid import getCRC32
+from utils.filecache import readDecodeCache, writeDecodeCache
+from utils.fileutils import tryHardlinkThenCopy
 from configs import DEFAULT_WEBP_QUALITY, DEFAULT_JPEG_QUALITY
 
 import ffmpeg
@@ -12,6 +17,7 @@ __all__ = [
     'tstFFmpegDecode',
     'tstFFmpegAudioDecode',
     'tstFFmpegVideoDecode',
+    'getFFmpegVersion',
     'FFprobe',
     'toWebp',
     'toFLAC',
@@ -22,32 +28,57 @@ __all__ = [
 
 
 
-def tstFFmpegDecode(path: Path) -> bool:
+@functools.cache
+def getFFmpegVersion() -> str:
+    '''Return the first line of `ffmpeg -version`, or an empty string if ffmpeg is not callable.'''
     try:
-        ffmpeg.input(path.resolve()).output('-', format='null').run(quiet=True)
-    except ffmpeg._run.Error:
-        return False
-    return True
+        ret = subprocess.run(['ffmpeg', '-version'], capture_output=True, text=True, errors='ignore')
+        return ret.stdout.splitlines()[0].strip() if ret.returncode == 0 and ret.stdout else ''
+    except Exception:
+        return ''
+
+
+
+
+def _tstFFmpegDecodeCached(path: Path, selector: str = '') -> bool:
+    '''
+    Do a full decoding test of the file, or only the stream of `selector` (e.g. 'a:0').
+    The result is cached by the file identity and the ffmpeg version, so an unchanged file is never decoded again.
+    '''
+    stream_key = selector if selector else '*'
+    version = getFFmpegVersion()
+    if (passed := readDecodeCache(path, stream_key, version)) is not None:
+        return passed
+    stream = ffmpeg.input(path.resolve())
+    if selector: stream = stream[selector]
+    # only errors are printed, so the digest of stderr tells exactly what went wrong in decoding
+    stream = stream.output('-', format='null').global_args('-hide_banner', '-nostats', '-loglevel', 'error')
+    try:
+        stderr = stream.run(quiet=True)[1]
+        passed = True
+    except ffmpeg._run.Error as e:
+        stderr = e.stderr
+        passed = False
+    writeDecodeCache(path, stream_key, version, passed, hashlib.sha1(stderr if stderr else b'').hexdigest())
+    return passed
+
+
+
+
+def tstFFmpegDecode(path: Path) -> bool:
+    return _tstFFmpegDecodeCached(Path(path))
 
 
 
 
 def tstFFmpegAudioDecode(path: Path, id: int = 0) -> bool:
-    try:
-        ffmpeg.input(path.resolve())[f'a:{id}'].output('-', format='null').run(quiet=True)
-    except ffmpeg._run.Error:
-        return False
-    return True
+    return _tstFFmpegDecodeCached(Path(path), f'a:{id}')
 
 
 
 
 def tstFFmpegVideoDecode(path: Path, id: int = 0) -> bool:
-    try:
-        ffmpeg.input(path.resolve())[f'v:{id}'].output('-', format='null').run(quiet=True)
-    except ffmpeg._run.Error:
-        return False
-    return True
+    return _tstFFmpegDecodeCached(Path(path), f'v:{id}')
 
 
 
@@ -82,17 +113,23 @@ def toWebp(
     dst: Path,
     quality: int = DEFAULT_WEBP_QUALITY,
     lossless: bool = False,
-    resize: tuple[int, int]|None = None
-    ) -> bool:
-    if not src.is_file(): return False
+    resize: tuple[int, int]|None = None,
+    ret_crc32: bool = False,
+    size: tuple[int, int]|None = None,
+    ) -> bool|str:
+    '''
+    If `ret_crc32`, return the CRC32 of the output instead of True, or an empty string instead of False.
+    `size` is the known (width, height) of the source, which saves probing the source again.
+    '''
+    if not src.is_file(): return '' if ret_crc32 else False
     remove_dst = not dst.is_file()
 
     if resize:
         if resize[0] > 16383: resize = (16383, int(resize[1] * (16383 / resize[0])))
         if resize[1] > 16383: resize = (int(resize[0] * (16383 / resize[1])), 16383)
-    if not (w_h := getWH(src)):
+    if not (w_h := size if size and all(size) else getWH(src)):
         if remove_dst: dst.unlink(missing_ok=True)
-        return False
+        return '' if ret_crc32 else False
 
     w, h = w_h
     if not resize and (w > 16383 or h > 16383):
@@ -108,14 +145,16 @@ def toWebp(
         stream.run(quiet=True, overwrite_output=True)
     except ffmpeg._run.Error:
         if remove_dst: dst.unlink(missing_ok=True)
-        return False
-    return True
+        return '' if ret_crc32 else False
+    # the output was just written and is still in the OS page cache, so hashing it costs no disk reading
+    return getCRC32(dst) if ret_crc32 else True
 
 
 
 
-def toFLAC(src: Path, dst: Path) -> bool:
-    if not src.is_file(): return False
+def toFLAC(src: Path, dst: Path, ret_crc32: bool = False) -> bool|str:
+    '''If `ret_crc32`, return the CRC32 of the output instead of True, or an empty string instead of False.'''
+    if not src.is_file(): return '' if ret_crc32 else False
     remove_dst = not dst.is_file()
     try:
         stream = ffmpeg.input(src.resolve().as_posix())
@@ -123,14 +162,16 @@ def toFLAC(src: Path, dst: Path) -> bool:
         stream.run(quiet=True, overwrite_output=True)
     except ffmpeg._run.Error:
         if remove_dst: dst.unlink(missing_ok=True)
-        return False
-    return True
+        return '' if ret_crc32 else False
+    # the output was just written and is still in the OS page cache, so hashing it costs no disk reading
+    return getCRC32(dst) if ret_crc32 else True
 
 
 
 
-def toJPG(src: Path, dst: Path) -> bool:
-    if not src.is_file(): return False
+def toJPG(src: Path, dst: Path, ret_crc32: bool = False) -> bool|str:
+    '''If `ret_crc32`, return the CRC32 of the output instead of True, or an empty string instead of False.'''
+    if not src.is_file(): return '' if ret_crc32 else False
     remove_dst = not dst.is_file()
     try:
         stream = ffmpeg.input(src.resolve().as_posix())
@@ -138,33 +179,65 @@ def toJPG(src: Path, dst: Path) -> bool:
         stream.run(quiet=True, overwrite_output=True)
     except ffmpeg._run.Error:
         if remove_dst: dst.unlink(missing_ok=True)
-        return False
-    return True
+        return '' if ret_crc32 else False
+    # the output was just written and is still in the OS page cache, so hashing it costs no disk reading
+    return getCRC32(dst) if ret_crc32 else True
 
 
 
-def replaceIfSmaller(src: Path, dst: Path, bit:int, **kwds) -> bool:
-    if not src.is_file(): return False
-    format = f's{bit}le'
-    acodec = f'pcm_s{bit}le'
+def replaceIfSmaller(
+    src: Path,
+    dst: Path,
+    ret_crc32: bool = False,
+    poll_interval: float = 0.1,
+    **kwds,
+    ) -> bool|str:
+    '''
+    Re-encode `src` to FLAC at `dst` if it gets smaller, otherwise place `src` at `dst` by hardlink/copy.
+    ffmpeg writes to a temp file next to `dst`, so the muxer can seek back to fill in STREAMINFO (total samples, MD5).
+    The size of the temp file is checked every `poll_interval` seconds,
+    and the encoding is aborted as soon as it grows larger than `src`.
+    The temp file is then atomically renamed to `dst`.
+
+    If `ret_crc32`, return the CRC32 of the output instead of True, or an empty string instead of False.
+    '''
+    if not src.is_file(): return '' if ret_crc32 else False
     file_size = src.stat().st_size
     remove_dst = not dst.is_file()
-    try:
-        stream = ffmpeg.input(src.resolve().as_posix())
-        stream = stream.output('pipe:', f='flac', compression_level=12, **kwds)
-        output = stream.run(quiet=True, capture_stdout=True)[0]
-    except ffmpeg._run.Error:
-        if remove_dst: dst.unlink(missing_ok=True)
-        return False
+    tmp = dst.with_name(f'.{dst.name}.tmp')
+
+    proc = None
     try:
         dst.parent.mkdir(parents=True, exist_ok=True)
-        if len(output) > file_size:
-            if not tryHardlink(src, dst):
-                shutil.copy2(src, dst)
-        else:
-            # TODO: high memory usage may occur when writing large files
-            dst.write_bytes(output)
+        stream = ffmpeg.input(src.resolve().as_posix())
+        stream = stream.output(tmp.resolve().as_posix(), f='flac', compression_level=12, **kwds)
+        stream = stream.global_args('-hide_banner', '-nostats', '-loglevel', 'error').overwrite_output()
+        proc = subprocess.Popen(stream.compile(), stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        smaller = True
+        while True:
+            try:
+                retcode = proc.wait(timeout=poll_interval)
+                break
+            except subprocess.TimeoutExpired:
+                if tmp.is_file() and tmp.stat().st_size > file_size:
+                    smaller = False
+                    proc.kill()
+                    proc.wait()
+                    break
+        if smaller:
+            if retcode != 0: raise ffmpeg.Error('ffmpeg', b'', b'')
+            smaller = tmp.stat().st_size <= file_size
+        if smaller:
+            os.replace(tmp, dst)
+            # the output was just written and is still in the OS page cache, so hashing it costs no disk reading
+            crc32 = getCRC32(dst)
+            return crc32 if ret_crc32 else True
+        tmp.unlink(missing_ok=True)
+        return tryHardlinkThenCopy(src, dst, ret_crc32=ret_crc32)
     except:
+        if proc is not None and proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        tmp.unlink(missing_ok=True)
         if remove_dst: dst.unlink(missing_ok=True)
-        return False
-    return True
+        return '' if ret_crc32 else False
@@ -0,0 +1,216 @@
+import os
+import time
+import atexit
+import sqlite3
+import threading
+import multiprocessing
+from pathlib import Path
+
+from configs.user import ENABLE_FILE_CACHE, FILE_CACHE_PATH, FILE_CACHE_MAX_SIZE
+
+
+__all__ = [
+    'getFileStatKey',
+    'readFileCache',
+    'writeFileCache',
+    'trimFileCache',
+    'readDecodeCache',
+    'writeDecodeCache',
+    ]
+
+
+# bump this if the stored format of any field changes, an outdated cache is then dropped as a whole
+_FILE_CACHE_VERSION = 4
+_FILE_CACHE_FIELDS = ('mediainfo', 'crc32', 'audio_samples')
+
+# each thread of each process holds its own connection
+# sqlite connections must not cross a fork, and by default can't be used by another thread
+_local = threading.local()
+_trim_on_exit_registered: bool = False
+
+# the cache is also trimmed after this number of writes by any process, so a long run doesn't grow it unbounded
+_TRIM_EVERY_N_WRITES = 1000
+_num_writes: int = 0
+
+
+
+
+def _connect() -> sqlite3.Connection|None:
+    global _trim_on_exit_registered
+    if not ENABLE_FILE_CACHE:
+        return None
+    if getattr(_local, 'conn', None) is not None and _local.pid == os.getpid():
+        return _local.conn
+    try:
+        FILE_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(FILE_CACHE_PATH, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        if conn.execute('PRAGMA user_version').fetchone()[0] != _FILE_CACHE_VERSION:
+            conn.execute('DROP TABLE IF EXISTS files')
+            conn.execute('DROP TABLE IF EXISTS decodes')
+            conn.execute(f'PRAGMA user_version={_FILE_CACHE_VERSION:d}')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS files ('
+            'dev INTEGER, ino INTEGER, size INTEGER, mtime_ns INTEGER, atime REAL, '
+            'mediainfo TEXT, crc32 TEXT, audio_samples TEXT, '
+            'PRIMARY KEY (dev, ino))'
+            )
+        conn.execute('CREATE INDEX IF NOT EXISTS files_atime ON files (atime)')
+        # the decoding test result of each stream, also bound to the ffmpeg version which did the test
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS decodes ('
+            'dev INTEGER, ino INTEGER, size INTEGER, mtime_ns INTEGER, atime REAL, '
+            'ffmpeg TEXT, stream TEXT, passed INTEGER, stderr_digest TEXT, '
+            'PRIMARY KEY (dev, ino, ffmpeg, stream))'
+            )
+    except (sqlite3.Error, OSError):
+        return None
+    _local.conn, _local.pid = conn, os.getpid()
+    # only the main process trims the cache on start/exit, otherwise every worker in a pool would do it again
+    if multiprocessing.parent_process() is None and not _trim_on_exit_registered:
+        _trim_on_exit_registered = True
+        trimFileCache()
+        atexit.register(trimFileCache)
+    return conn
+
+
+
+
+def _countWrite():
+    global _num_writes
+    _num_writes += 1
+    if _num_writes % _TRIM_EVERY_N_WRITES == 0:
+        trimFileCache()
+
+
+
+
+def getFileStatKey(path: Path|str) -> tuple[int, int, int, int]|None:
+    '''
+    Return the file identity (st_dev, st_ino, st_size, st_mtime_ns) used to address the cache.
+    Return None if the file does not exist or the filesystem provides no inode number.
+    '''
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if not st.st_ino:
+        return None
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+
+
+def readFileCache(path: Path|str, field: str) -> str:
+    '''
+    Return the cached `field` of the file, or an empty string if not cached.
+    An entry whose size/mtime mismatches the current file is considered stale and removed.
+    '''
+    if field not in _FILE_CACHE_FIELDS:
+        raise ValueError(f'Unknown file cache field "{field}".')
+    if not (key := getFileStatKey(path)) or not (conn := _connect()):
+        return ''
+    dev, ino, size, mtime_ns = key
+    try:
+        row = conn.execute(f'SELECT size, mtime_ns, {field} FROM files WHERE dev=? AND ino=?', (dev, ino)).fetchone()
+        if row is None:
+            return ''
+        if row[0] != size or row[1] != mtime_ns:
+            conn.execute('DELETE FROM files WHERE dev=? AND ino=?', (dev, ino))
+            return ''
+        if row[2]:
+            conn.execute('UPDATE files SET atime=? WHERE dev=? AND ino=?', (time.time(), dev, ino))
+        return row[2] or ''
+    except sqlite3.Error:
+        return ''
+
+
+
+
+def writeFileCache(path: Path|str, **fields: str):
+    '''Save the given fields of the file to the cache. Fields of a stale entry are discarded.'''
+    if any(k not in _FILE_CACHE_FIELDS for k in fields):
+        raise ValueError(f'Unknown file cache field in {list(fields.keys())}.')
+    if not fields or not (key := getFileStatKey(path)) or not (conn := _connect()):
+        return
+    dev, ino, size, mtime_ns = key
+    names = ', '.join(fields.keys())
+    marks = ', '.join('?' for _ in fields)
+    updates = ', '.join(f'{k}=excluded.{k}' for k in fields)
+    try:
+        conn.execute('DELETE FROM files WHERE dev=? AND ino=? AND (size!=? OR mtime_ns!=?)', (dev, ino, size, mtime_ns))
+        conn.execute(
+            f'INSERT INTO files (dev, ino, size, mtime_ns, atime, {names}) VALUES (?, ?, ?, ?, ?, {marks}) '
+            f'ON CONFLICT (dev, ino) DO UPDATE SET atime=excluded.atime, {updates}',
+            (dev, ino, size, mtime_ns, time.time(), *fields.values())
+            )
+    except sqlite3.Error:
+        return
+    _countWrite()
+
+
+
+
+def trimFileCache(max_size: int = FILE_CACHE_MAX_SIZE):
+    '''Remove the least recently used entries until the cache content fits into `max_size` MiB.'''
+    if not (conn := _connect()):
+        return
+    entry_size = 'length(ifnull(mediainfo, \'\')) + length(ifnull(crc32, \'\')) + length(ifnull(audio_samples, \'\')) + 64'
+    try:
+        conn.execute(
+            'DELETE FROM files WHERE rowid IN ('
+            f'SELECT rowid FROM (SELECT rowid, SUM({entry_size}) OVER (ORDER BY atime DESC) AS acc FROM files) '
+            'WHERE acc > ?)', (max_size * 2**20, )
+            )
+        conn.execute(
+            'DELETE FROM decodes WHERE rowid IN ('
+            'SELECT rowid FROM (SELECT rowid, SUM(length(ffmpeg) + length(stream) + 128) OVER (ORDER BY atime DESC) AS acc '
+            'FROM decodes) WHERE acc > ?)', (max_size * 2**20 // 4, )
+            )
+    except sqlite3.Error:
+        pass
+
+
+
+
+def readDecodeCache(path: Path|str, stream: str, ffmpeg: str) -> bool|None:
+    '''
+    Return the cached decoding test result of the `stream` of the file by the `ffmpeg` version.
+    Return None if not cached, or the file has changed since the test.
+    '''
+    if not ffmpeg or not (key := getFileStatKey(path)) or not (conn := _connect()):
+        return None
+    dev, ino, size, mtime_ns = key
+    try:
+        conn.execute('DELETE FROM decodes WHERE dev=? AND ino=? AND (size!=? OR mtime_ns!=?)', (dev, ino, size, mtime_ns))
+        row = conn.execute(
+            'SELECT passed FROM decodes WHERE dev=? AND ino=? AND ffmpeg=? AND stream=?', (dev, ino, ffmpeg, stream)
+            ).fetchone()
+        if row is None:
+            return None
+        conn.execute(
+            'UPDATE decodes SET atime=? WHERE dev=? AND ino=? AND ffmpeg=? AND stream=?',
+            (time.time(), dev, ino, ffmpeg, stream)
+            )
+        return bool(row[0])
+    except sqlite3.Error:
+        return None
+
+
+
+
+def writeDecodeCache(path: Path|str, stream: str, ffmpeg: str, passed: bool, stderr_digest: str = ''):
+    '''Save the decoding test result of the `stream` of the file by the `ffmpeg` version.'''
+    if not ffmpeg or not (key := getFileStatKey(path)) or not (conn := _connect()):
+        return
+    dev, ino, size, mtime_ns = key
+    try:
+        conn.execute(
+            'INSERT OR REPLACE INTO decodes (dev, ino, size, mtime_ns, atime, ffmpeg, stream, passed, stderr_digest) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (dev, ino, size, mtime_ns, time.time(), ffmpeg, stream, int(passed), stderr_digest)
+            )
+    except sqlite3.Error:
+        return
+    _countWrite()
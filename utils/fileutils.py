@@ -17,20 +17,22 @@ __all__ = [
     'listM2TS2CSV',
     'listM2TS2YAML',
     'listM2TS2JSON',
-    'getTempDir4Hardlink',
     'condenseDirLayout',
     ]
 
 import os
 import csv
+import zlib
 import json
 import random
 import shutil
-import platform
 from pathlib import Path
 from typing import Optional, Iterable
 
 from configs import *
+from .fileid import getCRC32
+from .filecache import writeFileCache
+from .dirtree import DirTree, findDirTree, invalidateDirTree
 
 import yaml
 
@@ -40,14 +42,18 @@ import yaml
 def listFile(
     *paths, ext: Optional[str|Iterable[str]] = None, rglob: bool = True, reduce: bool = True, sort: bool = True
     ) -> list[Path]:
+    '''
+    List the files under the input paths (or the input path itself if it's a file).
+    The dirs are scanned in a single pass by `os.scandir()`, or answered from the snapshot by `snapshotDirTree()`.
+    '''
     paths = [Path(Path(p).as_posix()) for p in paths]
     ret: list[Path] = []
     for p in paths:
-        if p.is_file():
+        tree = findDirTree(p) or DirTree(p)
+        if tree.isFile(p):
             ret.append(p)
             continue
-        if p.is_dir():
-            ret += [f for f in p.rglob('*') if f.is_file()] if rglob else [f for f in p.glob('*') if f.is_file()]
+        ret += tree.iterFiles(p, rglob=rglob)
     if ext:
         exts = (ext, ) if isinstance(ext, str) else tuple(ext)
         ret = [p for p in ret if p.suffix.lower().endswith(exts)]
@@ -61,11 +67,16 @@ def listFile(
 
 
 def listDir(*inp_paths, rglob: bool = True, reduce: bool = True, sort: bool = True) -> list[Path]:
+    '''
+    List the subdirs under the input dirs. The input dir itself is also included if `rglob` is True.
+    The dirs are scanned in a single pass by `os.scandir()`, or answered from the snapshot by `snapshotDirTree()`.
+    '''
     inp_paths = list(Path(Path(p).as_posix()) for p in inp_paths)
     ret: list[Path] = []
     for p in inp_paths:
-        if p.is_dir():
-            ret += [p] + [f for f in p.rglob('*') if f.is_dir()] if rglob else [f for f in p.glob('*') if f.is_dir()]
+        tree = findDirTree(p) or DirTree(p)
+        if tree.isDir(p):
+            ret += ([p] if rglob else []) + list(tree.iterDirs(p, rglob=rglob))
     if reduce:
         ret = list(set(ret))
     if sort:
@@ -211,7 +222,22 @@ def tryMkDir(path: str|Path) -> bool:
 
 
 
-def tryCopy(src: str|Path, dst: str|Path) -> bool:
+def _copyWithCRC32(src: Path, dst: Path, read_size: int = 16 * 2**20) -> str:
+    '''Copy the file with its metadata like `shutil.copy2()`, computing the CRC32 of the bytes on the fly.'''
+    hash = 0
+    with src.open('rb') as fi, dst.open('wb') as fo:
+        while (b := fi.read(read_size)):
+            hash = zlib.crc32(b, hash)
+            fo.write(b)
+    shutil.copystat(src, dst)
+    writeFileCache(dst, crc32=f'{hash:08x}')
+    return f'{hash:08x}'
+
+
+
+
+def tryCopy(src: str|Path, dst: str|Path, ret_crc32: bool = False) -> bool|str:
+    '''If `ret_crc32`, return the CRC32 of the copied file instead of True, or an empty string instead of False.'''
     src = Path(src)
     dst = Path(dst)
     remove_dst = not dst.is_file()
@@ -225,16 +251,22 @@ def tryCopy(src: str|Path, dst: str|Path) -> bool:
 
     try:
         dst.parent.mkdir(parents=True, exist_ok=True)
+        if ret_crc32:
+            return _copyWithCRC32(src, dst)
         shutil.copy2(src, dst)
         return True
     except:
         if remove_dst: dst.unlink(missing_ok=True)
-        return False
+        return '' if ret_crc32 else False
 
 
 
 
-def tryHardlinkThenCopy(src: str|Path, dst: str|Path) -> bool:
+def tryHardlinkThenCopy(src: str|Path, dst: str|Path, ret_crc32: bool = False) -> bool|str:
+    '''
+    If `ret_crc32`, return the CRC32 of the new file instead of True, or an empty string instead of False.
+    A hardlink shares the content (and the cached CRC32) with the source, a copy is hashed while being written.
+    '''
     src = Path(src)
     dst = Path(dst)
     remove_dst = not dst.is_file()
@@ -248,12 +280,15 @@ def tryHardlinkThenCopy(src: str|Path, dst: str|Path) -> bool:
 
     try:
         dst.parent.mkdir(parents=True, exist_ok=True)
-        if not tryHardlink(src, dst):
-            shutil.copy2(src, dst)
+        if tryHardlink(src, dst):
+            return getCRC32(src) if ret_crc32 else True
+        if ret_crc32:
+            return _copyWithCRC32(src, dst)
+        shutil.copy2(src, dst)
         return True
     except:
         if remove_dst: dst.unlink(missing_ok=True)
-        return False
+        return '' if ret_crc32 else False
 
 
 
@@ -373,51 +408,6 @@ def tstMkHardlinkInDir(dir_path: str|Path) -> bool:
 
 
 
-def getTempDir4Hardlink(input_path: Path|None = None) -> Path|None:
-    '''
-    Return a default config dir which *should* be usable to hardlink from files in `input_path`.
-    Note that the function will create the dir if success.
-    Return None if failed.
-
-    If you propose to use a specific dir, use `tstHardlink` to test it.
-    '''
-
-    if not input_path: return None
-    input_path = input_path.resolve()
-
-    proposed: Path|None = None
-    try:
-        match platform.system():
-            case 'Windows':
-                # NOTE Windows also has relative mount point
-                proposed = Path(input_path.anchor).joinpath(TEMP_DIR_HARDLINK)
-                proposed.mkdir(parents=True, exist_ok=True)
-                if proposed.stat().st_dev != input_path.stat().st_dev:
-                    proposed = None
-            case 'Linux':
-                # TODO finding better temp_dir under linux/osx
-                proposed = Path('/tmp').joinpath(TEMP_DIR_HARDLINK)
-                proposed.mkdir(parents=True, exist_ok=True)
-                if proposed.stat().st_dev != input_path.stat().st_dev:
-                    proposed = None
-            case 'Darwin':
-                proposed = Path('/tmp').joinpath(TEMP_DIR_HARDLINK)
-                proposed.mkdir(parents=True, exist_ok=True)
-                if proposed.stat().st_dev != input_path.stat().st_dev:
-                    proposed = None
-        if proposed and tstMkHardlinkInDir(proposed):
-            return proposed
-    except:
-        if proposed and proposed.is_dir() and not list(proposed.iterdir()):
-            try:
-                proposed.rmdir()
-            except:
-                pass
-    return None
-
-
-
-
 def condenseDirLayout(root: Path):
     '''
     Remove all dirs with no files recursively.
@@ -426,29 +416,50 @@ def condenseDirLayout(root: Path):
     '''
     if not root.is_dir():
         raise NotADirectoryError(f'The input "{root}" is not a dir.')
-    for dir_path in listDir(root):
-        files = listFile(dir_path, rglob=False)
-        dirs = listDir(dir_path, rglob=False)
-        match len(files), len(dirs):
-            case 0, 0:
-                if root != dir_path:
-                    dir_path.rmdir()
-                    return condenseDirLayout(root)
-            case 0, 1:
-                subfiles = listFile(dir_path)
-                if not subfiles and root != dir_path:
-                    shutil.rmtree(dir_path, ignore_errors=False)
-                    return condenseDirLayout(root)
-                for subfile in subfiles:
-                    rel1 = dir_path.relative_to(root).parts
-                    rel2 = subfile.relative_to(dir_path).parts[1:]
-                    new_path = root.joinpath(*rel1, *rel2)
-                    if new_path.exists():
-                        raise FileExistsError(f'The new path "{new_path}" already exists.')
-                    new_path.parent.mkdir(parents=True, exist_ok=True)
-                    subfile.rename(new_path)
-                    if DEBUG: print(f'Moved "{subfile}" -> "{new_path}".')
-                return condenseDirLayout(root)
-            case _:
-                continue
-    return
+    root = Path(root)
+    # visit the dirs bottom-up, so every subdir is already condensed when its parent is visited
+    # then a parent never needs to be visited again, and the whole tree is done in a single pass
+    stack: list[tuple[Path, bool]] = [(root, False)]
+    while stack:
+        dir_path, visited = stack.pop()
+        if visited:
+            _condenseDir(root, dir_path)
+            continue
+        stack.append((dir_path, True))
+        with os.scandir(dir_path) as it:
+            stack += [(Path(e.path), False) for e in it if e.is_dir() and not e.is_symlink()]
+    invalidateDirTree(root)
+
+
+
+
+def _condenseDir(root: Path, dir_path: Path):
+    '''Condense a dir whose subdirs have all been condensed.'''
+    with os.scandir(dir_path) as it:
+        entries = list(it)
+    dirs = [e for e in entries if e.is_dir()]
+    if len(dirs) > 1 or any(e.is_file() for e in entries):
+        return
+    if not dirs:  # no file left in this tree
+        if dir_path != root: dir_path.rmdir()
+        return
+    if dirs[0].is_symlink():
+        return
+
+    # the only subdir is removed and its content is moved one level up
+    subdir = Path(dirs[0].path)
+    with os.scandir(subdir) as it:
+        names = [e.name for e in it]
+    if subdir.name.lower() in (name.lower() for name in names):
+        # the subdir contains an item of the same name, move it aside first
+        temp = dir_path.joinpath(f'{subdir.name}.{random.randint(0, 2**32):08x}')
+        if temp.exists():
+            raise FileExistsError(f'The new path "{temp}" already exists.')
+        subdir = subdir.rename(temp)
+    for name in names:
+        new_path = dir_path.joinpath(name)
+        if new_path.exists():
+            raise FileExistsError(f'The new path "{new_path}" already exists.')
+        subdir.joinpath(name).rename(new_path)
+        if DEBUG: print(f'Moved "{subdir.joinpath(name)}" -> "{new_path}".')
+    subdir.rmdir()
@@ -0,0 +1,131 @@
+import os
+from pathlib import Path
+from logging import Logger
+from collections import deque
+from multiprocessing import Pool
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from langs import *
+from configs import *
+
+import ssd_checker
+
+
+__all__ = [
+    'getDeviceID',
+    'isOnSSD',
+    'groupPathsByDevice',
+    'getDeviceQuotas',
+    'mapPerDevice',
+    ]
+
+
+# device id -> whether it is a SSD, so the device class is detected only once per device
+_ssd_devices: dict[int, bool] = {}
+
+
+
+
+def getDeviceID(path: Path|str) -> int:
+    '''Return the `st_dev` of the path, or -1 if it cannot be stat.'''
+    try:
+        return os.stat(path).st_dev
+    except OSError:
+        return -1
+
+
+
+
+def isOnSSD(path: Path|str, logger: Logger|None = None) -> bool:
+    '''Detect if the path locates on SSD. The result is remembered for the whole device.'''
+    if (dev := getDeviceID(path)) in _ssd_devices:
+        return _ssd_devices[dev]
+    try:
+        ret = ssd_checker.is_ssd(Path(path).resolve().as_posix())
+        if logger: logger.debug(FOUND_SSD_1.format(path) if ret else FOUND_HDD_1.format(path))
+    except KeyError:
+        # this happens when the input path is an SCSI device which is not listed as system physical drives
+        if logger: logger.debug(SSD_CHECKER_KEY_ERROR_1.format(path))
+        ret = ENABLE_MULTI_PROC_IF_UNSURE
+    except Exception as e:
+        if logger: logger.debug(SSD_CHECKER_UNK_ERROR_2.format(e, path))
+        ret = ENABLE_MULTI_PROC_IF_UNSURE
+    _ssd_devices[dev] = ret
+    return ret
+
+
+
+
+def groupPathsByDevice(paths: list[Path]) -> dict[int, list[int]]:
+    '''Return the indexes of the paths grouped by `st_dev`, keeping the input order in each group.'''
+    groups: dict[int, list[int]] = {}
+    for i, path in enumerate(paths):
+        groups.setdefault(getDeviceID(path), []).append(i)
+    return groups
+
+
+
+
+def getDeviceQuotas(paths: list[Path], mp: int = NUM_IO_JOBS, logger: Logger|None = None) -> dict[int, int]:
+    '''
+    Decide the number of workers for each device: `mp` for SSD, 1 for HDD (i.e. sequential reading).
+    The quota never exceeds the number of files on that device.
+    '''
+    quotas: dict[int, int] = {}
+    for dev, idxs in groupPathsByDevice(paths).items():
+        quota = max(1, int(mp)) if isOnSSD(paths[idxs[0]], logger) else 1
+        quotas[dev] = min(quota, len(idxs))
+        if logger: logger.debug(IO_DEVICE_GOT_N_WORKERS_3.format(dev, quotas[dev], len(idxs)))
+    return quotas
+
+
+
+
+def mapPerDevice(
+    func: Callable[[Path], Any],
+    paths: list[Path]|list[str],
+    mp: int = NUM_IO_JOBS,
+    callback: Callable[[Any], Any]|None = None,
+    logger: Logger|None = None,
+    ) -> list[Any]:
+    '''
+    Apply `func(path)` to all paths, each device being read by its own group of workers.
+    So a spinning disk is read sequentially while SSDs are still read in parallel, all devices being busy at once.
+
+    func: must be picklable, as it runs in a multiprocessing pool
+    mp: the max number of workers for each SSD, `mp<=1` disables multi-processing
+    callback: called in the main process with each result once it is ready (e.g. to update a progress bar)
+
+    return: the results in the same order as the input paths
+    '''
+    paths = [Path(path) for path in paths]
+    results: list[Any] = [None] * len(paths)
+
+    if int(mp) <= 1 or len(paths) <= 1:
+        for i, path in enumerate(paths):
+            results[i] = func(path)
+            if callback: callback(results[i])
+        return results
+
+    groups = groupPathsByDevice(paths)
+    quotas = getDeviceQuotas(paths, mp, logger)
+    queues = {dev: deque(idxs) for dev, idxs in groups.items()}
+    if (num_slots := sum(quotas.values())) <= 1:
+        return mapPerDevice(func, paths, mp=1, callback=callback)
+
+    def _drain(pool, queue: deque):
+        # each drainer holds one worker slot of the device, and feeds the pool one file at a time
+        while True:
+            try:
+                i = queue.popleft()
+            except IndexError:
+                return
+            results[i] = pool.apply(func, (paths[i], ))
+            if callback: callback(results[i])
+
+    with Pool(num_slots) as pool, ThreadPoolExecutor(num_slots) as exe:
+        futures = [exe.submit(_drain, pool, queues[dev]) for dev, quota in quotas.items() for _ in range(quota)]
+        for future in futures:
+            future.result()  # re-raise the exception from the worker, if any
+    return results
@@ -0,0 +1,166 @@
+import os
+import re
+import json
+import hashlib
+from pathlib import Path
+from typing import Any
+
+import configs
+import configs.chars
+import configs.regex
+import configs.constants
+import configs.specification
+from configs.version import AC_VERSION
+
+
+__all__ = [
+    'getFileIdentity',
+    'getDirIdentity',
+    'getCheckConfigDigest',
+    'CheckManifest',
+    ]
+
+
+# bump this if the layout of the manifest changes, an outdated manifest is then ignored as a whole
+_MANIFEST_VERSION = 2
+
+# the configs which change the check results, a manifest made with other values is ignored as a whole
+_CHECK_CONFIG_MODULES = (configs.chars, configs.regex, configs.constants, configs.specification)
+_CHECK_USER_CONFIGS = (
+    'ENABLE_VGMDB', 'ENABLE_MUSICBREAINZ', 'ENABLE_FREEDB', 'VGMDB_OFFLINE',
+    'MIN_VID_HEIGHT_TO_STILL_LABEL_AS_1080', 'MAX_DURATION_DIFF_BETWEEN_TRACKS', 'SAME_DURATION_THRESHOLD',
+    'MIN_DISTANCE_FROM_LASTER_CHAP_TO_END', 'MIN_NUM_AUDIO_TO_SEEN_AS_SPLIT_TRACK_DISC',
+    'SMALL_IMAGE_FILE_SIZE', 'LARGE_SCANS_THRESHOLD', 'NORMAL_COVER_ART_LENGTH', 'NORMAL_COVER_ART_FILESIZE',
+    'MIN_UNIQUE_CHAR_IN_ASS', 'CHK_OFFSET_STA', 'CHK_OFFSET_LEN', 'XCORR_RATIO', 'MAX_DIFF_MEAN',
+    )
+
+
+
+
+def getFileIdentity(path: Path|str) -> list[int]|None:
+    '''Return the file identity [st_size, st_mtime_ns, st_ino], or None if the file cannot be stat.'''
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+
+
+
+def getDirIdentity(path: Path|str) -> str:
+    '''
+    Return a digest of the relative path and the identity of every file under the dir.
+    Adding, removing, renaming or modifying any file in the dir tree changes the digest.
+    '''
+    path = Path(path)
+    entries = []
+    for parent, _, filenames in os.walk(path):
+        for filename in filenames:
+            file = os.path.join(parent, filename)
+            entries.append((Path(file).relative_to(path).as_posix(), getFileIdentity(file)))
+    entries.sort()
+    return hashlib.sha1(json.dumps(entries, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+
+
+def _canonConfig(value: Any) -> Any:
+    '''Convert a config value to a JSON-serialisable form, which is the same between runs.'''
+    match value:
+        case set()|frozenset():
+            return sorted((_canonConfig(v) for v in value), key=repr)
+        case list()|tuple():
+            return [_canonConfig(v) for v in value]
+        case dict():
+            return [[_canonConfig(k), _canonConfig(v)] for k, v in value.items()]
+        case re.Pattern():
+            return [_canonConfig(value.pattern), value.flags]
+        case bytes():
+            return value.hex()
+        case str()|int()|float()|bool()|None:
+            return value
+        case _:
+            return repr(value)
+
+
+
+
+def getCheckConfigDigest() -> str:
+    '''Return a digest of the config values which change the check results, e.g. `DEFAULT_WEBP_QUALITY`.'''
+    names = {name for module in _CHECK_CONFIG_MODULES for name in vars(module) if name.isupper()}
+    names.update(_CHECK_USER_CONFIGS)
+    # read the values from `configs`, so any value overridden there is also taken into account
+    values = [[name, _canonConfig(getattr(configs, name, None))] for name in sorted(names)]
+    return hashlib.sha1(json.dumps(values, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+
+
+class CheckManifest:
+
+    '''
+    CheckManifest remembers the check results of files/dirs next to the log, together with their identity.
+    On the next run, a result is reused only if the identity of the file/dir is still the same,
+    so only the changed parts of a large tree need to be checked again.
+
+    Results are grouped into sections (e.g. 'files', 'albums') and addressed by the path relative to the manifest.
+    Only the entries looked up or updated in this run are saved, so the removed files are dropped from the manifest.
+    The manifest is bound to the AC version and the check configs (see `getCheckConfigDigest()`),
+    a different version or a changed config always checks everything again.
+    '''
+
+    def __init__(self, path: Path|str):
+        self.path = Path(path)
+        self.__old: dict[str, dict[str, Any]] = {}
+        self.__new: dict[str, dict[str, Any]] = {}
+        self.hits = 0
+        self.__config_digest = getCheckConfigDigest()
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+            if data.get('version') == _MANIFEST_VERSION and data.get('ac_version') == AC_VERSION \
+            and data.get('config_digest') == self.__config_digest:
+                self.__old = data.get('sections', {})
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def __key(self, path: Path|str) -> str:
+        path = Path(path).resolve()
+        try:
+            return path.relative_to(self.path.parent.resolve()).as_posix()
+        except ValueError:
+            return path.as_posix()
+
+    def lookup(self, section: str, path: Path|str, identity: Any) -> Any|None:
+        '''Return the cached result of the path if its identity is unchanged, otherwise None.'''
+        if identity is None:
+            return None
+        key = self.__key(path)
+        entry = self.__old.get(section, {}).get(key)
+        if not entry or entry.get('id') != identity:
+            return None
+        self.__new.setdefault(section, {})[key] = entry
+        self.hits += 1
+        return entry.get('result')
+
+    def update(self, section: str, path: Path|str, identity: Any, result: Any):
+        '''Remember the result of the path. The result must be JSON serialisable.'''
+        if identity is None:
+            return
+        self.__new.setdefault(section, {})[self.__key(path)] = {'id': identity, 'result': result}
+
+    def save(self) -> bool:
+        '''Write the manifest atomically, so an interrupted run never leaves a broken manifest.'''
+        data = {
+            'version': _MANIFEST_VERSION,
+            'ac_version': AC_VERSION,
+            'config_digest': self.__config_digest,
+            'sections': self.__new,
+            }
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        try:
+            tmp_path.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+            os.replace(tmp_path, self.path)
+        except OSError:
+            return False
+        return True
@@ -1,6 +1,7 @@
 from pathlib import Path
 from multiprocessing import Pool
 from configs import *
+from .filecache import readFileCache, writeFileCache
 from pymediainfo import MediaInfo
 
 
@@ -22,8 +23,13 @@ def getMediaInfo(path:Path) -> MediaInfo:
     This is used to suppress the type mismatch warning.
     MI.parse() only returns MediaInfo if `output=None`. Never str.
     If we don't use this, python language server will warn us about the type mismatch !everywhere!.
+    The raw XML output is kept in the file cache, so an unchanged file is never parsed twice.
     '''
-    return MediaInfo.parse(path, output=None)
+    if xml := readFileCache(path, 'mediainfo'):
+        return MediaInfo(xml)
+    xml = MediaInfo.parse(path, output='OLDXML')
+    writeFileCache(path, mediainfo=xml)
+    return MediaInfo(xml)
 
 
 
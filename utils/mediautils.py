@@ -1,9 +1,14 @@
+import os
 import difflib
 import itertools
+import subprocess
 from pathlib import Path
+from typing import Iterable
+from concurrent.futures import ThreadPoolExecutor
 
 import utils.mediainfo
 from configs import *
+from .filecache import readFileCache, writeFileCache
 
 
 import ffmpeg # NOTE if using ffmpeg but numpy, place the functions in ffmpegutils.py
@@ -11,7 +16,7 @@ import numpy as np
 import scipy.signal as sps
 
 
-__all__ = ['readAudio',
+__all__ = ['readAudio', 'readAudios', 'readAudioTracks',
            'pickAudioSamples', 'cmpAudioSamples',
            'calcAudioOffset', 'getAudioFileOffset',
            'subtractAudio', 'subtractAudioFile',
@@ -41,12 +46,82 @@ def readAudio(path: Path, id: str | int = 0, start: int = 0, length: int = 0) ->
 
 
 
-def pickAudioSamples(path: Path) -> str:
+def readAudios(path: Path, ids: Iterable[str|int], start: int = 0, length: int = 0) -> list[np.ndarray]:
+    '''
+    The same as `readAudio()` but read multiple audio tracks `ids` from the file in a single ffmpeg run.
+    So the file is demuxed only once, and each track is decoded to its own pipe.
+    Return the audios in the order of `ids`.
+    '''
+    ids = list(ids)
+    uniq_ids = list(dict.fromkeys(ids))
+    # passing extra pipes to the child process is only possible on POSIX
+    if len(uniq_ids) <= 1 or os.name != 'posix':
+        audios = {id: readAudio(path, id=id, start=start, length=length) for id in uniq_ids}
+        return [audios[id] for id in ids]
+
+    trim = {'start_sample': start, 'end_sample': start + length} if length > 0 else {'start_sample': start}
+    inp = ffmpeg.input(path.resolve())
+    pipes = [os.pipe() for _ in uniq_ids]
+    outputs = [
+        inp[f'a:{id}'].filter('atrim', **trim).output(f'pipe:{w}', ac=1, format='s16le', acodec='pcm_s16le')
+        for id, (_, w) in zip(uniq_ids, pipes)
+        ]
+    args = ffmpeg.merge_outputs(*outputs).compile()
+
+    def _read(fd: int) -> bytes:
+        with os.fdopen(fd, 'rb') as fo:
+            return fo.read()
+
+    try:
+        proc = subprocess.Popen(
+            args, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+            pass_fds=[w for _, w in pipes]
+            )
+    except OSError:
+        for r, w in pipes:
+            os.close(r)
+            os.close(w)
+        raise
+    # the write ends now belong to ffmpeg, so each read end reaches EOF once ffmpeg finishes that output
+    for _, w in pipes:
+        os.close(w)
+    with ThreadPoolExecutor(len(pipes)) as exe:
+        futures = [exe.submit(_read, r) for r, _ in pipes]
+        _, stderr = proc.communicate()
+        buffers = [future.result() for future in futures]
+    if proc.returncode:
+        raise ffmpeg.Error('ffmpeg', b'', stderr)
+    audios = {id: np.frombuffer(buffer, np.int16) for id, buffer in zip(uniq_ids, buffers)}
+    return [audios[id] for id in ids]
+
+
+
+
+def readAudioTracks(tracks: Iterable[tuple[Path, str|int]], start: int = 0, length: int = 0) -> list[np.ndarray]:
+    '''Read the audio tracks of [path, track_id], all tracks in the same file are read by one `readAudios()`.'''
+    tracks = [(Path(path), id) for path, id in tracks]
+    audios: dict[tuple[Path, str|int], np.ndarray] = {}
+    for path in dict.fromkeys(path for path, _ in tracks):
+        ids = [id for p, id in tracks if p == path]
+        audios.update(zip(((path, id) for id in ids), readAudios(path, ids, start=start, length=length)))
+    return [audios[track] for track in tracks]
+
+
+
+
+def pickAudioSamples(path: Path, window: int = 120, interval: int = 3) -> str:
     '''
     Simply use the idx of max value as the anchor point
     then record one point every 3 seconds
     This digest should be robust for removing starting silence, though cannot work video to be sliced
+
+    The track is streamed from ffmpeg in 1-second chunks with a running max over the whole track,
+    so the digest is the same as the one of decoding the whole track at once.
+    Only every `interval`-th chunk in the leading `window` seconds is kept (the points can only be picked there),
+    so the memory cost does not grow with the length of the track.
     '''
+    if samples := readFileCache(path, 'audio_samples'):
+        return samples
     mi = utils.mediainfo.getMediaInfo(path)
     if mi.audio_tracks:
         freq = mi.audio_tracks[0].sampling_rate
@@ -56,11 +131,37 @@ def pickAudioSamples(path: Path) -> str:
         freq = int(freq)
     else:
         return ''
-    audio = readAudio(path)
-    max_idx = audio.argmax()
+
+    cmd = ffmpeg.input(Path(path).resolve())['a:0'].output('-', ac=1, format='s16le', acodec='pcm_s16le').compile()
+    # stderr is never read, so it must not be a pipe, which would block ffmpeg once full
+    proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    max_val, max_idx, kept = None, 0, []
+    try:
+        # a buffered read only returns less than the 1-second chunk at the end of the stream
+        for i, b in enumerate(iter(lambda: proc.stdout.read(freq * 2), b'')):
+            if not len(chunk := np.frombuffer(b[:len(b)//2*2], np.int16)):
+                break
+            # the first max is kept on ties, the same as `argmax()` over the whole track
+            if max_val is None or chunk.max() > max_val:
+                max_val, max_idx = int(chunk.max()), i * freq + int(chunk.argmax())
+            if i < window and i % interval == 0:
+                kept.append(chunk)
+        proc.wait()
+    finally:
+        proc.stdout.close()
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+    if proc.returncode:
+        raise ffmpeg.Error('ffmpeg', b'', b'')
+    if max_val is None:
+        return ''
+
     start = max_idx % freq
-    points = audio[start:freq*120:freq*3].tolist()
-    return '|'.join(f'{p:d}' for p in (max(audio), *points))
+    points = [int(chunk[start]) for chunk in kept if start < len(chunk)]
+    samples = '|'.join(f'{p:d}' for p in (max_val, *points))
+    writeFileCache(path, audio_samples=samples)
+    return samples
 
 
 
@@ -139,7 +240,7 @@ def getAudioFileOffset(f1: tuple[Path, str|int],
     Calculate the offset between 2 audio [`path`, `track_id`] by samples within [start, start+length].
     Return the starting sample index.
     '''
-    a1, a2 = itertools.starmap(readAudio, ((*f1, start, length), (*f2, start, length)))
+    a1, a2 = readAudioTracks((f1, f2), start, length)
     return calcAudioOffset(a1, a2, start, length)
 
 
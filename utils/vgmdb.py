@@ -1,39 +1,180 @@
 if __name__ == '__main__':
-    from vgmdb3.vgmdb.parsers.search import fetch_page as fetch_search_page
-    from vgmdb3.vgmdb.parsers.album import fetch_page as fetch_album_page
+    from vgmdb3.vgmdb.parsers.search import fetch_url as search_url
+    from vgmdb3.vgmdb.parsers.search import parse_page as parse_search_page
+    from vgmdb3.vgmdb.parsers.search import masquerade as masquerade_search_page
+    from vgmdb3.vgmdb.parsers.album import fetch_url as album_url
     from vgmdb3.vgmdb.parsers.album import parse_page as parse_album_page
+    from vgmdb3.vgmdb.sqlitecache import SqliteCache, calculate_ttl
     from configs import *
 else:
-    from .vgmdb3.vgmdb.parsers.search import fetch_page as fetch_search_page
+    from .vgmdb3.vgmdb.parsers.search import fetch_url as search_url
     from .vgmdb3.vgmdb.parsers.search import parse_page as parse_search_page
-    from .vgmdb3.vgmdb.parsers.album import fetch_page as fetch_album_page
+    from .vgmdb3.vgmdb.parsers.search import masquerade as masquerade_search_page
+    from .vgmdb3.vgmdb.parsers.album import fetch_url as album_url
     from .vgmdb3.vgmdb.parsers.album import parse_page as parse_album_page
+    from .vgmdb3.vgmdb.sqlitecache import SqliteCache, calculate_ttl
     from configs import *
 
 import re
 import time
+import base64
+import threading
+from typing import Callable, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
 
+import requests
 
-def searchVGMDB(query:str, retry:int = 3) -> dict:
+
+class _TokenBucket:
+    '''Allow `rate` requests per second on average, and at most `burst` requests at once after idling.'''
+
+    def __init__(self, rate:float, burst:int = 1) -> None:
+        self.__rate = max(float(rate), 1e-3)
+        self.__burst = max(int(burst), 1)
+        self.__tokens = float(self.__burst)
+        self.__last = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def acquire(self) -> None:
+        # take the token in advance (may go negative), so the waiting threads are served in order
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(self.__burst, self.__tokens + (now - self.__last) * self.__rate)
+            self.__last = now
+            self.__tokens -= 1
+            wait = -self.__tokens / self.__rate
+        if wait > 0:
+            time.sleep(wait)
+
+
+class _FetchedPage:
+    '''The minimal urllib response interface used by the vgmdb3 search parser.'''
+
+    def __init__(self, url:str, content:bytes) -> None:
+        self.__url = url
+        self.__content = content
+
+    def geturl(self) -> str:
+        return self.__url
+
+    def read(self) -> bytes:
+        return self.__content
+
+
+# the parsed pages are cached by the same keys as vgmdb3 (see vgmdb3/vgmdb/fetch.py)
+_cache = SqliteCache(VGMDB_CACHE_PATH) if ENABLE_VGMDB_CACHE else None
+_num_requests = 0
+
+# all lookups share one keep-alive session, the rate limit and the requests in flight
+_session: requests.Session|None = None
+_bucket = _TokenBucket(VGMDB_REQUESTS_PER_SECOND)
+_executor: ThreadPoolExecutor|None = None
+_futures: dict[str, Future] = {}
+_lock = threading.Lock()
+
+
+def _getSession() -> requests.Session:
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        _session.headers['User-Agent'] = USER_AGENT
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(VGMDB_MAX_CONNECTIONS, 1))
+        _session.mount('http://', adapter)
+        _session.mount('https://', adapter)
+    return _session
+
+
+def _rebaseURL(url:str) -> str:
+    '''Redirect the URL to `VGMDB_BASE_URL`, e.g. a local server replaying the recorded pages.'''
+    if url.startswith('https://vgmdb.net'):
+        return VGMDB_BASE_URL.rstrip('/') + url[len('https://vgmdb.net'):]
+    return url
+
+
+def _fetchVGMDB(url:str) -> requests.Response:
+    global _num_requests
+    _bucket.acquire()
+    with _lock:
+        _num_requests += 1
+    response = _getSession().get(_rebaseURL(url), timeout=30)
+    response.raise_for_status()
+    return response
+
+
+def _fetchSearchPage(query:str) -> dict:
+    url = _rebaseURL(search_url(query))
+    response = _fetchVGMDB(url)
+    if response.history:  # VGMDB redirects to the page directly if only 1 item is found
+        return masquerade_search_page(url, _FetchedPage(response.url, response.content))
+    return parse_search_page(response.content.decode('utf-8', 'ignore'))
+
+
+def _fetchAlbumPage(album_id:int|str) -> dict:
+    response = _fetchVGMDB(album_url(str(album_id)))
+    return parse_album_page(response.content.decode('utf-8', 'ignore'))
+
+
+def countVGMDBRequests() -> int:
+    '''Return the number of requests sent to VGMDB so far. Cache hits are not counted.'''
+    return _num_requests
+
+
+def _requestVGMDB(cache_key:str, request:Callable[[], dict], retry:int) -> dict:
+    if _cache is not None:
+        # expired pages are still better than nothing in the offline mode
+        if (info := _cache.get(cache_key, allow_expired=VGMDB_OFFLINE)) is not None:
+            return info
+    if VGMDB_OFFLINE:
+        return {}
     tried = 0
     while tried < retry:
         try:
-            return parse_search_page(fetch_search_page(query))
+            info = request()
+            break
         except Exception as e:
             tried += 1
-            time.sleep(tried)
-    return {}
+            time.sleep(2**tried)
+    else:
+        info = {}
+    if info and _cache is not None:
+        calculate_ttl(info)
+        _cache[cache_key] = info
+    if not info:
+        # do not remember the failure, a later lookup can try again
+        with _lock:
+            _futures.pop(cache_key, None)
+    return info
+
+
+def _submitVGMDB(cache_key:str, request:Callable[[], dict], retry:int) -> Future:
+    '''Start the request in the background, or join the same request if it has been started.'''
+    global _executor
+    with _lock:
+        if (future := _futures.get(cache_key)) is None:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max(VGMDB_MAX_CONNECTIONS, 1), thread_name_prefix='VGMDB')
+            future = _futures[cache_key] = _executor.submit(_requestVGMDB, cache_key, request, retry)
+    return future
+
+
+def _submitSearch(query:str, retry:int = 3) -> Future:
+    cache_key = 'vgmdb/search/%s' % base64.b64encode(query.encode('utf-8')).decode('ascii')
+    return _submitVGMDB(cache_key, lambda: _fetchSearchPage(query), retry)
+
+
+def prefetchVGMDBSearches(queries:Iterable[str], retry:int = 3) -> None:
+    '''Issue the searches in the background, so later `searchVGMDB()` calls of them return at once.'''
+    for query in queries:
+        _submitSearch(query, retry)
+
+
+def searchVGMDB(query:str, retry:int = 3) -> dict:
+    return _submitSearch(query, retry).result()
 
 
 def getVGMDBAlbumInfo(album_id:int|str, retry:int = 3) -> dict:
-    tried = 0
-    while tried < retry:
-        try:
-            return parse_album_page(fetch_album_page(str(album_id)))
-        except Exception as e:
-            tried += 1
-            time.sleep(tried)
-    return {}
+    cache_key = 'vgmdb/album/%s' % album_id
+    return _submitVGMDB(cache_key, lambda: _fetchAlbumPage(album_id), retry).result()
 
 
 
@@ -46,6 +46,7 @@ except:
 	pass
 
 from . import config
+from .sqlitecache import SqliteCache
 
 class NullCache(object):
 	def __getitem__(self, key):
@@ -135,6 +136,10 @@ class RedisCache(object):
 
 cache = None
 
+if not cache and getattr(config, 'SQLITE_CACHE_PATH', None):
+	logger.info("Using sqlite cache at %s" % (config.SQLITE_CACHE_PATH,))
+	cache = SqliteCache(config.SQLITE_CACHE_PATH)
+
 if not cache and gaecache:
 	try:
 		logger.info("Connecting GAE Cache")
@@ -8,6 +8,7 @@ CELERY_RESULT_BACKEND = 'cache'
 CELERY_CACHE_BACKEND = 'memcached://127.0.0.1:11211/'
 CELERY_PING = True
 DATA_BACKGROUND = False
+SQLITE_CACHE_PATH = None	# set a file path to use the local sqlite cache instead of memcache/redis
 
 # seller backend settings
 AMAZON_ACCESS_KEY_ID = None
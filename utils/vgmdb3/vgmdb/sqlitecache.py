@@ -0,0 +1,82 @@
+""" A local cache backend keeping the parsed vgmdb data in a sqlite file
+    Unlike the memcache/redis backends, it needs no server and survives restarts
+"""
+import os
+import time
+import pickle
+import sqlite3
+import threading
+from datetime import datetime as _datetime
+
+import logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 24 * 60 * 60	# 1 day, the same default as data._calculate_ttl
+KEEP_EXPIRED = 86400 * 29	# expired entries are kept this long for the offline use, same as other backends
+
+def calculate_ttl(info):
+	""" Set info['meta']['ttl'] by how recently the page was edited, same as data._calculate_ttl """
+	ttl = DEFAULT_TTL
+	if 'meta' in info and 'edited_date' in info['meta']:
+		try:
+			fetched_date = _datetime.now()
+			info['meta']['fetched_date'] = fetched_date.strftime('%Y-%m-%dT%H:%M')
+			edited_date = _datetime.strptime(info['meta']['edited_date'], '%Y-%m-%dT%H:%M')
+			date_diff = fetched_date - edited_date
+			if date_diff.total_seconds() < 7 * 24 * 60 * 60:	# 1 week
+				ttl = 60 * 60	# 1 hour
+			if date_diff.total_seconds() < 24 * 60 * 60:	# 1 day
+				ttl = 5 * 60	# 5 minutes
+			if date_diff.total_seconds() < 1 * 60 * 60:	# 1 hour
+				ttl = 60	# 1 minute
+		except Exception as e:
+			logger.warning("Failed to update data ttl for %s: %s" % (info.get('link'), e))
+		info['meta']['ttl'] = ttl
+	return ttl
+
+class SqliteCache(object):
+	def __init__(self, path):
+		self._path = str(path)
+		self._conn = None
+		self._lock = threading.Lock()
+	def _connect(self):
+		# connect lazily, so merely importing this module never touches the disk
+		if self._conn is None:
+			os.makedirs(os.path.dirname(os.path.abspath(self._path)), exist_ok=True)
+			conn = sqlite3.connect(self._path, timeout=30, isolation_level=None, check_same_thread=False)
+			conn.execute('PRAGMA journal_mode=WAL')
+			conn.execute('CREATE TABLE IF NOT EXISTS pages (key TEXT PRIMARY KEY, value BLOB, expires REAL)')
+			conn.execute('DELETE FROM pages WHERE expires < ?', (time.time() - KEEP_EXPIRED,))
+			self._conn = conn
+		return self._conn
+	def get(self, key, allow_expired=False):
+		""" Return the value, or None if not cached or expired (unless allow_expired) """
+		try:
+			with self._lock:
+				row = self._connect().execute('SELECT value, expires FROM pages WHERE key=?', (key,)).fetchone()
+			if row is None or (not allow_expired and row[1] < time.time()):
+				return None
+			return pickle.loads(row[0])
+		except Exception as e:
+			logger.warning("Failed to load %s from cache: %s" % (key, e))
+			return None
+	def __getitem__(self, key):
+		return self.get(key)
+	def __setitem__(self, key, value):
+		# follow the ttl decided for the page, see data._calculate_ttl
+		ttl = DEFAULT_TTL
+		if isinstance(value, dict):
+			ttl = value.get('meta', {}).get('ttl', DEFAULT_TTL)
+		try:
+			with self._lock:
+				self._connect().execute(
+					'INSERT OR REPLACE INTO pages (key, value, expires) VALUES (?, ?, ?)',
+					(key, pickle.dumps(value, -1), time.time() + ttl))
+		except Exception as e:
+			logger.warning("Failed to set %s in cache: %s" % (key, e))
+	def __delitem__(self, key):
+		try:
+			with self._lock:
+				self._connect().execute('DELETE FROM pages WHERE key=?', (key,))
+		except:
+			pass
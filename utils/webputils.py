@@ -5,13 +5,21 @@ The source license is MIT License.
 This version brings improvement and additional functions.
 '''
 
+import mmap
 import time
+import struct
 import platform
+import threading
 import subprocess
 from pathlib import Path
+from typing import NamedTuple
 from multiprocessing import Pool
+from concurrent.futures import ThreadPoolExecutor
 
 from .chars import quotChars
+from .fileid import getCRC32
+from .ffmpegutils import toWebp
+from configs import DEFAULT_WEBP_QUALITY, NUM_CPU_JOBS
 from configs.time import TIMESTAMP
 from configs.specification import ALL_EXTS_IN_SCANS
 
@@ -22,8 +30,22 @@ WEBPTOOLS_MOD_FILE = webptools.__file__
 
 
 
-__all__ = ['getCwebpBin', 'getDwebpBin', 'getWebpQualityBin',
-           'cwebp', 'dwebp', 'tstDwebp', 'getWebpQuality', 'tstWebpDecoding']
+__all__ = ['getCwebpBin', 'getDwebpBin',
+           'cwebp', 'dwebp', 'tstWebpDecoding',
+           'WebpInfo', 'readWebpInfo', 'parseWebpInfo', 'estimateVP8Quality',
+           'encodeWebp', 'encodeWebps']
+
+
+# the input formats readable by the bundled `cwebp`, the others are transcoded by ffmpeg
+CWEBP_INPUT_EXTS = ('.png', '.tif', '.tiff', '.jpg', '.jpeg', '.webp')
+# images from this size are encoded with `cwebp -mt`, which then takes 2 CPUs
+CWEBP_MT_MIN_PIXELS = 4_000_000
+# the max width/height of WebP
+WEBP_MAX_SIDE = 16383
+
+# the CPUs taken by the running `cwebp`, shared by all batches encoded at the same time (e.g. by SD/AD sources)
+_cwebp_cpus = 0
+_cwebp_cond = threading.Condition()
 
 
 
@@ -82,33 +104,6 @@ def getDwebpBin(bin_path: str|Path|None) -> str:
 
 
 
-def getWebpQualityBin(bin_path: str|Path|None) -> str:
-    if bin_path is None:
-        match platform.system():
-            case 'Linux':
-                return f"{Path(WEBPTOOLS_MOD_FILE).absolute().parent.parent.joinpath('lib/libwebp_linux/bin/webp_quality').as_posix()}"
-            case 'Windows':
-                match platform.architecture()[0]:
-                    case '64bit':
-                        return f"\"{Path(WEBPTOOLS_MOD_FILE).absolute().parent.parent.joinpath('lib/libwebp_win64/bin/webp_quality.exe').as_posix()}\""
-                    case '32bit'|'86bit':
-                        raise NotImplementedError('Unsupported platform:', platform.system(), platform.architecture())
-                    case _:
-                        raise NotImplementedError('Unsupported platform:', platform.system(), platform.architecture())
-            case 'Darwin':
-                return f"\"{Path(WEBPTOOLS_MOD_FILE).absolute().parent.parent.joinpath('lib/libwebp_osx/bin/webp_quality').as_posix()}\""
-            case _:
-                raise OSError('Unsupported platform:', platform.system(), platform.architecture())
-    elif isinstance(bin_path, Path):
-        return f"{Path(WEBPTOOLS_MOD_FILE).as_posix()}"
-    elif isinstance(bin_path, str):
-        return bin_path
-    else:
-        raise TypeError('Unsupported input type', type(bin_path))
-
-
-
-
 def cwebp(input_path: str, output_path: str, option: str, logging: str = "-v", bin_path: str|None = None) -> dict:
     """Modified from webptools.cwebp"""
 
@@ -138,38 +133,141 @@ def dwebp(input_path: str, output_path: str, option: str, logging: str = "-v", b
 
 
 
-def tstDwebp(input_path: str, bin_path: str|None = None) -> dict:
-    """Modified from webptools.dwebp"""
-
-    bin_path = quotChars(bin_path if bin_path else getDwebpBin(bin_path=bin_path))
-    input_path = quotChars(input_path)
-    cmd = f'{bin_path} {input_path}'
-    p = subprocess.Popen(cmd, shell=True, stdin=None, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    (stdout, stderr) = p.communicate()
-    result = {'exit_code': p.returncode, 'stdout': stdout, 'stderr': stderr, 'command': cmd}
-    return result
-
+class WebpInfo(NamedTuple):
+    width: int
+    height: int
+    lossless: bool
+    alpha: bool
+    animated: bool
+    quality: int  # the same as `webp_quality`: 0-100 for lossy, 101 for lossless, -1 if unknown
 
 
 
-def getWebpQuality(input_path: str, bin_path: str|None = None) -> int:
-    """
-    Use `webp_quality` to estimate the `q` encoding parameter.
 
-    Return: int: The estimated `q`, or 0 if failed.
-    """
-
-    bin_path = quotChars(bin_path if bin_path else getWebpQualityBin(bin_path=bin_path))
-    input_path = quotChars(input_path)
-    cmd = f'{bin_path} -quiet {input_path}'
-    p = subprocess.Popen(cmd, shell=True, stdin=None, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    (stdout, stderr) = p.communicate()
-    result = {'exit_code': p.returncode, 'stdout': stdout, 'stderr': stderr, 'command': cmd}
+def readWebpInfo(path: Path|str) -> WebpInfo|None:
+    '''
+    Read the dimensions, mode, alpha and estimated quality from the WebP headers, without decoding any pixel.
+    The file is memory-mapped, so only the pages holding the headers are actually read.
 
+    Return: WebpInfo, or None if the file is not a parsable WebP file.
+    '''
     try:
-        return int(result['stdout'])
-    except ValueError:
-        return 0
+        with open(path, 'rb') as fo, mmap.mmap(fo.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return parseWebpInfo(data)
+    except (OSError, ValueError):  # mmap raises ValueError on an empty file
+        return None
+
+
+
+
+def parseWebpInfo(data: bytes|mmap.mmap) -> WebpInfo|None:
+    '''Parse the RIFF container and the VP8/VP8L/VP8X headers, see `readWebpInfo()`.'''
+
+    if len(data) < 20 or data[0:4] != b'RIFF' or data[8:12] != b'WEBP':
+        return None
+    riff_end = min(len(data), 8 + struct.unpack_from('<I', data, 4)[0])
+
+    width = height = 0
+    alpha = animated = has_vp8x = has_alph = False
+    pos = 12
+    while pos + 8 <= riff_end:
+        fourcc, size = data[pos:pos + 4], struct.unpack_from('<I', data, pos + 4)[0]
+        payload = pos + 8
+        if payload + size > riff_end:
+            return None
+        match fourcc:
+            case b'VP8X':
+                if size < 10: return None
+                flags = data[payload]
+                alpha, animated, has_vp8x = bool(flags & 0x10), bool(flags & 0x02), True
+                width = 1 + int.from_bytes(data[payload + 4:payload + 7], 'little')
+                height = 1 + int.from_bytes(data[payload + 7:payload + 10], 'little')
+            case b'ALPH':
+                has_alph = True
+            case b'ANIM'|b'ANMF':
+                # the frames can be mixed lossy/lossless, same as libwebp we don't go into them
+                return WebpInfo(width, height, False, alpha or has_alph, True, -1)
+            case b'VP8 ':
+                # frame tag (3 bytes), start code 9d 01 2a, then 14-bit width and height
+                if size < 10 or data[payload + 3:payload + 6] != b'\x9d\x01\x2a' or data[payload] & 1:
+                    return None
+                w = struct.unpack_from('<H', data, payload + 6)[0] & 0x3fff
+                h = struct.unpack_from('<H', data, payload + 8)[0] & 0x3fff
+                if has_vp8x and (w, h) != (width, height): return None
+                q = estimateVP8Quality(data, payload + 6, payload + size)
+                return WebpInfo(w, h, False, alpha or has_alph, animated, q)
+            case b'VP8L':
+                # signature 0x2f, then 14-bit width-1, 14-bit height-1, 1-bit alpha and 3-bit version, LSB first
+                if size < 5 or data[payload] != 0x2f:
+                    return None
+                bits = struct.unpack_from('<I', data, payload + 1)[0]
+                w, h = (bits & 0x3fff) + 1, ((bits >> 14) & 0x3fff) + 1
+                if bits >> 29: return None
+                if has_vp8x and (w, h) != (width, height): return None
+                # same as libwebp, the alpha bit of VP8L takes precedence over the flag in VP8X
+                return WebpInfo(w, h, True, bool((bits >> 28) & 1) or has_alph, animated, 101)
+        pos = payload + size + (size & 1)  # chunks are padded to even size
+    return None
+
+
+
+
+def estimateVP8Quality(data: bytes|mmap.mmap, pos: int, end: int) -> int:
+    '''
+    Estimate the `q` encoding parameter from the quantiser in the VP8 frame header, a port of `VP8EstimateQuality()`
+    in libwebp (used by `webp_quality`). `pos` points to the frame dimensions i.e. right after the start code.
+    Like libwebp, the header is read as plain bits since it's all coded with the uniform probability.
+
+    Return: int: The estimated `q`, or -1 if the header is truncated.
+    '''
+
+    bit_pos = (pos + 4) * 8  # skip the frame dimensions
+    if bit_pos + 208 > end * 8:
+        return -1  # the header below takes at most 208 bits
+
+    def _bits(n: int) -> int:
+        nonlocal bit_pos
+        val = 0
+        for _ in range(n):
+            val = (val << 1) | ((data[bit_pos >> 3] >> (7 - (bit_pos & 7))) & 1)
+            bit_pos += 1
+        return val
+
+    def _skip(n: int) -> int:
+        return _bits(n) if _bits(1) else 0
+
+    q = -1
+    _bits(2)  # colorspace + clamp type
+    if _bits(1):  # use segment
+        update_map = _bits(1)
+        if _bits(1):  # update data
+            absolute_delta = _bits(1)
+            qs = [0, 0, 0, 0]
+            for s in range(4):
+                if _bits(1):
+                    qs[s] = _bits(7)
+                    if _bits(1): qs[s] = -qs[s]
+            if absolute_delta: q = qs[0]  # just use the first segment's quantiser
+            for s in range(4):
+                _skip(7)  # filter strength
+        if update_map:
+            for s in range(3):
+                _skip(8)
+    _bits(1 + 6 + 3)  # filter type + level + sharpness
+    if _bits(1):  # use lf delta
+        if _bits(1):  # update lf delta
+            for _ in range(4 + 4):
+                _skip(6)
+    _bits(2)  # number of partitions
+    base_q = _bits(7)
+    for _ in range(5):  # dqy1_dc, dqy2_dc, dqy2_ac, dquv_dc, dquv_ac
+        _skip(5)
+    if q < 0: q = base_q
+
+    q = (127 - q) * 100 // 127
+    if q < 80:  # correction for power-law behavior in low range
+        q = int((q / 80) ** (1 / 0.38) * 80)
+    return q
 
 
 
@@ -228,3 +326,93 @@ def tstWebpDecoding(*inputs:Path, temp_dir:Path|None=None, mp:int=1) -> list[boo
     for hardlink in hardlinks:
         hardlink.unlink()
     return [r.get()['retcode'] == 0 for r in ret]
+
+
+
+
+def encodeWebp(
+    src: Path,
+    dst: Path,
+    size: tuple[int, int]|None = None,
+    quality: int = DEFAULT_WEBP_QUALITY,
+    lossless: bool = False,
+    mt: bool = False,
+    ret_crc32: bool = False,
+    ) -> bool|str:
+    '''
+    Encode the image to WebP by the bundled `cwebp`, with the same quality/method settings as `toWebp()`.
+    The output is not byte-identical to `toWebp()`, as cwebp and ffmpeg convert the pixels to YUV differently.
+    `size` is the (width, height) of the source if already known (e.g. from MediaInfo), so it's never probed again.
+    The formats `cwebp` cannot read (e.g. BMP) or fails to encode fall back to `toWebp()`.
+    If `ret_crc32`, return the CRC32 of the output instead of True, or an empty string instead of False.
+    '''
+    if not src.is_file(): return '' if ret_crc32 else False
+    if src.suffix.lower() not in CWEBP_INPUT_EXTS:
+        return toWebp(src, dst, quality, lossless, ret_crc32=ret_crc32, size=size)
+    remove_dst = not dst.is_file()
+
+    # ffmpeg clamps the `compression_level=12` of `toWebp()` to the max method 6, so use the same here
+    cmd = [getCwebpBin(None).strip('"'), '-quiet', '-q', str(quality), '-m', '6']
+    if lossless: cmd.append('-lossless')
+    if mt: cmd.append('-mt')
+    if size and (size[0] > WEBP_MAX_SIDE or size[1] > WEBP_MAX_SIDE):
+        scale = WEBP_MAX_SIDE / max(size)
+        cmd += ['-resize', str(min(int(size[0] * scale), WEBP_MAX_SIDE)), str(min(int(size[1] * scale), WEBP_MAX_SIDE))]
+    cmd += [src.resolve().as_posix(), '-o', dst.resolve().as_posix()]
+
+    try:
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        ret = subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        ok = ret.returncode == 0 and dst.is_file()
+    except OSError:
+        ok = False
+    if not ok:
+        if remove_dst: dst.unlink(missing_ok=True)
+        return toWebp(src, dst, quality, lossless, ret_crc32=ret_crc32, size=size)
+    # the output was just written and is still in the OS page cache, so hashing it costs no disk reading
+    return getCRC32(dst) if ret_crc32 else True
+
+
+
+
+def encodeWebps(
+    tasks: list[tuple[Path, Path, tuple[int, int]|None]],
+    quality: int = DEFAULT_WEBP_QUALITY,
+    lossless: bool = False,
+    mp: int = NUM_CPU_JOBS,
+    ) -> list[str]:
+    '''
+    Encode a batch of (src, dst, size) to WebP, keeping `mp` CPUs busy by images in parallel × threads per image.
+    The largest images are started first, so the batch doesn't end waiting for a single large image.
+    Large images are encoded with `-mt` and take 2 CPUs, while the small ones take 1 CPU each.
+    The CPUs are counted across all batches running at the same time, so concurrent batches share the `mp` CPUs.
+    `cwebp` runs in its own process, so the threads here only wait for it.
+
+    Return: the CRC32 of each output in the order of `tasks`, or an empty string if failed.
+    '''
+    mp = max(mp, 1)
+    ret: list[str] = [''] * len(tasks)
+    pixels = [(size[0] * size[1]) if size else 0 for (_, _, size) in tasks]
+    order = sorted(range(len(tasks)), key=lambda i: pixels[i], reverse=True)
+
+    def run(i: int, cpus: int):
+        global _cwebp_cpus
+        try:
+            src, dst, size = tasks[i]
+            ret[i] = encodeWebp(src, dst, size, quality, lossless, mt=(cpus > 1), ret_crc32=True)
+        except Exception:
+            ret[i] = ''
+        finally:
+            with _cwebp_cond:
+                _cwebp_cpus -= cpus
+                _cwebp_cond.notify_all()
+
+    global _cwebp_cpus
+    with ThreadPoolExecutor(mp) as executor:
+        for i in order:
+            cpus = 2 if (mp > 1 and pixels[i] >= CWEBP_MT_MIN_PIXELS) else 1
+            with _cwebp_cond:
+                _cwebp_cond.wait_for(lambda: _cwebp_cpus + cpus <= mp)
+                _cwebp_cpus += cpus
+            executor.submit(run, i, cpus)
+    return ret